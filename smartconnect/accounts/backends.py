@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from . import intentos
+
+
+class EmailBackend(ModelBackend):
+    """
+    ModelBackend (login por email, USERNAME_FIELD) con control de intentos
+    y que carga el usuario de la sesión junto con su asignación y perfil
+    vigentes: user.rol no hace consultas adicionales en vistas ni templates.
+
+    Con credenciales verificadas y rechazadas lanza PermissionDenied, que
+    corta la cadena de AUTHENTICATION_BACKENDS: ModelBackend sigue listado
+    solo para resolver las sesiones iniciadas con él, y no debe volver a
+    hashear la contraseña.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        ip = intentos.ip_de(request)
+        # bloqueado: se rechaza antes de consultar y de hashear la contraseña
+        if intentos.segundos_bloqueo(username, ip):
+            raise PermissionDenied
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # mismo costo que con un usuario existente (como ModelBackend)
+            UserModel().set_password(password)
+            intentos.registrar_fallo(username, ip)
+            raise PermissionDenied
+
+        if user.is_locked():
+            intentos.bloquear_email(username, user.locked_until.timestamp())
+            raise PermissionDenied
+
+        if user.check_password(password):
+            intentos.limpiar(username)
+            if self.user_can_authenticate(user):
+                return user
+        elif intentos.registrar_fallo(username, ip):
+            # solo en la transición a bloqueado se escribe en la BD
+            user.lock_for_minutes(intentos.BLOQUEO_MINUTOS)
+        raise PermissionDenied
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = (
+                UserModel._default_manager
+                .select_related("active_asignacion__perfil")
+                .get(pk=user_id)
+            )
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from . import intentos
 from .models import UsuarioApp, UserPerfil, UserPerfilAsignacion
 
 
@@ -114,3 +116,23 @@ class LoginForm(AuthenticationForm):
         super().__init__(*args, **kwargs)
         for field in self.fields.values():
             field.widget.attrs['class'] = 'form-control'
+
+    def _verificar_bloqueo(self):
+        espera = intentos.segundos_bloqueo(
+            self.cleaned_data.get("username"), intentos.ip_de(self.request)
+        )
+        if espera:
+            raise ValidationError(
+                "Demasiados intentos fallidos. Intenta nuevamente en %(minutos)d minutos.",
+                code="bloqueado",
+                params={"minutos": -(-espera // 60)},
+            )
+
+    def clean(self):
+        self._verificar_bloqueo()
+        try:
+            return super().clean()
+        except ValidationError:
+            # el intento pudo haber sido el que bloqueó la cuenta
+            self._verificar_bloqueo()
+            raise
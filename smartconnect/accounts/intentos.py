@@ -0,0 +1,110 @@
+"""
+Control de intentos de login en caché (sin escribir en la BD por intento).
+
+Se cuentan los fallos por email y por IP en una ventana deslizante
+(aproximada con dos buckets: el actual completo + la parte proporcional
+del anterior). Al superar el máximo, la clave queda bloqueada en caché;
+para el email, además, locked_until se persiste una sola vez, en la
+transición a bloqueado.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+_config = getattr(settings, "LOGIN_INTENTOS", {})
+
+VENTANA = _config.get("VENTANA", 900)           # segundos
+MAX_EMAIL = _config.get("MAX_EMAIL", 5)
+MAX_IP = _config.get("MAX_IP", 50)
+BLOQUEO_MINUTOS = _config.get("BLOQUEO_MINUTOS", 15)
+
+
+def _cache():
+    return caches[_config.get("CACHE", "default")]
+
+
+def _id(tipo, valor):
+    # el email normalizado no va tal cual en la clave (largo / caracteres)
+    huella = hashlib.blake2b(valor.encode(), digest_size=10).hexdigest()
+    return f"login:{tipo}:{huella}"
+
+
+def normalizar_email(email):
+    return (email or "").strip().lower()
+
+
+def ip_de(request):
+    return request.META.get("REMOTE_ADDR", "") if request is not None else ""
+
+
+def _claves(email, ip):
+    claves = []
+    if email:
+        claves.append((_id("email", normalizar_email(email)), MAX_EMAIL))
+    if ip:
+        claves.append((_id("ip", ip), MAX_IP))
+    return claves
+
+
+def _fallos(cache, clave, ahora):
+    bucket, transcurrido = divmod(ahora, VENTANA)
+    valores = cache.get_many([f"{clave}:{int(bucket)}", f"{clave}:{int(bucket) - 1}"])
+    actual = valores.get(f"{clave}:{int(bucket)}", 0)
+    anterior = valores.get(f"{clave}:{int(bucket) - 1}", 0)
+    return actual + anterior * (1 - transcurrido / VENTANA)
+
+
+def segundos_bloqueo(email, ip):
+    """Segundos que faltan si el email o la IP están bloqueados; 0 si no."""
+    cache = _cache()
+    ids = [f"{clave}:bloqueo" for clave, _ in _claves(email, ip)]
+    if not ids:
+        return 0
+    ahora = time.time()
+    hasta = max(cache.get_many(ids).values(), default=0)
+    return max(0, math.ceil(hasta - ahora))
+
+
+def registrar_fallo(email, ip):
+    """
+    Suma un fallo al email y a la IP. Devuelve True si el email pasó a
+    bloqueado con este intento (y solo en ese caso).
+    """
+    cache = _cache()
+    ahora = time.time()
+    bucket = int(ahora // VENTANA)
+    email_bloqueado = False
+
+    for clave, maximo in _claves(email, ip):
+        contador = f"{clave}:{bucket}"
+        cache.add(contador, 0, timeout=2 * VENTANA)
+        try:
+            cache.incr(contador)
+        except ValueError:  # expiró entre add() e incr()
+            cache.set(contador, 1, timeout=2 * VENTANA)
+
+        if _fallos(cache, clave, ahora) >= maximo:
+            duracion = BLOQUEO_MINUTOS * 60
+            # add(): solo el primer intento que cruza el umbral lo registra
+            if cache.add(f"{clave}:bloqueo", ahora + duracion, timeout=duracion):
+                cache.delete_many([contador, f"{clave}:{bucket - 1}"])
+                email_bloqueado = email_bloqueado or clave.startswith("login:email:")
+    return email_bloqueado
+
+
+def limpiar(email):
+    """Login correcto: descarta los fallos acumulados del email."""
+    clave = _id("email", normalizar_email(email))
+    bucket = int(time.time() // VENTANA)
+    _cache().delete_many([f"{clave}:{bucket}", f"{clave}:{bucket - 1}"])
+
+
+def bloquear_email(email, hasta):
+    """Refleja en caché un bloqueo persistido (locked_until)."""
+    restante = hasta - time.time()
+    if restante > 0:
+        clave = _id("email", normalizar_email(email))
+        _cache().add(f"{clave}:bloqueo", hasta, timeout=math.ceil(restante))
@@ -0,0 +1,305 @@
+import hashlib
+import random
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import UsuarioApp, UserPerfil, UserPerfilAsignacion
+from sensores import resumen
+from sensores.models import Sensor, Barrera, EventoAcceso, MarcaProceso
+from sensores.signals import sensores_modificados
+from smartconnect import versiones
+from zonas.models import Departamento
+
+# Afluencia relativa por hora del día: cambios de turno (7-9, 15, 23),
+# almuerzo (13-14) y salida administrativa (18)
+PERFIL_HORA = (
+    0.3, 0.2, 0.2, 0.2, 0.3, 1.0, 3.0, 9.0, 10.0, 5.0, 3.0, 3.0,
+    4.0, 6.0, 5.0, 6.0, 3.0, 5.0, 8.0, 3.0, 1.5, 1.0, 2.0, 3.0,
+)
+PESO_DIA = (1.0, 1.0, 1.0, 1.0, 0.95, 0.4, 0.25)  # lunes..domingo
+
+ESTADOS_SENSOR = (("ACTIVO", 90), ("INACTIVO", 5), ("BLOQUEADO", 3), ("PERDIDO", 2))
+
+COLUMNAS_EVENTO = (
+    "sensor_id", "usuario_id", "departamento_id",
+    "tipo", "accion", "resultado", "detalle", "fecha_hora",
+)
+FILAS_POR_INSERT = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos para pruebas de carga: departamentos, usuarios, "
+        "sensores y EventoAcceso con distribución horaria por turnos y ráfagas "
+        "de denegaciones. Determinista con --seed; si se interrumpe, volver a "
+        "ejecutar con los mismos parámetros (incluida --hasta) retoma donde quedó. "
+        "Ej: manage.py generar_datos --departamentos 50 --sensores 20000 "
+        "--usuarios 5000 --eventos 50000000 --dias 365 --hasta 2025-01-01"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departamentos", type=int, default=10)
+        parser.add_argument("--sensores", type=int, default=1000)
+        parser.add_argument("--usuarios", type=int, default=200)
+        parser.add_argument("--eventos", type=int, default=100_000)
+        parser.add_argument("--dias", type=int, default=90, help="días de historia")
+        parser.add_argument("--hasta", help="YYYY-MM-DD, fin (exclusivo) del período; por defecto hoy")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--prefijo", default="carga",
+                            help="prefijo de nombres, emails y UIDs generados")
+        parser.add_argument("--lote", type=int, default=20_000, help="eventos por transacción")
+        parser.add_argument("--resumen", action="store_true",
+                            help="reconstruir EventoResumenHora al terminar (lento con muchos eventos)")
+
+    def handle(self, *args, **opts):
+        if len(opts["prefijo"]) > 8 or not opts["prefijo"].isalnum():
+            raise CommandError("--prefijo debe ser alfanumérico de hasta 8 caracteres.")
+        if min(opts["departamentos"], opts["sensores"], opts["usuarios"], opts["dias"], opts["lote"]) < 1:
+            raise CommandError("--departamentos, --sensores, --usuarios, --dias y --lote deben ser > 0.")
+
+        hasta = self._hasta(opts["hasta"])
+        desde = hasta - timedelta(days=opts["dias"])
+        self.stdout.write(f"Período {desde.isoformat()} → {hasta.isoformat()} (seed {opts['seed']})")
+
+        departamentos = self._departamentos(opts)
+        usuarios = self._usuarios(opts)
+        sensores = self._sensores(opts, departamentos, usuarios)
+
+        if opts["eventos"]:
+            self._eventos(opts, sensores, desde, hasta)
+            # los INSERT directos no emiten eventos_registrados
+            if opts["resumen"]:
+                self.stdout.write("Reconstruyendo el resumen horario...")
+                resumen.reconstruir()
+            else:
+                self.stdout.write(
+                    "Los reportes no incluyen estos eventos hasta ejecutar "
+                    "`manage.py resumir_eventos --reconstruir`."
+                )
+
+        self.stdout.write(self.style.SUCCESS("Datos sintéticos generados."))
+
+    def _hasta(self, valor):
+        try:
+            dia = datetime.fromisoformat(valor) if valor else timezone.localdate()
+        except ValueError:
+            raise CommandError("--hasta debe tener el formato YYYY-MM-DD.")
+        return timezone.make_aware(datetime(dia.year, dia.month, dia.day))
+
+    # ---------- Entidades (idempotente: solo crea lo que falta) ----------
+
+    def _departamentos(self, opts):
+        nombres = [f"{opts['prefijo']} Zona {i:04d}" for i in range(opts["departamentos"])]
+        Departamento.objects.bulk_create(
+            [Departamento(nombre=n, descripcion="Generado por generar_datos") for n in nombres],
+            ignore_conflicts=True, batch_size=1000,
+        )
+        ids = dict(Departamento.objects.filter(nombre__in=nombres).values_list("nombre", "id"))
+        departamentos = [ids[n] for n in nombres]
+
+        sin_barrera = Departamento.objects.filter(pk__in=departamentos, barrera__isnull=True)
+        Barrera.objects.bulk_create(
+            [Barrera(departamento_id=pk) for pk in sin_barrera.values_list("pk", flat=True)],
+            batch_size=1000,
+        )
+        versiones.incrementar(Departamento._meta.label_lower, Barrera._meta.label_lower)
+        self.stdout.write(f"{len(departamentos)} departamentos")
+        return departamentos
+
+    def _usuarios(self, opts):
+        emails = [f"{opts['prefijo']}{i:06d}@carga.cl" for i in range(opts["usuarios"])]
+        UsuarioApp.objects.bulk_create(
+            [
+                UsuarioApp(
+                    email=email, name=f"Usuario {i}", is_active=True,
+                    password=f"{UNUSABLE_PASSWORD_PREFIX}generado",
+                )
+                for i, email in enumerate(emails)
+            ],
+            ignore_conflicts=True, batch_size=1000,
+        )
+
+        # perfil OPERADOR vigente para los que aún no tienen uno
+        operador, _ = UserPerfil.objects.get_or_create(nombre=UsuarioApp.ROL_OPERADOR)
+        sin_perfil = list(
+            UsuarioApp.objects.filter(email__in=emails, active_asignacion__isnull=True)
+            .values_list("pk", flat=True)
+        )
+        if sin_perfil:
+            UserPerfilAsignacion.objects.bulk_create(
+                [UserPerfilAsignacion(user_id=pk, perfil=operador) for pk in sin_perfil],
+                batch_size=1000,
+            )
+            asignaciones = UserPerfilAsignacion.objects.filter(
+                user_id__in=sin_perfil, ended_at__isnull=True,
+            ).values_list("user_id", "pk")
+            UsuarioApp.objects.bulk_update(
+                [UsuarioApp(pk=user_id, active_asignacion_id=pk) for user_id, pk in asignaciones],
+                ["active_asignacion"], batch_size=1000,
+            )
+
+        ids = dict(UsuarioApp.objects.filter(email__in=emails).values_list("email", "pk"))
+        self.stdout.write(f"{len(ids)} usuarios")
+        return [ids[e] for e in emails]
+
+    def _sensores(self, opts, departamentos, usuarios):
+        rng = random.Random(f"{opts['seed']}:sensores")
+        estados, pesos = zip(*ESTADOS_SENSOR)
+        nuevos = []
+        for i in range(opts["sensores"]):
+            estado = rng.choices(estados, pesos)[0]
+            # BLOQUEADO requiere usuario (SensorSerializer.validate)
+            con_usuario = estado == "BLOQUEADO" or rng.random() < 0.8
+            nuevos.append(Sensor(
+                uid=f"{opts['prefijo'].upper()}{i:08X}",
+                alias=f"Tarjeta {i}",
+                estado=estado,
+                departamento_id=rng.choice(departamentos),
+                usuario_id=rng.choice(usuarios) if con_usuario else None,
+            ))
+
+        uids = [s.uid for s in nuevos]
+        with transaction.atomic():
+            existentes = set(Sensor.objects.filter(uid__in=uids).values_list("uid", flat=True))
+            creados = [s for s in nuevos if s.uid not in existentes]
+            Sensor.objects.bulk_create(creados, batch_size=1000)
+            # cachés, filtro de uids, lista de acceso offline y versiones
+            sensores_modificados.send(sender=Sensor, cambios=[
+                (s.uid, None, (s.departamento_id, s.estado)) for s in creados
+            ])
+
+        filas = dict(
+            (uid, resto) for uid, *resto in
+            Sensor.objects.filter(uid__in=uids)
+            .values_list("uid", "pk", "departamento_id", "usuario_id", "estado")
+        )
+        self.stdout.write(f"{len(filas)} sensores ({len(creados)} nuevos)")
+        return [filas[uid] for uid in uids]
+
+    # ---------- Eventos ----------
+
+    def _eventos(self, opts, sensores, desde, hasta):
+        total, lote = opts["eventos"], opts["lote"]
+        lotes = -(-total // lote)
+
+        clave = "|".join(str(v) for v in (
+            opts["prefijo"], opts["seed"], opts["sensores"], total, lote, desde.isoformat(), hasta.isoformat(),
+        ))
+        nombre = f"generar_datos:{hashlib.blake2b(clave.encode(), digest_size=8).hexdigest()}"
+        marca, _ = MarcaProceso.objects.get_or_create(nombre=nombre)
+        if marca.valor >= lotes:
+            self.stdout.write(f"Los {total} eventos ya estaban generados ({nombre}).")
+            return
+        if marca.valor:
+            self.stdout.write(f"Retomando desde el lote {marca.valor} de {lotes} ({nombre}).")
+
+        generador = _Generador(opts["seed"], sensores, desde, hasta, total)
+        tabla = connection.ops.quote_name(EventoAcceso._meta.db_table)
+        columnas = ", ".join(connection.ops.quote_name(c) for c in COLUMNAS_EVENTO)
+        fila_sql = f"({', '.join(['%s'] * len(COLUMNAS_EVENTO))})"
+
+        inicio, hechos = time.monotonic(), 0
+        for n in range(marca.valor, lotes):
+            filas = generador.lote(n * lote, min((n + 1) * lote, total))
+            with transaction.atomic(), connection.cursor() as cursor:
+                for i in range(0, len(filas), FILAS_POR_INSERT):
+                    parte = filas[i:i + FILAS_POR_INSERT]
+                    cursor.execute(
+                        f"INSERT INTO {tabla} ({columnas}) VALUES {', '.join([fila_sql] * len(parte))}",
+                        [valor for fila in parte for valor in fila],
+                    )
+                # la marca avanza en la misma transacción que el lote
+                MarcaProceso.objects.filter(pk=marca.pk).update(valor=n + 1, actualizado_en=timezone.now())
+
+            hechos += len(filas)
+            segundos = time.monotonic() - inicio
+            restantes = total - min((n + 1) * lote, total)
+            velocidad = hechos / segundos if segundos else 0
+            self.stdout.write(
+                f"  lote {n + 1}/{lotes}: {min((n + 1) * lote, total)} eventos, "
+                f"{velocidad:,.0f} filas/s, ~{restantes / velocidad if velocidad else 0:,.0f} s restantes"
+            )
+
+
+class _Generador:
+    """
+    Eventos como función del índice global: el lote n se genera siempre
+    igual (semilla "seed:n") sin depender de los anteriores, lo que permite
+    retomar. La hora del evento i sale de invertir la distribución
+    acumulada de afluencia por hora, así los ids crecen con fecha_hora.
+    """
+
+    def __init__(self, seed, sensores, desde, hasta, total):
+        self.seed, self.total, self.desde = seed, total, desde
+        rng = random.Random(f"{seed}:calendario")
+
+        # afluencia por hora del período, con variación diaria
+        pesos, dia_actual, factor = [], None, 1.0
+        hora = desde
+        while hora < hasta:
+            local = timezone.localtime(hora)
+            if local.date() != dia_actual:
+                dia_actual, factor = local.date(), rng.uniform(0.8, 1.2)
+            pesos.append(PERFIL_HORA[local.hour] * PESO_DIA[local.weekday()] * factor)
+            hora += timedelta(hours=1)
+        self.pesos = pesos
+        self.acumulado = list(accumulate(pesos))
+
+        # popularidad tipo Zipf; las tarjetas no activas se usan poco
+        orden = list(range(len(sensores)))
+        rng.shuffle(orden)
+        popularidad = [0.0] * len(sensores)
+        for rango, i in enumerate(orden, start=1):
+            popularidad[i] = rango ** -0.8 * (1.0 if sensores[i][3] == "ACTIVO" else 0.1)
+        self.sensores = sensores
+        self.popularidad = list(accumulate(popularidad))
+
+        # ráfagas de denegaciones: una tarjeta no activa insistiendo
+        # durante 5-30 min, en ~1 de cada 3 días
+        denegados = [s for s in sensores if s[3] in Sensor.ESTADOS_DENEGADOS]
+        self.rafagas = []
+        if denegados:
+            for dia in range(len(pesos) // 24):
+                if rng.random() < 0.35:
+                    comienzo = dia * 24 + rng.choices(range(24), PERFIL_HORA)[0] + rng.random()
+                    self.rafagas.append((comienzo, comienzo + rng.uniform(5, 30) / 60, rng.choice(denegados)))
+        self.inicio_rafagas = [r[0] for r in self.rafagas]
+
+    def _hora(self, q):
+        """Horas (float) desde `desde` para el cuantil q de la afluencia."""
+        bin_ = min(bisect_right(self.acumulado, q), len(self.pesos) - 1)
+        previo = self.acumulado[bin_ - 1] if bin_ else 0.0
+        return bin_ + (q - previo) / self.pesos[bin_]
+
+    def lote(self, primero, ultimo):
+        rng = random.Random(f"{self.seed}:{primero}")
+        escala = self.acumulado[-1] / self.total
+        adaptar = connection.ops.adapt_datetimefield_value
+        filas = []
+        for i in range(primero, ultimo):
+            horas = self._hora((i + rng.random()) * escala)
+
+            sensor = None
+            r = bisect_right(self.inicio_rafagas, horas) - 1
+            if r >= 0 and horas < self.rafagas[r][1] and rng.random() < 0.7:
+                sensor = self.rafagas[r][2]
+            if sensor is None:
+                sensor = self.sensores[bisect_right(self.popularidad, rng.random() * self.popularidad[-1])]
+
+            pk, departamento_id, usuario_id, estado = sensor
+            filas.append((
+                pk, usuario_id, departamento_id,
+                "INTENTO",
+                "ABRIR" if rng.random() < 0.9 else "CERRAR",
+                "DENEGADO" if estado in Sensor.ESTADOS_DENEGADOS else "PERMITIDO",
+                "",
+                adaptar(self.desde + timedelta(hours=horas)),
+            ))
+        return filas
@@ -121,7 +121,7 @@ class Command(BaseCommand):
         # ==================================
         barrera, created = Barrera.objects.get_or_create(
             id=1,
-            defaults={"estado": "CERRADA"}
+            defaults={"estado": "CERRADA", "departamento": zona_objs[0]}
         )
         self.stdout.write(f"Barrera inicial: {'CREADA' if created else 'EXISTE'}")
 
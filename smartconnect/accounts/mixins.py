@@ -1,6 +1,31 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from .models import UsuarioApp
+from smartconnect import versiones
+from .models import UserPerfil, UsuarioApp
+
+# [user_id, active_asignacion_id, versión de perfiles, rol] del último rol
+# resuelto en la sesión
+SESION_ROL = "_rol_vigente"
+
+
+def rol_de_sesion(request):
+    """
+    Rol del usuario cacheado en la sesión. La asignación vigente hace de
+    versión: si cambió (UsuarioForm.save crea una nueva), se vuelve a
+    resolver; comparar active_asignacion_id no requiere consultas. Renombrar
+    un perfil no cambia la asignación, así que también se compara la versión
+    de UserPerfil (en la caché, sin tocar la BD).
+    """
+    user = request.user
+    clave = [user.pk, user.active_asignacion_id, versiones.version(UserPerfil._meta.label_lower)]
+    guardado = request.session.get(SESION_ROL)
+    if guardado and guardado[:3] == clave:
+        return guardado[3]
+
+    rol = user.rol
+    request.session[SESION_ROL] = [*clave, rol]
+    return rol
+
 
 class RolRequeridoMixin(LoginRequiredMixin):
     roles_permitidos = None  # lista de strings, ej: ['ADMIN']
@@ -10,7 +35,7 @@ class RolRequeridoMixin(LoginRequiredMixin):
             return self.handle_no_permission()
 
         if self.roles_permitidos is not None:
-            rol_usuario = getattr(request.user, 'rol', None)
+            rol_usuario = rol_de_sesion(request)
             if rol_usuario not in self.roles_permitidos:
                 raise PermissionDenied("No tienes permiso para acceder a esta vista.")
         return super().dispatch(request, *args, **kwargs)
@@ -1,3 +1,221 @@
-from django.test import TestCase
+import io
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Max, Min
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from sensores.models import Barrera, EventoAcceso, Sensor
+from smartconnect import versiones
+from zonas.models import Departamento
+
+from . import intentos
+from .management.commands.generar_datos import _Generador
+from .mixins import SESION_ROL
+from .models import UserPerfil, UserPerfilAsignacion, UsuarioApp
+
+
+def crear_usuario(email, rol):
+    usuario = UsuarioApp.objects.create(email=email, name=email.split("@")[0], is_active=True)
+    perfil, _ = UserPerfil.objects.get_or_create(nombre=rol)
+    usuario.active_asignacion = UserPerfilAsignacion.objects.create(user=usuario, perfil=perfil)
+    usuario.save(update_fields=["active_asignacion"])
+    return usuario
+
+
+class RolEnSesionTests(TestCase):
+    # consultas con la sesión ya cacheando el rol: sesión + usuario + vista
+    # (los listados paginados suman el COUNT)
+    CONSULTAS = {
+        "usuario_list": 4,
+        "usuario_create": 3,
+        "departamento_list": 3,
+        "departamento_create": 2,
+        "sensor_list": 5,
+        "sensor_create": 4,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario("admin@smartconnect.cl", UsuarioApp.ROL_ADMIN)
+        departamento = Departamento.objects.create(nombre="Bodega")
+        Sensor.objects.create(uid="ABCD1234", departamento=departamento)
+        self.client.force_login(self.admin)
+
+    def test_vistas_protegidas_en_consultas_fijas(self):
+        for nombre, consultas in self.CONSULTAS.items():
+            url = reverse(nombre)
+            with self.subTest(vista=nombre):
+                self.client.get(url)  # primera visita: resuelve y guarda el rol
+                with self.assertNumQueries(consultas):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_rol_se_guarda_con_la_asignacion(self):
+        self.client.get(reverse("sensor_list"))
+        self.assertEqual(
+            self.client.session[SESION_ROL],
+            [
+                self.admin.pk, self.admin.active_asignacion_id,
+                versiones.version(UserPerfil._meta.label_lower), UsuarioApp.ROL_ADMIN,
+            ],
+        )
+
+    def test_cambio_de_asignacion_se_refleja(self):
+        self.assertEqual(self.client.get(reverse("usuario_list")).status_code, 200)
+
+        self.admin.active_asignacion.finalizar()
+        operador, _ = UserPerfil.objects.get_or_create(nombre=UsuarioApp.ROL_OPERADOR)
+        self.admin.active_asignacion = UserPerfilAsignacion.objects.create(
+            user=self.admin, perfil=operador,
+        )
+        self.admin.save(update_fields=["active_asignacion"])
+
+        self.assertEqual(self.client.get(reverse("usuario_list")).status_code, 403)
+        self.assertEqual(self.client.get(reverse("sensor_list")).status_code, 200)
+
+    def test_renombrar_el_perfil_se_refleja(self):
+        self.assertEqual(self.client.get(reverse("usuario_list")).status_code, 200)
+
+        perfil = self.admin.active_asignacion.perfil
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.nombre = UsuarioApp.ROL_OPERADOR
+            perfil.save()
+
+        self.assertEqual(self.client.get(reverse("usuario_list")).status_code, 403)
+
+
+class UsuarioListViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario("admin@smartconnect.cl", UsuarioApp.ROL_ADMIN)
+        self.client.force_login(self.admin)
+        self.client.get(reverse("usuario_list"))
+
+    def test_consultas_constantes_con_el_tamano_de_la_tabla(self):
+        # sesión + usuario + COUNT + página (con perfil en el mismo JOIN)
+        with self.assertNumQueries(4):
+            self.client.get(reverse("usuario_list"))
+
+        for i in range(60):
+            crear_usuario(f"operador{i:02d}@smartconnect.cl", UsuarioApp.ROL_OPERADOR)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("usuario_list"))
+        self.assertEqual(len(response.context["usuarios"]), 50)
+        self.assertContains(response, UsuarioApp.ROL_OPERADOR)
+
+    def test_busqueda_por_prefijo_de_email(self):
+        crear_usuario("operador@smartconnect.cl", UsuarioApp.ROL_OPERADOR)
+        crear_usuario("bodega@smartconnect.cl", UsuarioApp.ROL_OPERADOR)
+        response = self.client.get(reverse("usuario_list"), {"q": "Oper"})
+        self.assertEqual(
+            [u.email for u in response.context["usuarios"]],
+            ["operador@smartconnect.cl"],
+        )
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class IntentosLoginTests(TestCase):
+    CLAVE = "clave-correcta-123"
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario("guardia@smartconnect.cl", UsuarioApp.ROL_OPERADOR)
+        self.usuario.set_password(self.CLAVE)
+        self.usuario.save()
+        self.request = RequestFactory().post("/login/", REMOTE_ADDR="10.0.0.1")
+
+    def login(self, password, email="guardia@smartconnect.cl"):
+        return authenticate(self.request, username=email, password=password)
+
+    def test_bloquea_al_superar_el_maximo(self):
+        # EmailBackend corta la cadena: ModelBackend no vuelve a hashear
+        with mock.patch.object(ModelBackend, "authenticate") as model_backend:
+            for _ in range(intentos.MAX_EMAIL - 1):
+                self.assertIsNone(self.login("incorrecta"))
+            self.usuario.refresh_from_db()
+            self.assertIsNone(self.usuario.locked_until)
+
+            self.assertIsNone(self.login("incorrecta"))
+        model_backend.assert_not_called()
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.is_locked())
+
+        # bloqueado: se rechaza sin consultar ni hashear, aun con la clave correcta
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.login(self.CLAVE))
+
+    def test_login_correcto_descarta_los_fallos(self):
+        for _ in range(intentos.MAX_EMAIL - 1):
+            self.login("incorrecta")
+        self.assertEqual(self.login(self.CLAVE), self.usuario)
+
+        for _ in range(intentos.MAX_EMAIL - 1):
+            self.login("incorrecta")
+        self.usuario.refresh_from_db()
+        self.assertIsNone(self.usuario.locked_until)
+
+    def test_bloqueo_por_ip(self):
+        with mock.patch.object(intentos, "MAX_IP", 3):
+            for i in range(3):
+                self.login("incorrecta", email=f"desconocido{i}@smartconnect.cl")
+            self.assertGreater(intentos.segundos_bloqueo("otro@smartconnect.cl", "10.0.0.1"), 0)
+            self.assertEqual(intentos.segundos_bloqueo("otro@smartconnect.cl", "10.0.0.2"), 0)
+
+    def test_sesion_iniciada_con_model_backend_sigue_valida(self):
+        self.client.force_login(self.usuario, backend="django.contrib.auth.backends.ModelBackend")
+        self.assertEqual(self.client.get(reverse("sensor_list")).status_code, 200)
+
+
+class GenerarDatosTests(TestCase):
+    opciones = dict(
+        departamentos=2, sensores=20, usuarios=5, eventos=250, dias=3, lote=100,
+        hasta="2025-01-01", prefijo="test",
+    )
+
+    def generar(self):
+        call_command("generar_datos", stdout=io.StringIO(), **self.opciones)
+
+    def assertConteos(self):
+        self.assertEqual(Departamento.objects.filter(nombre__startswith="test ").count(), 2)
+        self.assertEqual(Barrera.objects.count(), 2)
+        self.assertEqual(UsuarioApp.objects.filter(email__startswith="test").count(), 5)
+        self.assertEqual(Sensor.objects.filter(uid__startswith="TEST").count(), 20)
+        self.assertEqual(EventoAcceso.objects.count(), 250)
+
+    def test_genera_los_conteos_pedidos(self):
+        self.generar()
+        self.assertConteos()
+
+        fechas = EventoAcceso.objects.aggregate(desde=Min("fecha_hora"), hasta=Max("fecha_hora"))
+        hasta = timezone.make_aware(datetime(2025, 1, 1))
+        self.assertGreaterEqual(fechas["desde"], hasta - timedelta(days=3))
+        self.assertLess(fechas["hasta"], hasta)
+        self.assertEqual(
+            UsuarioApp.objects.filter(email__startswith="test", active_asignacion__isnull=True).count(), 0
+        )
+
+    def test_segunda_ejecucion_retoma_sin_duplicar(self):
+        lote = _Generador.lote
+
+        def falla_en_el_tercer_lote(generador, primero, ultimo):
+            if primero >= 200:
+                raise RuntimeError("interrumpido")
+            return lote(generador, primero, ultimo)
+
+        with mock.patch.object(_Generador, "lote", falla_en_el_tercer_lote):
+            with self.assertRaises(RuntimeError):
+                self.generar()
+        self.assertEqual(EventoAcceso.objects.count(), 200)
+
+        self.generar()
+        self.assertConteos()
+        self.generar()
+        self.assertConteos()
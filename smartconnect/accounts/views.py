@@ -41,6 +41,25 @@ class UsuarioListView(RolRequeridoMixin, ListView):
     template_name = "accounts/usuario_list.html"
     context_object_name = "usuarios"
     roles_permitidos = [UsuarioApp.ROL_ADMIN]
+    paginate_by = 50
+
+    def get_queryset(self):
+        queryset = (
+            UsuarioApp.objects
+            .select_related("active_asignacion__perfil")
+            .only("email", "name", "is_active", "active_asignacion__perfil__nombre")
+            .order_by("email")
+        )
+        self.q = self.request.GET.get("q", "").strip()
+        if self.q:
+            # prefijo: usa el índice único de email
+            queryset = queryset.filter(email__istartswith=self.q)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["q"] = self.q
+        return ctx
 
 
 class UsuarioCreateView(RolRequeridoMixin, CreateView):
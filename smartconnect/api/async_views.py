@@ -0,0 +1,219 @@
+"""
+Versiones async nativas de los endpoints que usan los dispositivos.
+
+Bajo ASGI las vistas DRF son síncronas y cada request salta a un hilo vía
+sync_to_async; estas vistas usan el ORM async de Django (aget / acreate)
+y una autenticación JWT async, de modo que un worker ASGI puede mantener
+miles de conexiones lentas abiertas sin ocupar un hilo por cada una.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from sensores.models import Sensor, Barrera
+from sensores.cache import aobtener_autorizacion
+from sensores.buffer import aregistrar_evento
+from sensores.desconocidos import aregistrar_desconocido
+from .authentication import UsuarioTokenAuthentication
+from .serializers import EventoCreateSerializer
+from .stream import broker, formato_sse, publicar_barrera
+
+
+def _leer_json(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def autenticar_jwt(request, raw_token=None):
+    """
+    Equivalente async de UsuarioTokenAuthentication: valida el Bearer token
+    (o raw_token si se entrega) y resuelve el usuario desde el snapshot
+    cacheado. Devuelve None si no hay credenciales válidas.
+    """
+    if raw_token is None:
+        header = request.headers.get("Authorization", "").split()
+        if len(header) != 2 or header[0] not in jwt_settings.AUTH_HEADER_TYPES:
+            return None
+        raw_token = header[1]
+
+    try:
+        token = AccessToken(raw_token)
+        return await UsuarioTokenAuthentication().aget_user(token)
+    except (TokenError, AuthenticationFailed, InvalidToken):
+        return None
+
+
+class _EventoCreateAsyncSerializer(EventoCreateSerializer):
+    # solo validación de campos; el sensor se resuelve con el ORM async
+    def validate(self, data):
+        return data
+
+
+# ---------- POST /api/async/acceso/ ----------
+
+@csrf_exempt
+@require_POST
+async def intento_acceso_uid(request):
+    data = _leer_json(request)
+    if data is None:
+        return JsonResponse({"detail": "JSON inválido."}, status=400)
+
+    uid = data.get("uid")
+    if not uid:
+        return JsonResponse({
+            "detail": "Error de validación.",
+            "errors": {"uid": "Este campo es requerido."},
+        }, status=400)
+
+    sensor = await aobtener_autorizacion(uid)
+    if sensor is None:
+        await aregistrar_desconocido(uid)
+        return JsonResponse(
+            {"resultado": "DENEGADO", "detalle": "UID no válido"}, status=404
+        )
+
+    if sensor.estado in Sensor.ESTADOS_DENEGADOS:
+        await aregistrar_evento(
+            sensor_id=sensor.id,
+            usuario_id=sensor.usuario_id,
+            departamento_id=sensor.departamento_id,
+            tipo='INTENTO',
+            accion='INTENTO',
+            resultado='DENEGADO',
+            detalle=f"Sensor en estado {sensor.estado}",
+        )
+        return JsonResponse(
+            {"resultado": "DENEGADO", "detalle": "Sensor no autorizado"}, status=403
+        )
+
+    await aregistrar_evento(
+        sensor_id=sensor.id,
+        usuario_id=sensor.usuario_id,
+        departamento_id=sensor.departamento_id,
+        tipo='INTENTO',
+        accion='INTENTO',
+        resultado='PERMITIDO',
+        detalle='Acceso concedido',
+    )
+    return JsonResponse(
+        {"resultado": "PERMITIDO", "detalle": "Acceso autorizado"}, status=200
+    )
+
+
+# ---------- POST /api/async/eventos/ (equivalente a EventoCreateAPI) ----------
+
+@csrf_exempt
+@require_POST
+async def evento_create(request):
+    if await autenticar_jwt(request) is None:
+        return _no_autenticado()
+
+    data = _leer_json(request)
+    if data is None:
+        return JsonResponse({"detail": "JSON inválido."}, status=400)
+
+    serializer = _EventoCreateAsyncSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    datos = serializer.validated_data
+
+    try:
+        sensor = await Sensor.objects.aget(uid=datos["uid"])
+    except Sensor.DoesNotExist:
+        return JsonResponse({"uid": ["Sensor no encontrado"]}, status=400)
+
+    barreras = Barrera.objects.de_departamento(sensor.departamento_id)
+    if sensor.estado in Sensor.ESTADOS_DENEGADOS:
+        resultado = "DENEGADO"
+        barrera_estado = await barreras.values_list("estado", flat=True).afirst()
+    else:
+        resultado = "PERMITIDO"
+        barrera_estado = Barrera.ESTADO_POR_ACCION[datos["accion"]]
+        if await barreras.atransicionar(barrera_estado):
+            await sync_to_async(publicar_barrera)(sensor.departamento_id, barrera_estado)
+        elif not await barreras.aexists():
+            barrera_estado = None
+
+    evento = await aregistrar_evento(
+        sensor_id=sensor.id,
+        usuario_id=sensor.usuario_id,
+        departamento_id=sensor.departamento_id,
+        tipo=datos["tipo"],
+        accion=datos["accion"],
+        resultado=resultado,
+        detalle=datos.get("detalle", ""),
+    )
+
+    return JsonResponse({
+        "mensaje": "Evento procesado correctamente",
+        "sensor": sensor.uid,
+        "resultado": evento.resultado,
+        "accion": evento.accion,
+        "tipo": evento.tipo,
+        "barrera_estado": barrera_estado or "SIN_BARRERA",
+        "fecha": evento.fecha_hora,
+    }, status=201)
+
+
+# ---------- GET /api/stream/ (Server-Sent Events) ----------
+
+def _no_autenticado():
+    response = JsonResponse({"detail": "Autenticación requerida."}, status=401)
+    response["WWW-Authenticate"] = f'{jwt_settings.AUTH_HEADER_TYPES[0]} realm="api"'
+    return response
+
+
+@require_GET
+async def stream(request):
+    """
+    Cambios de barrera y nuevos EventoAcceso en tiempo real.
+    ?departamento= filtra por zona; Last-Event-ID (o ?ultimo_id=) reanuda
+    desde el último mensaje recibido. EventSource no permite cabeceras,
+    por eso también se acepta ?token= o la sesión del panel web.
+    """
+    usuario = await autenticar_jwt(request, request.GET.get("token"))
+    if usuario is None:
+        usuario = await request.auser()
+        if not usuario.is_authenticated:
+            return _no_autenticado()
+
+    try:
+        departamento_id = int(request.GET["departamento"]) if request.GET.get("departamento") else None
+    except ValueError:
+        return JsonResponse({"detail": "departamento debe ser un entero."}, status=400)
+
+    ultimo_id = request.headers.get("Last-Event-ID") or request.GET.get("ultimo_id")
+    heartbeat = getattr(settings, "STREAM", {}).get("HEARTBEAT", 15)
+    suscripcion = broker.suscribir(departamento_id, ultimo_id)
+
+    async def mensajes():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    mensaje = await suscripcion.siguiente(heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if mensaje is None:
+                    break
+                yield formato_sse(mensaje)
+        finally:
+            suscripcion.cerrar()
+
+    response = StreamingHttpResponse(mensajes(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
@@ -0,0 +1,149 @@
+"""
+Autenticación JWT sin cargar el usuario en cada request.
+
+El token de login lleva el rol vigente y el id de la asignación de perfil
+(claims "rol" y "asignacion") para los clientes; la autorización usa
+siempre el rol del snapshot vigente, que ya está en memoria, de modo que
+renombrar un perfil o cambiar la asignación se refleja sin esperar a que
+el token expire.
+
+El estado vigente del usuario (UsuarioSnapshot) se resuelve en dos niveles:
+1. usuario_cache: LRU + TTL por proceso, sin red ni BD.
+2. caché de Django (compartida entre workers).
+Guardar el usuario o su asignación invalida ambos niveles en el proceso
+que escribe y el nivel compartido para todos; en los demás procesos el
+dato puede quedar obsoleto como máximo JWT_USUARIO_CACHE["TTL"] segundos.
+"""
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from smartconnect.cache import LRUTTLCache
+
+CLAIM_ROL = "rol"
+CLAIM_ASIGNACION = "asignacion"
+
+
+class UsuarioSnapshot(NamedTuple):
+    id: int
+    is_active: bool
+    locked_until: object  # datetime | None
+    asignacion_id: int | None
+    rol: str | None
+
+
+_config = getattr(settings, "JWT_USUARIO_CACHE", {})
+
+# user_id -> UsuarioSnapshot (por proceso)
+usuario_cache = LRUTTLCache(
+    max_size=_config.get("MAX_SIZE", 10_000),
+    ttl=_config.get("TTL", 10),
+)
+
+
+def _clave(user_id):
+    return f"usuario:{user_id}:acceso"
+
+
+def _consultar(user_id):
+    fila = (
+        get_user_model().objects
+        .filter(**{jwt_settings.USER_ID_FIELD: user_id})
+        .values_list(
+            "pk", "is_active", "locked_until",
+            "active_asignacion_id", "active_asignacion__perfil__nombre",
+        )
+        .first()
+    )
+    return UsuarioSnapshot(*fila) if fila else None
+
+
+def obtener_usuario(user_id):
+    """Snapshot vigente del usuario, o None si no existe."""
+    snapshot = usuario_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = cache.get(_clave(user_id))
+    if snapshot is None:
+        snapshot = _consultar(user_id)
+        if snapshot is None:
+            return None
+        cache.set(_clave(user_id), tuple(snapshot), _config.get("SHARED_TTL", 300))
+    snapshot = UsuarioSnapshot(*snapshot)
+    usuario_cache.set(user_id, snapshot)
+    return snapshot
+
+
+async def aobtener_usuario(user_id):
+    """Versión async de obtener_usuario; solo sale del event loop si hay fallo de caché."""
+    snapshot = usuario_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    return await sync_to_async(obtener_usuario)(user_id)
+
+
+def invalidar_usuario(*user_ids):
+    """Descarta el snapshot al confirmarse la transacción en curso."""
+    def invalidar():
+        usuario_cache.invalidate(*user_ids)
+        cache.delete_many([_clave(i) for i in user_ids])
+
+    transaction.on_commit(invalidar)
+
+
+class UsuarioToken(TokenUser):
+    """Usuario construido desde el token; expone el rol vigente."""
+
+    def __init__(self, token, rol):
+        super().__init__(token)
+        self._rol = rol
+
+    @property
+    def rol(self):
+        return self._rol
+
+
+def usuario_desde_token(validated_token, snapshot):
+    """Valida el snapshot y arma el UsuarioToken; lanza AuthenticationFailed."""
+    if snapshot is None:
+        raise AuthenticationFailed("Usuario no encontrado.", code="user_not_found")
+    if not snapshot.is_active:
+        raise AuthenticationFailed("Usuario inactivo.", code="user_inactive")
+    if snapshot.locked_until and timezone.now() < snapshot.locked_until:
+        raise AuthenticationFailed("Cuenta bloqueada temporalmente.", code="user_locked")
+
+    # vale el rol vigente, no el del token: el claim queda obsoleto si el
+    # perfil se renombra o la asignación cambia
+    return UsuarioToken(validated_token, snapshot.rol)
+
+
+def _user_id(validated_token):
+    try:
+        return validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("El token no contiene identificación de usuario.")
+
+
+class UsuarioTokenAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que no instancia el usuario: valida el estado y toma
+    el rol del snapshot vigente y devuelve un UsuarioToken.
+    """
+
+    def get_user(self, validated_token):
+        snapshot = obtener_usuario(_user_id(validated_token))
+        return usuario_desde_token(validated_token, snapshot)
+
+    async def aget_user(self, validated_token):
+        snapshot = await aobtener_usuario(_user_id(validated_token))
+        return usuario_desde_token(validated_token, snapshot)
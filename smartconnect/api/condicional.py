@@ -0,0 +1,78 @@
+"""
+GET condicional (ETag / If-None-Match) para los recursos que los paneles
+consultan una y otra vez.
+
+- Listado: el ETag sale del contador de versión del recurso (en caché) y
+  de los parámetros de la consulta; un 304 se responde sin tocar la BD.
+- Detalle: el ETag sale de actualizado_en del objeto (una consulta de una
+  columna, sin serializar).
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+from smartconnect import versiones
+
+
+def _coincide(request, etag):
+    cabecera = request.headers.get('If-None-Match')
+    if not cabecera:
+        return False
+    etags = parse_etags(cabecera)
+    return '*' in etags or etag in etags or f'W/{etag}' in etags
+
+
+def _huella_query(request):
+    # ?fields=, filtros y cursor cambian la representación
+    query = request.META.get('QUERY_STRING', '')
+    return hashlib.blake2b(query.encode(), digest_size=6).hexdigest()
+
+
+class ETagMixin:
+    """ETag + 304 en list / retrieve; el recurso es el modelo del queryset."""
+
+    def _recurso(self):
+        return self.queryset.model._meta.label_lower
+
+    def _responder(self, request, etag, vista, *args, **kwargs):
+        if _coincide(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = vista(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        # el cliente puede guardar la respuesta pero debe revalidar siempre
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        # la versión se lee antes de consultar: si cambia durante la
+        # consulta, el ETag queda "viejo" y el cliente vuelve a pedir
+        recurso = self._recurso()
+        etag = quote_etag(
+            f"{recurso}-{versiones.version(recurso)}-{_huella_query(request)}"
+        )
+        return self._responder(request, etag, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            actualizado_en = (
+                self.queryset.model._default_manager
+                .filter(**{self.lookup_field: kwargs[lookup]})
+                .values_list('actualizado_en', flat=True)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            actualizado_en = None
+        if actualizado_en is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = quote_etag(
+            f"{kwargs[lookup]}-{actualizado_en.timestamp():.6f}-{_huella_query(request)}"
+        )
+        return self._responder(request, etag, super().retrieve, *args, **kwargs)
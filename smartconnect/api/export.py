@@ -0,0 +1,116 @@
+"""
+Exportación en streaming del historial de EventoAcceso (NDJSON / CSV).
+
+Las filas se leen como tuplas (values_list, sin instanciar modelos) en
+lotes por keyset sobre (fecha_hora, id): cada lote es una consulta
+acotada, así la memoria se mantiene plana también en MySQL, cuyo driver
+carga el resultado completo de una consulta aunque se use iterator().
+"""
+import csv
+import io
+import json
+import zlib
+
+from .pagination import despues_de
+
+ORDEN = ('fecha_hora', 'id')
+
+# (columna exportada, campo en values_list)
+COLUMNAS = (
+    ('id', 'id'),
+    ('fecha_hora', 'fecha_hora'),
+    ('sensor', 'sensor_id'),
+    ('sensor_uid', 'sensor__uid'),
+    ('usuario', 'usuario_id'),
+    ('usuario_email', 'usuario__email'),
+    ('departamento', 'departamento_id'),
+    ('tipo', 'tipo'),
+    ('accion', 'accion'),
+    ('resultado', 'resultado'),
+    ('detalle', 'detalle'),
+)
+
+FORMATOS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+# tamaño aproximado de cada bloque enviado al cliente
+_BLOQUE = 64 * 1024
+
+
+def filas(queryset, chunk_size=2000):
+    """Tuplas de COLUMNAS en orden cronológico, por lotes de chunk_size."""
+    campos = [campo for _, campo in COLUMNAS]
+    i_fecha, i_id = campos.index('fecha_hora'), campos.index('id')
+
+    queryset = queryset.order_by(*ORDEN).values_list(*campos)
+    posicion = None
+    while True:
+        lote = queryset if posicion is None else queryset.filter(despues_de(ORDEN, posicion))
+        n = 0
+        for fila in lote[:chunk_size].iterator(chunk_size=chunk_size):
+            n += 1
+            yield fila
+        if n < chunk_size:
+            return
+        posicion = (fila[i_fecha], fila[i_id])
+
+
+def _ndjson(filas):
+    nombres = [nombre for nombre, _ in COLUMNAS]
+    for fila in filas:
+        registro = dict(zip(nombres, fila))
+        registro['fecha_hora'] = registro['fecha_hora'].isoformat()
+        yield json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _csv(filas):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def volcar(fila):
+        writer.writerow(fila)
+        linea = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return linea
+
+    yield volcar([nombre for nombre, _ in COLUMNAS])
+    for fila in filas:
+        yield volcar(fila[:1] + (fila[1].isoformat(),) + fila[2:])
+
+
+def _en_bloques(lineas):
+    # agrupa líneas para no emitir un chunk HTTP por fila
+    partes, tamano = [], 0
+    for linea in lineas:
+        dato = linea.encode()
+        partes.append(dato)
+        tamano += len(dato)
+        if tamano >= _BLOQUE:
+            yield b''.join(partes)
+            partes, tamano = [], 0
+    if partes:
+        yield b''.join(partes)
+
+
+def _gzip(bloques):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> formato gzip
+    for bloque in bloques:
+        dato = compresor.compress(bloque)
+        if dato:
+            yield dato
+    yield compresor.flush()
+
+
+def exportar(queryset, formato='ndjson', comprimir=False, chunk_size=2000):
+    """Iterador de bytes listo para StreamingHttpResponse o un archivo."""
+    serializador = _csv if formato == 'csv' else _ndjson
+    bloques = _en_bloques(serializador(filas(queryset, chunk_size)))
+    return _gzip(bloques) if comprimir else bloques
+
+
+def nombre_archivo(formato, comprimir=False):
+    nombre = f"eventos.{FORMATOS[formato][1]}"
+    return f"{nombre}.gz" if comprimir else nombre
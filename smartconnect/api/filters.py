@@ -0,0 +1,54 @@
+from django.utils.dateparse import parse_datetime
+
+from .serializers import EventoFiltroSerializer
+
+# parámetro de query -> lookup sobre EventoAcceso
+EVENTO_LOOKUPS = {
+    'desde': 'fecha_hora__gte',
+    'hasta': 'fecha_hora__lt',
+    'sensor': 'sensor_id',
+    'usuario': 'usuario_id',
+    'departamento': 'departamento_id',
+    'resultado': 'resultado',
+    'tipo': 'tipo',
+}
+
+# orden estable del historial (respaldado por el índice de fecha_hora)
+EVENTO_ORDEN = ('-fecha_hora', '-id')
+
+
+def filtrar_eventos(queryset, params):
+    """
+    Aplica los filtros de ?desde=&hasta=&sensor=&usuario=&departamento=
+    &resultado=&tipo= sobre un queryset de EventoAcceso. Lanza
+    ValidationError (400) si algún parámetro es inválido.
+    """
+    serializer = EventoFiltroSerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+
+    filtros = {
+        EVENTO_LOOKUPS[campo]: valor
+        for campo, valor in serializer.validated_data.items()
+    }
+    return queryset.filter(**filtros)
+
+
+def filtrar_archivados(registros, params):
+    """
+    Mismos filtros que filtrar_eventos, aplicados en memoria sobre los
+    registros (dicts) de un mes archivado.
+    """
+    serializer = EventoFiltroSerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    filtros = dict(serializer.validated_data)
+    desde = filtros.pop('desde', None)
+    hasta = filtros.pop('hasta', None)
+
+    for registro in registros:
+        if any(registro[campo] != valor for campo, valor in filtros.items()):
+            continue
+        if desde or hasta:
+            fecha = parse_datetime(registro['fecha_hora'])
+            if (desde and fecha < desde) or (hasta and fecha >= hasta):
+                continue
+        yield registro
@@ -0,0 +1,154 @@
+"""
+Importación masiva de sensores desde CSV (alta o actualización por uid).
+
+El archivo se lee en streaming y se procesa por lotes:
+- departamentos (por nombre) y usuarios (por email) se buscan una sola vez
+  por valor distinto, todos los nuevos de un lote en una consulta;
+- cada fila se valida con SensorImportacionSerializer (reglas de
+  SensorSerializer), sin consultas;
+- las filas válidas se escriben con un bulk_create(update_conflicts=True)
+  por lote, y se emite sensores_modificados para cachés, filtro de uids,
+  lista de acceso offline y versiones (las invalidaciones se aplican al
+  confirmarse el lote, para que nadie vuelva a cachear la fila anterior).
+
+Columnas: uid, alias, estado, departamento, usuario. estado vacío = ACTIVO.
+"""
+import csv
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import UsuarioApp
+from sensores.models import Sensor
+from sensores.signals import sensores_modificados
+from zonas.models import Departamento
+
+from .serializers import SensorImportacionSerializer
+
+COLUMNAS = ('uid', 'alias', 'estado', 'departamento', 'usuario')
+OBLIGATORIAS = ('uid', 'departamento')
+CAMPOS_ACTUALIZADOS = ('alias', 'estado', 'departamento', 'usuario', 'actualizado_en')
+
+
+class Importacion:
+    """Avance y resultado de una importación."""
+
+    def __init__(self):
+        self.filas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []  # [(fila, {campo: [mensajes]})]
+
+    def resumen(self, con_errores=True):
+        datos = {
+            'filas': self.filas,
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'con_error': len(self.errores),
+        }
+        if con_errores:
+            datos['errores'] = [{'fila': fila, 'errores': e} for fila, e in self.errores]
+        return datos
+
+
+class _Referencias:
+    """nombre -> id de departamento y email -> id de usuario ya buscados."""
+
+    def __init__(self):
+        self.departamentos = {}
+        self.usuarios = {}
+        self._buscados = (set(), set())
+
+    def cargar(self, filas):
+        nombres = {f['departamento'] for f in filas} - self._buscados[0]
+        emails = {f['usuario'].lower() for f in filas if f['usuario']} - self._buscados[1]
+        if nombres:
+            self.departamentos.update(
+                Departamento.objects.filter(nombre__in=nombres).values_list('nombre', 'id')
+            )
+            self._buscados[0].update(nombres)
+        if emails:
+            self.usuarios.update(
+                (email.lower(), pk) for email, pk in
+                UsuarioApp.objects.filter(email__in=emails).values_list('email', 'id')
+            )
+            self._buscados[1].update(emails)
+
+    def contexto(self):
+        return {'departamentos': self.departamentos, 'usuarios': self.usuarios}
+
+
+def _fila(datos):
+    fila = {c: (datos.get(c) or '').strip() for c in COLUMNAS}
+    if not fila['estado']:
+        del fila['estado']  # default del modelo
+    return fila
+
+
+def importar(archivo, lote=1000, progreso=None):
+    """
+    Importa el CSV de `archivo` (texto). `progreso(importacion)` se llama
+    tras cada lote. Devuelve la Importacion con el detalle de errores por
+    fila (la fila 1 es el encabezado).
+    """
+    lector = csv.DictReader(archivo)
+    faltantes = [c for c in OBLIGATORIAS if c not in (lector.fieldnames or ())]
+    if faltantes:
+        raise ValidationError({'archivo': f"Faltan columnas: {', '.join(faltantes)}."})
+
+    importacion = Importacion()
+    referencias = _Referencias()
+    vistos = set()
+    filas = enumerate(lector, start=2)
+    while bloque := [(n, _fila(datos)) for n, datos in islice(filas, lote)]:
+        referencias.cargar([fila for _, fila in bloque])
+        sensores = []
+        for n, fila in bloque:
+            serializer = SensorImportacionSerializer(data=fila, context=referencias.contexto())
+            if not serializer.is_valid():
+                importacion.errores.append((n, serializer.errors))
+                continue
+            datos = serializer.validated_data
+            if datos['uid'] in vistos:
+                importacion.errores.append((n, {'uid': ["UID repetido en el archivo."]}))
+                continue
+            vistos.add(datos['uid'])
+            sensores.append(Sensor(
+                uid=datos['uid'],
+                alias=datos.get('alias', ''),
+                estado=datos.get('estado', 'ACTIVO'),
+                departamento_id=datos['departamento'],
+                usuario_id=datos.get('usuario'),
+            ))
+
+        if sensores:
+            _escribir(sensores, importacion)
+        importacion.filas += len(bloque)
+        if progreso:
+            progreso(importacion)
+    return importacion
+
+
+def _escribir(sensores, importacion):
+    with transaction.atomic():
+        anteriores = {
+            uid: (departamento_id, estado)
+            for uid, departamento_id, estado in Sensor.objects
+            .filter(uid__in=[s.uid for s in sensores])
+            .values_list('uid', 'departamento_id', 'estado')
+        }
+        Sensor.objects.bulk_create(
+            sensores,
+            update_conflicts=True,
+            unique_fields=['uid'],
+            update_fields=CAMPOS_ACTUALIZADOS,
+        )
+        # dentro de la transacción: los receptores difieren las
+        # invalidaciones de caché a transaction.on_commit
+        sensores_modificados.send(sender=Sensor, cambios=[
+            (s.uid, anteriores.get(s.uid), (s.departamento_id, s.estado)) for s in sensores
+        ])
+
+    importacion.actualizados += len(anteriores)
+    importacion.creados += len(sensores) - len(anteriores)
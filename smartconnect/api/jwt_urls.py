@@ -1,16 +1,50 @@
 # api/jwt_urls.py
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, Throttled
 from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+from accounts import intentos
+
+from .authentication import CLAIM_ROL, CLAIM_ASIGNACION
+
+
+class TokenConRolSerializer(TokenObtainPairSerializer):
+    """Agrega el rol vigente y su asignación como claims del token."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[CLAIM_ROL] = user.rol
+        token[CLAIM_ASIGNACION] = user.active_asignacion_id
+        return token
+
+    def _verificar_bloqueo(self, attrs):
+        espera = intentos.segundos_bloqueo(
+            attrs.get(self.username_field), intentos.ip_de(self.context.get("request"))
+        )
+        if espera:
+            raise Throttled(wait=espera, detail="Demasiados intentos fallidos.")
+
+    def validate(self, attrs):
+        # bloqueado: 429 sin llegar a authenticate() (ni al hash)
+        self._verificar_bloqueo(attrs)
+        try:
+            return super().validate(attrs)
+        except AuthenticationFailed:
+            self._verificar_bloqueo(attrs)
+            raise
+
 
 class LoginView(TokenObtainPairView):
     # Forzamos que este endpoint siempre permita acceso sin autenticación previa
     permission_classes = [AllowAny]
+    serializer_class = TokenConRolSerializer
 
 
 urlpatterns = [
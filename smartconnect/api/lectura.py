@@ -0,0 +1,182 @@
+"""
+Camino rápido de lectura para los listados grandes.
+
+En vez de instanciar EventoAcceso + Sensor + UsuarioApp por fila y pasar
+por el serializer, se piden las columnas con .values() (uid y email
+vienen del JOIN en la misma consulta) y se convierten con un mapeo de
+dicts. La salida es idéntica byte a byte a la del serializer.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+_fecha = serializers.DateTimeField()
+
+
+def _texto(valor):
+    return str(valor)
+
+
+class Mapeo:
+    """
+    Columnas de salida: (nombre, campo en .values(), conversión, omitir_si_nulo).
+    omitir_si_nulo reproduce el comportamiento del serializer con fuentes
+    'relacion.campo' de solo lectura: si la relación es NULL la clave no
+    aparece en la salida.
+    """
+
+    def __init__(self, *columnas):
+        self.columnas = columnas
+        self.nombres = tuple(nombre for nombre, _, _, _ in columnas)
+        self.campos = tuple(campo for _, campo, _, _ in columnas)
+
+    def subconjunto(self, nombres):
+        return Mapeo(*(c for c in self.columnas if c[0] in nombres))
+
+    def filas(self, queryset, extra=()):
+        """Filas .values(); `extra` agrega columnas internas (p.ej. las del cursor)."""
+        campos = self.campos + tuple(c for c in extra if c not in self.campos)
+        return queryset.values(*campos)
+
+    def restringir(self, queryset):
+        """
+        only() / select_related() con lo mínimo para serializar estas
+        columnas con el serializer (camino de detalle).
+        """
+        relaciones, campos = set(), []
+        for campo in self.campos:
+            if '__' in campo:
+                relaciones.add(campo.split('__')[0])
+                campos.append(campo)
+            elif campo.endswith('_id'):
+                campos.append(campo[:-3])
+            else:
+                campos.append(campo)
+        queryset = queryset.select_related(None)
+        if relaciones:
+            # select_related() sin argumentos seguiría todas las FK
+            queryset = queryset.select_related(*relaciones)
+        return queryset.only(*campos)
+
+    def representar(self, fila):
+        salida = {}
+        for nombre, campo, convertir, omitir_si_nulo in self.columnas:
+            valor = fila[campo]
+            if valor is None:
+                if omitir_si_nulo:
+                    continue
+                salida[nombre] = None
+            else:
+                salida[nombre] = convertir(valor) if convertir else valor
+        return salida
+
+    def representar_muchas(self, filas):
+        return [self.representar(fila) for fila in filas]
+
+
+# Mismo formato que EventoAccesoSerializer
+EVENTO = Mapeo(
+    ('id', 'id', None, False),
+    ('sensor', 'sensor_id', None, False),
+    ('sensor_uid', 'sensor__uid', _texto, True),
+    ('usuario', 'usuario_id', None, False),
+    ('usuario_email', 'usuario__email', _texto, True),
+    ('tipo', 'tipo', _texto, False),
+    ('accion', 'accion', _texto, False),
+    ('resultado', 'resultado', _texto, False),
+    ('detalle', 'detalle', _texto, False),
+    ('fecha_hora', 'fecha_hora', _fecha.to_representation, False),
+)
+
+# Mismo formato que DepartamentoSerializer
+DEPARTAMENTO = Mapeo(
+    ('id', 'id', None, False),
+    ('nombre', 'nombre', _texto, False),
+    ('descripcion', 'descripcion', _texto, False),
+    ('is_active', 'is_active', None, False),
+)
+
+# Mismo formato que SensorSerializer
+SENSOR = Mapeo(
+    ('id', 'id', None, False),
+    ('uid', 'uid', _texto, False),
+    ('alias', 'alias', _texto, False),
+    ('estado', 'estado', _texto, False),
+    ('departamento', 'departamento_id', None, False),
+    ('usuario', 'usuario_id', None, False),
+    ('creado_en', 'creado_en', _fecha.to_representation, False),
+    ('actualizado_en', 'actualizado_en', _fecha.to_representation, False),
+)
+
+
+class ListadoRapidoMixin:
+    """
+    Sirve `list` con el Mapeo de `mapeo_lectura` en lugar del serializer.
+    El resto de las acciones (detalle, escritura) no cambia.
+    """
+    mapeo_lectura = None
+
+    def get_mapeo(self):
+        return self.mapeo_lectura
+
+    def list(self, request, *args, **kwargs):
+        mapeo = self.get_mapeo()
+        # el paginador por cursor necesita sus columnas de orden en cada fila
+        orden = [campo.lstrip('-') for campo in getattr(self.paginator, 'ordering', ())]
+        queryset = mapeo.filas(self.filter_queryset(self.get_queryset()), extra=orden)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(mapeo.representar_muchas(page))
+        return Response(mapeo.representar_muchas(queryset))
+
+
+class CamposParcialesMixin:
+    """
+    ?fields=a,b / ?exclude=c en lecturas: recorta la respuesta y también la
+    consulta (columnas de .values() en el listado; only()/select_related
+    en el detalle). Requiere `mapeo_lectura` con todas las columnas.
+    """
+
+    def campos_pedidos(self):
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None
+        params = self.request.query_params
+        fields, exclude = params.get('fields'), params.get('exclude')
+        if not fields and not exclude:
+            return None
+
+        disponibles = self.mapeo_lectura.nombres
+        pedidos = [c for c in fields.split(',') if c] if fields else list(disponibles)
+        excluidos = {c for c in exclude.split(',') if c} if exclude else set()
+
+        desconocidos = (set(pedidos) | excluidos) - set(disponibles)
+        if desconocidos:
+            raise ValidationError({
+                'fields': f"Campos desconocidos: {', '.join(sorted(desconocidos))}."
+            })
+        campos = {c for c in pedidos if c not in excluidos}
+        if not campos:
+            raise ValidationError({'fields': "No quedan campos para mostrar."})
+        return campos
+
+    def get_mapeo(self):
+        campos = self.campos_pedidos()
+        mapeo = super().get_mapeo()
+        return mapeo if campos is None else mapeo.subconjunto(campos)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        campos = self.campos_pedidos()
+        if campos is not None and self.action == 'retrieve':
+            queryset = self.mapeo_lectura.subconjunto(campos).restringir(queryset)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        campos = self.campos_pedidos()
+        if campos is not None:
+            destino = getattr(serializer, 'child', serializer)
+            for nombre in set(destino.fields) - campos:
+                destino.fields.pop(nombre)
+        return serializer
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark del endpoint de acceso simulando dispositivos lentos. "
+        "Permite comparar el camino WSGI (gunicorn) con el async (ASGI), p.ej.:\n"
+        "  gunicorn smartconnect.wsgi -w 4 --threads 8 -b :8000\n"
+        "  gunicorn smartconnect.asgi -k uvicorn.workers.UvicornWorker -w 1 -b :8001\n"
+        "  manage.py bench_acceso --url http://127.0.0.1:8000/api/acceso/ "
+        "--url http://127.0.0.1:8001/api/async/acceso/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", required=True,
+                            help="URL a medir (repetible para comparar)")
+        parser.add_argument("--uid", default="A1B2C3D4")
+        parser.add_argument("--token", default="", help="JWT para endpoints protegidos")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--conexiones", type=int, default=500,
+                            help="conexiones simultáneas")
+        parser.add_argument("--lento", type=float, default=0.5,
+                            help="segundos que el 'dispositivo' tarda en enviar el body")
+
+    def handle(self, *args, **opts):
+        body = json.dumps({"uid": opts["uid"], "accion": "ABRIR"}).encode()
+
+        resultados = []
+        for url in opts["url"]:
+            self.stdout.write(f"Midiendo {url} ...")
+            resultados.append(
+                (url, asyncio.run(self._medir(url, body, opts)))
+            )
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'URL':<45} {'ok':>6} {'err':>6} {'req/s':>9} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for url, r in resultados:
+            self.stdout.write(
+                f"{url:<45} {r['ok']:>6} {r['errores']:>6} {r['rps']:>9.1f} "
+                f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f}"
+            )
+
+    async def _medir(self, url, body, opts):
+        partes = urlsplit(url)
+        if partes.scheme != "http":
+            raise CommandError("Solo se soporta http://")
+        host, port, path = partes.hostname, partes.port or 80, partes.path or "/"
+
+        cabeceras = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n"
+        )
+        if opts["token"]:
+            cabeceras += f"Authorization: Bearer {opts['token']}\r\n"
+        cabeceras = (cabeceras + "\r\n").encode()
+
+        semaforo = asyncio.Semaphore(opts["conexiones"])
+        latencias = []
+        errores = 0
+
+        async def una():
+            nonlocal errores
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    reader, writer = await asyncio.open_connection(host, port)
+                    writer.write(cabeceras)
+                    writer.write(body[: len(body) // 2])
+                    await writer.drain()
+                    # el dispositivo envía el resto del body con retraso
+                    await asyncio.sleep(opts["lento"])
+                    writer.write(body[len(body) // 2:])
+                    await writer.drain()
+
+                    estado = int((await reader.readline()).split()[1])
+                    await reader.read()
+                    writer.close()
+                except (OSError, IndexError, ValueError):
+                    errores += 1
+                    return
+
+                if estado >= 500:
+                    errores += 1
+                else:
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una() for _ in range(opts["requests"])))
+        total = time.perf_counter() - inicio
+
+        if len(latencias) >= 2:
+            cuantiles = statistics.quantiles(latencias, n=100)
+            p50, p95, p99 = cuantiles[49], cuantiles[94], cuantiles[98]
+        else:
+            p50 = p95 = p99 = latencias[0] if latencias else 0.0
+
+        return {
+            "ok": len(latencias),
+            "errores": errores,
+            "rps": len(latencias) / total if total else 0.0,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
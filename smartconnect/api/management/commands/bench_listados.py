@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from sensores.models import Sensor, EventoAcceso
+from api import lectura
+from api.serializers import EventoAccesoSerializer, SensorSerializer
+
+LISTADOS = {
+    "eventos": (
+        lambda: EventoAcceso.objects.select_related("sensor", "usuario").order_by("-fecha_hora", "-id"),
+        EventoAccesoSerializer,
+        lectura.EVENTO,
+    ),
+    "sensores": (
+        lambda: Sensor.objects.select_related("departamento", "usuario").order_by("id"),
+        SensorSerializer,
+        lectura.SENSOR,
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas/s del serializer DRF contra el camino rápido con .values() "
+        "sobre los datos existentes, y verifica que el JSON sea idéntico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listado", choices=sorted(LISTADOS), default="eventos")
+        parser.add_argument("--filas", type=int, default=500, help="filas por página simulada")
+        parser.add_argument("--repeticiones", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        queryset, serializer_class, mapeo = LISTADOS[opts["listado"]]
+        n = opts["filas"]
+        renderer = JSONRenderer()
+
+        def serializer():
+            return renderer.render(serializer_class(queryset()[:n], many=True).data)
+
+        def rapido():
+            return renderer.render(mapeo.representar_muchas(mapeo.filas(queryset())[:n]))
+
+        antes, despues = serializer(), rapido()
+        if antes != despues:
+            raise CommandError("La salida del camino rápido difiere de la del serializer.")
+        filas = len(mapeo.filas(queryset())[:n])
+        if not filas:
+            raise CommandError("No hay filas para medir.")
+
+        for nombre, funcion in (("serializer", serializer), ("values()", rapido)):
+            inicio = time.perf_counter()
+            for _ in range(opts["repeticiones"]):
+                funcion()
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(
+                f"{nombre:<12} {filas * opts['repeticiones'] / segundos:>12,.0f} filas/s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Salida idéntica ({len(antes)} bytes)."))
@@ -0,0 +1,70 @@
+import sys
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from sensores.models import EventoAcceso
+from api import export
+from api.filters import filtrar_eventos
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el historial de EventoAcceso en NDJSON o CSV sin cargarlo en memoria. "
+        "Ej: manage.py exportar_eventos --mes 2025-01 --formato csv --gzip "
+        "--salida eventos-2025-01.csv.gz"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mes", help="YYYY-MM; atajo para --desde/--hasta")
+        parser.add_argument("--desde", help="fecha/hora ISO (inclusive)")
+        parser.add_argument("--hasta", help="fecha/hora ISO (exclusiva)")
+        parser.add_argument("--sensor", type=int)
+        parser.add_argument("--usuario", type=int)
+        parser.add_argument("--departamento", type=int)
+        parser.add_argument("--resultado")
+        parser.add_argument("--tipo")
+        parser.add_argument("--formato", choices=sorted(export.FORMATOS), default="ndjson")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--salida", default="-", help="archivo de salida ('-' = stdout)")
+
+    def handle(self, *args, **opts):
+        params = {
+            campo: opts[campo]
+            for campo in ("desde", "hasta", "sensor", "usuario", "departamento", "resultado", "tipo")
+            if opts[campo] is not None
+        }
+        if opts["mes"]:
+            params.update(self._rango_mes(opts["mes"]))
+
+        try:
+            queryset = filtrar_eventos(EventoAcceso.objects.all(), params)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        bloques = export.exportar(queryset, opts["formato"], opts["gzip"], opts["chunk_size"])
+        if opts["salida"] == "-":
+            self._escribir(sys.stdout.buffer, bloques)
+        else:
+            with open(opts["salida"], "wb") as salida:
+                self._escribir(salida, bloques)
+            self.stderr.write(f"Exportado en {opts['salida']}")
+
+    def _escribir(self, salida, bloques):
+        for bloque in bloques:
+            salida.write(bloque)
+        salida.flush()
+
+    def _rango_mes(self, mes):
+        try:
+            inicio = date.fromisoformat(f"{mes}-01")
+        except ValueError:
+            raise CommandError("--mes debe tener el formato YYYY-MM.")
+        fin = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+        return {
+            "desde": timezone.make_aware(datetime.combine(inicio, time.min)).isoformat(),
+            "hasta": timezone.make_aware(datetime.combine(fin, time.min)).isoformat(),
+        }
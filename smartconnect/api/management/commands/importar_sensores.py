@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Da de alta o actualiza sensores desde un CSV con columnas "
+        "uid, alias, estado, departamento (nombre), usuario (email). "
+        "Ej: manage.py importar_sensores tarjetas-edificio-b.csv --lote 2000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument("--lote", type=int, default=1000)
+        parser.add_argument("--encoding", default="utf-8-sig")
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["archivo"], encoding=opts["encoding"], newline="") as archivo:
+                resultado = importacion.importar(archivo, opts["lote"], self._progreso)
+        except OSError as exc:
+            raise CommandError(exc)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        for fila, errores in resultado.errores:
+            detalle = "; ".join(
+                f"{campo}: {' '.join(str(m) for m in mensajes)}"
+                for campo, mensajes in errores.items()
+            )
+            self.stderr.write(f"fila {fila}: {detalle}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.creados} creados, {resultado.actualizados} actualizados, "
+            f"{len(resultado.errores)} filas con error"
+        ))
+
+    def _progreso(self, resultado):
+        self.stderr.write(
+            f"{resultado.filas} filas procesadas "
+            f"({resultado.creados} creados, {resultado.actualizados} actualizados, "
+            f"{len(resultado.errores)} con error)"
+        )
@@ -0,0 +1,129 @@
+"""
+Paginación por keyset (cursor) para los listados grandes.
+
+El cursor codifica los valores de las columnas de orden de la última fila
+entregada; la página siguiente se obtiene con WHERE (col1, col2) < (v1, v2)
+sobre el índice, por lo que una página profunda cuesta lo mismo que la
+primera (a diferencia de OFFSET).
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def despues_de(ordering, posicion):
+    """
+    Condición "filas posteriores a `posicion`" según `ordering`:
+    (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+    """
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(ordering, posicion):
+        nombre = campo.lstrip('-')
+        lookup = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{lookup}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación hacia adelante por las columnas de `ordering`. La última
+    columna debe ser única (normalmente el id) para que el orden sea total.
+    """
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        maximo = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+        try:
+            pedido = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(max(pedido, 1), maximo)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.siguiente = None
+
+        queryset = queryset.order_by(*self.ordering)
+        posicion = self.decode_cursor(request, queryset.model)
+        if posicion is not None:
+            queryset = queryset.filter(despues_de(self.ordering, posicion))
+
+        # una fila extra indica si hay página siguiente sin hacer COUNT(*)
+        filas = list(queryset[:self.page_size + 1])
+        if len(filas) > self.page_size:
+            filas = filas[:self.page_size]
+            ultima = filas[-1]
+            self.siguiente = [
+                # filas de modelo o dicts de .values()
+                ultima[nombre] if isinstance(ultima, dict) else getattr(ultima, nombre)
+                for nombre in (campo.lstrip('-') for campo in self.ordering)
+            ]
+        return filas
+
+    # ---------- Cursor opaco ----------
+
+    def encode_cursor(self, valores):
+        crudo = json.dumps(
+            [v.isoformat() if hasattr(v, 'isoformat') else v for v in valores],
+            separators=(',', ':'),
+        )
+        return urlsafe_b64encode(crudo.encode()).decode()
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            valores = json.loads(urlsafe_b64decode(cursor.encode()))
+            if not isinstance(valores, list) or len(valores) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(self.ordering, valores)
+            ]
+        except (Base64Error, ValueError, TypeError, ValidationError) as exc:
+            raise NotFound('Cursor inválido.') from exc
+
+    def get_next_link(self):
+        if self.siguiente is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.siguiente))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class EventoPagination(KeysetPagination):
+    ordering = ('-fecha_hora', '-id')
+
+
+class SensorPagination(KeysetPagination):
+    ordering = ('id',)
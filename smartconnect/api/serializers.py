@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from zonas.models import Departamento
-from sensores.models import Sensor, Barrera, EventoAcceso
+from sensores.models import Sensor, Barrera, EventoAcceso, IntentoDesconocido
+from sensores.buffer import registrar_evento
+from .stream import publicar_barrera
 
 
 # ---------- Departamento / Zona ----------
@@ -61,12 +65,72 @@ class SensorSerializer(serializers.ModelSerializer):
         return data
 
 
+class SensorImportacionSerializer(SensorSerializer):
+    """
+    Fila del CSV de importación: mismas reglas que SensorSerializer, pero
+    departamento (nombre) y usuario (email) se resuelven contra los dicts
+    precargados en el contexto, sin una consulta por fila.
+    """
+    departamento = serializers.CharField(max_length=100)
+    usuario = serializers.EmailField(required=False, allow_blank=True)
+
+    class Meta(SensorSerializer.Meta):
+        fields = ['uid', 'alias', 'estado', 'departamento', 'usuario']
+        # upsert por uid: que ya exista no es un error
+        extra_kwargs = {'uid': {'validators': []}}
+
+    def validate_departamento(self, value):
+        try:
+            return self.context['departamentos'][value]
+        except KeyError:
+            raise serializers.ValidationError("Departamento no encontrado.")
+
+    def validate_usuario(self, value):
+        if not value:
+            return None
+        try:
+            return self.context['usuarios'][value.lower()]
+        except KeyError:
+            raise serializers.ValidationError("Usuario no encontrado.")
+
+
+class CambioEstadoMasivoSerializer(serializers.Serializer):
+    """Filtro (departamento, usuario, uids; se combinan) y estado destino."""
+    estado = serializers.ChoiceField(choices=Sensor.ESTADOS)
+    departamento = serializers.IntegerField(required=False)
+    usuario = serializers.IntegerField(required=False)
+    uids = serializers.ListField(
+        child=serializers.CharField(max_length=64),
+        required=False, allow_empty=False, max_length=10_000,
+    )
+    detalle = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+    def validate(self, data):
+        # sin filtro se cambiarían todos los sensores
+        if not any(campo in data for campo in ('departamento', 'usuario', 'uids')):
+            raise serializers.ValidationError(
+                "Indique al menos un filtro: departamento, usuario o uids."
+            )
+        return data
+
+    def sensores(self):
+        filtros = {}
+        datos = self.validated_data
+        if 'departamento' in datos:
+            filtros['departamento_id'] = datos['departamento']
+        if 'usuario' in datos:
+            filtros['usuario_id'] = datos['usuario']
+        if 'uids' in datos:
+            filtros['uid__in'] = datos['uids']
+        return Sensor.objects.filter(**filtros)
+
+
 # ---------- Barrera ----------
 
 class BarreraSerializer(serializers.ModelSerializer):
     class Meta:
         model = Barrera
-        fields = ['id', 'estado', 'actualizado_en']
+        fields = ['id', 'estado', 'departamento', 'actualizado_en']
         read_only_fields = ['id', 'actualizado_en']
 
 
@@ -87,12 +151,53 @@ class EventoAccesoSerializer(serializers.ModelSerializer):
         ]
 
 
+# ---------- Intentos con UID desconocido ----------
+
+class IntentoDesconocidoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IntentoDesconocido
+        fields = ['id', 'uid', 'bucket', 'intentos', 'primer_intento', 'ultimo_intento']
+
+
+# ---------- Filtros del historial de eventos ----------
+
+class EventoFiltroSerializer(serializers.Serializer):
+    desde = serializers.DateTimeField(required=False)
+    hasta = serializers.DateTimeField(required=False)
+    sensor = serializers.IntegerField(required=False)
+    usuario = serializers.IntegerField(required=False)
+    departamento = serializers.IntegerField(required=False)
+    resultado = serializers.ChoiceField(choices=EventoAcceso.RESULTADOS, required=False)
+    tipo = serializers.ChoiceField(choices=EventoAcceso.TIPOS, required=False)
+
+    def validate(self, data):
+        if data.get('desde') and data.get('hasta') and data['desde'] > data['hasta']:
+            raise serializers.ValidationError("'desde' debe ser anterior a 'hasta'.")
+        return data
+
+
+class ReporteAccesosFiltroSerializer(serializers.Serializer):
+    desde = serializers.DateTimeField(required=False)
+    hasta = serializers.DateTimeField(required=False)
+    departamento = serializers.IntegerField(required=False)
+    sensor = serializers.IntegerField(required=False)
+    agrupar = serializers.ChoiceField(choices=['hora', 'dia'], default='hora')
+
+    def validate(self, data):
+        data.setdefault('hasta', timezone.now())
+        data.setdefault('desde', data['hasta'] - timezone.timedelta(days=7))
+        if data['desde'] > data['hasta']:
+            raise serializers.ValidationError("'desde' debe ser anterior a 'hasta'.")
+        return data
+
+
 # ---------- Evento de acceso (creación + barrera) ----------
 
 class EventoCreateSerializer(serializers.Serializer):
     """
     Recibe un UID y una acción (ABRIR/CERRAR), decide si se permite
-    y opcionalmente actualiza la barrera.
+    y opcionalmente actualiza la barrera del departamento del sensor.
+    Tras save(), barrera_estado contiene el estado resultante.
     """
     uid = serializers.CharField()
     accion = serializers.ChoiceField(choices=["ABRIR", "CERRAR"])
@@ -117,19 +222,26 @@ class EventoCreateSerializer(serializers.Serializer):
         detalle = validated_data.get("detalle", "")
 
         # Determinar si el acceso es permitido
-        if sensor.estado in ["BLOQUEADO", "PERDIDO", "INACTIVO"]:
+        if sensor.estado in Sensor.ESTADOS_DENEGADOS:
             resultado = "DENEGADO"
+            self.barrera_estado = self._estado_barrera(sensor.departamento_id)
         else:
             resultado = "PERMITIDO"
-            # Control de barrera solo si es permitido
-            barrera = Barrera.objects.first()
-            if barrera:
-                barrera.estado = "ABIERTA" if accion == "ABRIR" else "CERRADA"
-                barrera.save()
+            # Control de barrera solo si es permitido: un único UPDATE
+            # condicional sobre la barrera del departamento del sensor
+            nuevo_estado = Barrera.ESTADO_POR_ACCION[accion]
+            barreras = Barrera.objects.de_departamento(sensor.departamento_id)
+            if barreras.transicionar(nuevo_estado):
+                self.barrera_estado = nuevo_estado
+                publicar_barrera(sensor.departamento_id, nuevo_estado)
+            else:
+                # ya estaba en ese estado, o el departamento no tiene barrera
+                self.barrera_estado = nuevo_estado if barreras.exists() else "SIN_BARRERA"
 
-        evento = EventoAcceso.objects.create(
+        evento = registrar_evento(
             sensor=sensor,
-            usuario=sensor.usuario,  # Usuario vinculado al sensor (si existe)
+            usuario_id=sensor.usuario_id,  # Usuario vinculado al sensor (si existe)
+            departamento_id=sensor.departamento_id,
             tipo=tipo,
             accion=accion,
             resultado=resultado,
@@ -137,3 +249,29 @@ class EventoCreateSerializer(serializers.Serializer):
         )
 
         return evento
+
+    @staticmethod
+    def _estado_barrera(departamento_id):
+        estado = (
+            Barrera.objects.de_departamento(departamento_id)
+            .values_list("estado", flat=True)
+            .first()
+        )
+        return estado or "SIN_BARRERA"
+
+
+# ---------- Intentos de acceso en lote (reenvío offline NodeMCU) ----------
+
+class IntentoAccesoSerializer(serializers.Serializer):
+    uid = serializers.CharField()
+    # hora registrada por el dispositivo; si falta se usa la de recepción
+    fecha_hora = serializers.DateTimeField(required=False)
+
+
+class IntentoLoteSerializer(serializers.Serializer):
+    intentos = IntentoAccesoSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=getattr(settings, "ACCESO_LOTE_MAX", 500),
+    )
+
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from smartconnect import versiones
+from accounts.models import UsuarioApp, UserPerfil, UserPerfilAsignacion
+from zonas.models import Departamento
+from sensores.models import Sensor, Barrera
+from sensores.signals import eventos_registrados, sensores_modificados
+from .authentication import invalidar_usuario
+from .stream import publicar_barrera, publicar_eventos
+
+
+@receiver(eventos_registrados)
+def stream_eventos(sender, eventos, **kwargs):
+    publicar_eventos(eventos)
+
+
+@receiver(post_save, sender=Barrera)
+def stream_barrera(sender, instance, **kwargs):
+    publicar_barrera(instance.departamento_id, instance.estado, instance.pk)
+
+
+# ---------- Versiones de los listados (ETag) ----------
+
+@receiver(post_save, sender=Departamento)
+@receiver(post_delete, sender=Departamento)
+def version_departamentos(sender, instance, **kwargs):
+    # la barrera de la zona queda con departamento NULL (SET_NULL, sin señales)
+    versiones.incrementar(Departamento._meta.label_lower, Barrera._meta.label_lower)
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def version_sensores(sender, instance, **kwargs):
+    versiones.incrementar(Sensor._meta.label_lower)
+
+
+@receiver(sensores_modificados)
+def version_sensores_masivo(sender, cambios, **kwargs):
+    versiones.incrementar(Sensor._meta.label_lower)
+
+
+@receiver(post_save, sender=Barrera)
+@receiver(post_delete, sender=Barrera)
+def version_barreras(sender, instance, **kwargs):
+    versiones.incrementar(Barrera._meta.label_lower)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def version_sensores_usuario(sender, instance, **kwargs):
+    # Sensor.usuario es SET_NULL: el UPDATE en cascada no emite señales
+    versiones.incrementar(Sensor._meta.label_lower)
+
+
+# ---------- Estado de acceso cacheado para la autenticación JWT ----------
+
+@receiver(post_save, sender=UsuarioApp)
+@receiver(post_delete, sender=UsuarioApp)
+def invalidar_acceso_usuario(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=UserPerfilAsignacion)
+@receiver(post_delete, sender=UserPerfilAsignacion)
+def invalidar_acceso_asignacion(sender, instance, **kwargs):
+    invalidar_usuario(instance.user_id)
+
+
+@receiver(post_save, sender=UserPerfil)
+def invalidar_acceso_perfil(sender, instance, created, **kwargs):
+    if created:
+        return
+    # los roles cacheados en sesión (accounts.mixins.rol_de_sesion)
+    versiones.incrementar(sender._meta.label_lower)
+    # renombrar un perfil cambia el rol de todos sus usuarios vigentes
+    ids = list(
+        UsuarioApp.objects
+        .filter(active_asignacion__perfil=instance)
+        .values_list("pk", flat=True)
+    )
+    if ids:
+        invalidar_usuario(*ids)
@@ -0,0 +1,257 @@
+"""
+Pub/sub en proceso para el stream SSE de barreras y eventos.
+
+Los publicadores (señales, vistas) pueden correr en cualquier hilo; cada
+suscriptor es una conexión SSE que vive en el event loop de ASGI. El
+backend es configurable (STREAM["BACKEND"]): MemoryBackend sirve para un
+solo proceso; RedisBackend comparte los mensajes entre workers.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class Mensaje(NamedTuple):
+    id: str
+    tipo: str
+    departamento_id: int | None
+    datos: dict
+
+
+class Suscripcion:
+
+    def __init__(self, backend, loop, departamento_id=None, max_pendientes=1000):
+        self.backend = backend
+        self.loop = loop
+        self.departamento_id = departamento_id
+        self._cola = asyncio.Queue(maxsize=max_pendientes)
+        self.desbordada = False
+
+    def entregar(self, mensaje):
+        # llamado desde cualquier hilo
+        if (
+            self.departamento_id is not None
+            and mensaje.departamento_id is not None
+            and mensaje.departamento_id != self.departamento_id
+        ):
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._encolar, mensaje)
+        except RuntimeError:
+            # el event loop del suscriptor ya terminó
+            self.backend.desuscribir(self)
+
+    def _encolar(self, mensaje):
+        if self.desbordada:
+            return
+        try:
+            self._cola.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            # cliente lento: se corta y debe reconectar con Last-Event-ID
+            self.desbordada = True
+            while not self._cola.empty():
+                self._cola.get_nowait()
+            self._cola.put_nowait(None)
+
+    async def siguiente(self, timeout):
+        """Próximo mensaje, None si la suscripción se desbordó."""
+        return await asyncio.wait_for(self._cola.get(), timeout)
+
+    def cerrar(self):
+        self.backend.desuscribir(self)
+
+
+class MemoryBackend:
+    """Fan-out en memoria con historial acotado para reanudar."""
+
+    def __init__(self, historial=1000):
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._historial = deque(maxlen=historial)
+        self._suscriptores = set()
+
+    def _clave(self, mensaje_id):
+        return int(mensaje_id)
+
+    def activo(self):
+        """Hay conexiones SSE en este proceso que puedan recibir mensajes."""
+        return bool(self._suscriptores)
+
+    def omitir(self):
+        """
+        Registra mensajes no publicados porque nadie escuchaba: avanza la
+        secuencia y vacía el historial, así quien reanude desde antes
+        recibe "reinicio" en lugar de un hueco silencioso.
+        """
+        with self._lock:
+            self._seq += 1
+            self._historial.clear()
+
+    def publicar(self, tipo, departamento_id, datos):
+        with self._lock:
+            self._seq += 1
+            mensaje_id = str(self._seq)
+        self._distribuir(Mensaje(mensaje_id, tipo, departamento_id, datos))
+
+    def _distribuir(self, mensaje):
+        with self._lock:
+            self._historial.append(mensaje)
+            for suscripcion in list(self._suscriptores):
+                suscripcion.entregar(mensaje)
+
+    def suscribir(self, departamento_id=None, ultimo_id=None):
+        suscripcion = Suscripcion(self, asyncio.get_running_loop(), departamento_id)
+        with self._lock:
+            # se reenvía lo perdido antes de registrar, sin huecos ni duplicados
+            if ultimo_id:
+                for mensaje in self._perdidos(ultimo_id):
+                    suscripcion.entregar(mensaje)
+            self._suscriptores.add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def _perdidos(self, ultimo_id):
+        try:
+            ultimo = self._clave(ultimo_id)
+        except (TypeError, ValueError):
+            return []
+
+        perdidos = [m for m in self._historial if self._clave(m.id) > ultimo]
+        if self._cubre(ultimo, perdidos):
+            return perdidos
+        # el historial no cubre el hueco (o el proceso se reinició):
+        # el cliente debe recargar el estado completo
+        return [self._reinicio()]
+
+    def _cubre(self, ultimo, perdidos):
+        if ultimo >= self._seq:
+            return ultimo == self._seq
+        return bool(perdidos) and self._clave(perdidos[0].id) == ultimo + 1
+
+    def _reinicio(self):
+        return Mensaje(str(self._seq), "reinicio", None, {})
+
+    def stats(self):
+        return {
+            "suscriptores": len(self._suscriptores),
+            "historial": len(self._historial),
+        }
+
+
+class RedisBackend(MemoryBackend):
+    """
+    Publica en un Redis Stream; cada proceso ASGI lee el stream con una
+    única tarea y reparte localmente. Requiere el paquete `redis`.
+    """
+
+    def __init__(self, url, stream="smartconnect:stream", historial=1000):
+        super().__init__(historial)
+        import redis
+
+        self.url = url
+        self.stream = stream
+        self.maxlen = historial
+        self._redis = redis.Redis.from_url(url)
+        self._lector = None
+
+    def _clave(self, mensaje_id):
+        ms, _, seq = str(mensaje_id).partition("-")
+        return (int(ms), int(seq or 0))
+
+    def activo(self):
+        # los suscriptores pueden estar en otros workers
+        return True
+
+    def _cubre(self, ultimo, perdidos):
+        # el historial local empieza cuando este proceso comenzó a leer el
+        # stream (y los ids no son consecutivos): solo si contiene el último
+        # id del cliente se sabe que no hay hueco, p.ej. al reconectar a
+        # otro worker
+        return any(self._clave(m.id) == ultimo for m in self._historial)
+
+    def _reinicio(self):
+        ultimo = self._historial[-1].id if self._historial else "0-0"
+        return Mensaje(ultimo, "reinicio", None, {})
+
+    def publicar(self, tipo, departamento_id, datos):
+        self._redis.xadd(
+            self.stream,
+            {"m": json.dumps([tipo, departamento_id, datos], cls=DjangoJSONEncoder)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+
+    def suscribir(self, departamento_id=None, ultimo_id=None):
+        if self._lector is None or self._lector.done():
+            self._lector = asyncio.get_running_loop().create_task(self._leer())
+        return super().suscribir(departamento_id, ultimo_id)
+
+    async def _leer(self):
+        import redis.asyncio as aioredis
+
+        cliente = aioredis.Redis.from_url(self.url)
+        ultimo = "$"
+        while True:
+            respuesta = await cliente.xread({self.stream: ultimo}, block=5000, count=500)
+            for _stream, mensajes in respuesta or []:
+                for mensaje_id, campos in mensajes:
+                    ultimo = mensaje_id
+                    tipo, departamento_id, datos = json.loads(campos[b"m"])
+                    self._distribuir(
+                        Mensaje(mensaje_id.decode(), tipo, departamento_id, datos)
+                    )
+
+
+_config = getattr(settings, "STREAM", {})
+
+broker = import_string(_config.get("BACKEND", "api.stream.MemoryBackend"))(
+    **_config.get("OPTIONS", {})
+)
+
+
+def formato_sse(mensaje):
+    datos = json.dumps(mensaje.datos, cls=DjangoJSONEncoder)
+    return f"id: {mensaje.id}\nevent: {mensaje.tipo}\ndata: {datos}\n\n"
+
+
+def publicar_barrera(departamento_id, estado, barrera_id=None):
+    broker.publicar("barrera", departamento_id, {
+        "barrera": barrera_id,
+        "departamento": departamento_id,
+        "estado": estado,
+    })
+
+
+def publicar_eventos(eventos):
+    # sin conexiones SSE no se arma ningún mensaje
+    if not broker.activo():
+        broker.omitir()
+        return
+    for evento in eventos:
+        publicar_evento(evento)
+
+
+def publicar_evento(evento):
+    datos = {
+        "sensor": evento.sensor_id,
+        "usuario": evento.usuario_id,
+        "departamento": evento.departamento_id,
+        "tipo": evento.tipo,
+        "accion": evento.accion,
+        "resultado": evento.resultado,
+        "detalle": evento.detalle,
+        "fecha_hora": evento.fecha_hora,
+    }
+    # bulk_create en MySQL no devuelve el pk: el evento se publica sin id
+    if evento.pk is not None:
+        datos = {"id": evento.pk, **datos}
+    broker.publicar("evento", evento.departamento_id, datos)
@@ -1,3 +1,883 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import time
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.models import UserPerfil, UsuarioApp
+from accounts.tests import crear_usuario
+from smartconnect import versiones
+from sensores import lista_acceso
+from sensores.cache import obtener_autorizacion, sensor_cache
+from sensores.desconocidos import contador_desconocidos
+from sensores.models import Sensor, Barrera, EventoAcceso, SensorCambio
+from zonas.models import Departamento
+
+from . import export, importacion, lectura
+from .authentication import obtener_usuario, usuario_cache
+from .filters import EVENTO_ORDEN, filtrar_eventos
+from .jwt_urls import TokenConRolSerializer
+from .serializers import (
+    BarreraSerializer, DepartamentoSerializer, EventoAccesoSerializer, EventoCreateSerializer,
+    IntentoLoteSerializer, SensorSerializer,
+)
+from .views import EventoCreateAPI
+from .stream import Mensaje, MemoryBackend, RedisBackend, publicar_barrera, publicar_eventos
+
+
+class ETagTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.departamento = Departamento.objects.create(nombre="Bodega")
+        self.sensor = Sensor.objects.create(uid="ABCD1234", departamento=self.departamento)
+        self.barrera = Barrera.objects.create(departamento=self.departamento)
+        self.usuario = UsuarioApp.objects.create(email="operador@smartconnect.cl", name="Operador")
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        return response["ETag"]
+
+    def test_listado_304_sin_consultas(self):
+        for url in ("/api/departamentos/", "/api/sensores/", "/api/barreras/"):
+            etag = self._etag(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+
+    def test_listado_cambia_etag_al_guardar(self):
+        etag = self._etag("/api/sensores/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.estado = "BLOQUEADO"
+            self.sensor.save()
+        response = self.client.get("/api/sensores/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_transicion_de_barrera_cambia_etag(self):
+        etag = self._etag("/api/barreras/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Barrera.objects.filter(pk=self.barrera.pk).transicionar("ABIERTA")
+        response = self.client.get("/api/barreras/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_version_expira_con_cache_por_proceso(self):
+        # escritura en otro worker: este proceso no ve el incremento
+        etag = self._etag("/api/sensores/")
+        Sensor.objects.filter(pk=self.sensor.pk).update(alias="Otro worker")
+        response = self.client.get("/api/sensores/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        expirado = time.time() + versiones.TIMEOUT + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=expirado):
+            response = self.client.get("/api/sensores/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depende_de_la_query(self):
+        self.assertNotEqual(
+            self._etag("/api/sensores/"),
+            self._etag("/api/sensores/?fields=uid"),
+        )
+
+    def test_detalle_304(self):
+        url = f"/api/sensores/{self.sensor.pk}/"
+        etag = self._etag(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.sensor.alias = "Tarjeta recepción"
+        self.sensor.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["alias"], "Tarjeta recepción")
+
+
+class ImportacionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        sensor_cache.clear()
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.usuario = UsuarioApp.objects.create(email="guardia@smartconnect.cl", name="Guardia")
+
+    def importar(self, *filas, lote=1000):
+        texto = "uid,alias,estado,departamento,usuario\n" + "".join(f + "\n" for f in filas)
+        with self.captureOnCommitCallbacks(execute=True):
+            return importacion.importar(io.StringIO(texto), lote=lote)
+
+    def test_errores_por_fila(self):
+        resultado = self.importar(
+            "AAAA0001,Tarjeta 1,,Bodega,",
+            "X1,Corto,,Bodega,",
+            "AAAA0002,,,Sótano,",
+            "AAAA0003,,BLOQUEADO,Bodega,",
+            "AAAA0004,,ACTIVO,Bodega,nadie@smartconnect.cl",
+            "AAAA0001,Repetida,,Oficina,",
+            "AAAA0005,,BLOQUEADO,Oficina,GUARDIA@smartconnect.cl",
+        )
+        self.assertEqual(resultado.filas, 7)
+        self.assertEqual(resultado.creados, 2)
+        self.assertEqual(
+            {fila: set(errores) for fila, errores in resultado.errores},
+            {
+                3: {"uid"},
+                4: {"departamento"},
+                5: {"non_field_errors"},
+                6: {"usuario"},
+                7: {"uid"},
+            },
+        )
+        sensor = Sensor.objects.get(uid="AAAA0005")
+        self.assertEqual((sensor.usuario_id, sensor.estado), (self.usuario.pk, "BLOQUEADO"))
+
+    def test_columnas_obligatorias(self):
+        with self.assertRaises(ValidationError):
+            importacion.importar(io.StringIO("uid,alias\nAAAA0001,x\n"))
+
+    def test_upsert_actualiza_existentes(self):
+        Sensor.objects.create(uid="AAAA0001", alias="Viejo", departamento=self.bodega)
+        self.assertEqual(obtener_autorizacion("AAAA0001").departamento_id, self.bodega.pk)
+        cambios = SensorCambio.objects.count()
+
+        resultado = self.importar(
+            "AAAA0001,Nuevo,INACTIVO,Oficina,",
+            "AAAA0002,,,Oficina,",
+            lote=1,
+        )
+
+        self.assertEqual((resultado.creados, resultado.actualizados), (1, 1))
+        sensor = Sensor.objects.get(uid="AAAA0001")
+        self.assertEqual(
+            (sensor.alias, sensor.estado, sensor.departamento_id),
+            ("Nuevo", "INACTIVO", self.oficina.pk),
+        )
+        self.assertEqual(Sensor.objects.count(), 2)
+        # baja de AAAA0001 y alta de AAAA0002 en la lista de acceso
+        self.assertEqual(SensorCambio.objects.count() - cambios, 2)
+        self.assertEqual(obtener_autorizacion("AAAA0001").estado, "INACTIVO")
+        self.assertIsNotNone(obtener_autorizacion("AAAA0002"))
+
+    def test_invalida_la_cache_al_confirmar(self):
+        Sensor.objects.create(uid="AAAA0001", departamento=self.bodega)
+        obtener_autorizacion("AAAA0001")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            importacion.importar(io.StringIO(
+                "uid,alias,estado,departamento,usuario\nAAAA0001,,INACTIVO,Bodega,\n"
+            ))
+            self.assertEqual(sensor_cache.get("AAAA0001").estado, "ACTIVO")
+
+        self.assertEqual(obtener_autorizacion("AAAA0001").estado, "INACTIVO")
+
+
+class RolJWTTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        usuario_cache.clear()
+        self.admin = crear_usuario("admin@smartconnect.cl", UsuarioApp.ROL_ADMIN)
+        token = TokenConRolSerializer.get_token(self.admin).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def crear_departamento(self, nombre):
+        return self.client.post("/api/departamentos/", {"nombre": nombre}, format="json")
+
+    def test_renombrar_perfil_revoca_el_rol_del_token(self):
+        self.assertEqual(self.crear_departamento("Bodega").status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil = UserPerfil.objects.get(nombre=UsuarioApp.ROL_ADMIN)
+            perfil.nombre = "AUDITOR"
+            perfil.save()
+
+        # el token sigue diciendo rol=ADMIN
+        self.assertEqual(self.crear_departamento("Oficina").status_code, 403)
+
+    def test_snapshot_cacheado_sin_consultas(self):
+        obtener_usuario(self.admin.pk)
+        with self.assertNumQueries(0):
+            snapshot = obtener_usuario(self.admin.pk)
+        self.assertEqual(snapshot.rol, UsuarioApp.ROL_ADMIN)
+
+    def test_desactivar_usuario_revoca_el_token(self):
+        self.assertEqual(self.client.get("/api/departamentos/").status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = False
+            self.admin.save()
+        self.assertEqual(self.client.get("/api/departamentos/").status_code, 401)
+
+
+class ListaAccesoTests(TestCase):
+
+    def setUp(self):
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.sensor = Sensor.objects.create(uid="AAAA0001", departamento=self.bodega)
+        Sensor.objects.create(uid="AAAA0002", departamento=self.oficina)
+        Sensor.objects.create(uid="AAAA0003", departamento=self.bodega, estado="BLOQUEADO")
+        usuario = UsuarioApp.objects.create(email="lector@smartconnect.cl", name="Lector")
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Firma"], lista_acceso.firmar(response.content))
+        return json.loads(response.content)
+
+    def delta(self, desde):
+        return self.get(f"/api/lista-acceso/delta/?desde={desde}")
+
+    def test_snapshot_firmado_con_los_activos(self):
+        datos = self.get("/api/lista-acceso/")
+        self.assertEqual(datos["departamentos"], {
+            str(self.bodega.pk): ["AAAA0001"],
+            str(self.oficina.pk): ["AAAA0002"],
+        })
+        self.assertEqual(datos["version"], SensorCambio.objects.latest("id").pk)
+
+    def test_delta_desde_el_snapshot(self):
+        version = self.get("/api/lista-acceso/")["version"]
+        self.sensor.estado = "PERDIDO"
+        self.sensor.save()
+        Sensor.objects.create(uid="AAAA0004", departamento=self.oficina)
+
+        datos = self.delta(version)
+        self.assertEqual(datos["bajas"], {str(self.bodega.pk): ["AAAA0001"]})
+        # la ventana también reenvía los cambios recientes ya recibidos
+        self.assertIn("AAAA0004", datos["altas"][str(self.oficina.pk)])
+        self.assertNotIn("AAAA0001", datos["altas"].get(str(self.bodega.pk), []))
+        self.assertEqual(self.delta(datos["version"])["version"], datos["version"])
+
+    def test_delta_reenvia_cambios_confirmados_tarde(self):
+        # los cambios iniciales son antiguos: quedan fuera de la ventana
+        SensorCambio.objects.update(creado_en=timezone.now() - timedelta(hours=1))
+        tarde = Sensor.objects.create(uid="AAAA0005", departamento=self.oficina)
+        Sensor.objects.create(uid="AAAA0006", departamento=self.oficina)
+
+        # la transacción de AAAA0005 (id menor) aún no confirma cuando el
+        # lector recibe la versión siguiente
+        cambio = SensorCambio.objects.get(uid=tarde.uid)
+        cambio.delete()
+        version = self.get("/api/lista-acceso/")["version"]
+        SensorCambio.objects.create(
+            id=cambio.id, uid=cambio.uid,
+            departamento_id=cambio.departamento_id, activo=cambio.activo,
+        )
+
+        datos = self.delta(version)
+        self.assertEqual(datos["altas"], {str(self.oficina.pk): ["AAAA0005", "AAAA0006"]})
+        self.assertEqual(datos["bajas"], {})
+
+    def test_delta_410_si_la_version_no_existe(self):
+        version = SensorCambio.objects.latest("id").pk
+        response = self.client.get(f"/api/lista-acceso/delta/?desde={version + 1}")
+        self.assertEqual(response.status_code, 410)
+
+    def test_podar_conserva_el_ultimo_y_responde_410_a_versiones_podadas(self):
+        antigua = self.get("/api/lista-acceso/")["version"]
+        SensorCambio.objects.update(creado_en=timezone.now() - timedelta(days=60))
+        self.sensor.estado = "PERDIDO"
+        self.sensor.save()
+        reciente = SensorCambio.objects.latest("id").pk
+
+        self.assertEqual(lista_acceso.podar(dias=30), antigua)
+        self.assertEqual(list(SensorCambio.objects.values_list("id", flat=True)), [reciente])
+        response = self.client.get(f"/api/lista-acceso/delta/?desde={antigua - 1}")
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.delta(antigua)["bajas"], {str(self.bodega.pk): ["AAAA0001"]})
+
+        # todo el historial es antiguo: el último cambio se conserva
+        SensorCambio.objects.update(creado_en=timezone.now() - timedelta(days=60))
+        self.assertEqual(lista_acceso.podar(dias=30), 0)
+        self.assertEqual(lista_acceso.version_actual(), reciente)
+
+
+class PaginacionKeysetTests(TestCase):
+
+    def setUp(self):
+        self.departamento = Departamento.objects.create(nombre="Bodega")
+        self.sensor = Sensor.objects.create(uid="ABCD1234", departamento=self.departamento)
+        ahora = timezone.now()
+        # fechas repetidas: el id desempata el orden
+        EventoAcceso.objects.bulk_create([
+            EventoAcceso(
+                sensor=self.sensor, tipo="INTENTO", accion="INTENTO",
+                resultado="PERMITIDO", fecha_hora=ahora - timedelta(minutes=i // 3),
+            )
+            for i in range(10)
+        ])
+        usuario = UsuarioApp.objects.create(email="operador@smartconnect.cl", name="Operador")
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def recorrer(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [fila["id"] for fila in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        esperados = list(
+            EventoAcceso.objects.order_by("-fecha_hora", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(self.recorrer("/api/eventos/?page_size=3"), esperados)
+
+    def test_ultima_pagina_sin_next(self):
+        response = self.client.get("/api/eventos/?page_size=10")
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIsNone(response.data["next"])
+
+    def test_cursor_invalido_404(self):
+        def cursor(valor):
+            return urlsafe_b64encode(json.dumps(valor).encode()).decode()
+
+        # base64 inválido, no es lista, columnas de menos, fecha inválida
+        for valor in ("no-es-base64!", cursor({"id": 1}), cursor([1]), cursor(["ayer", 1])):
+            response = self.client.get("/api/eventos/", {"cursor": valor})
+            self.assertEqual(response.status_code, 404, valor)
+
+
+class ExportacionTests(TestCase):
+
+    def setUp(self):
+        departamento = Departamento.objects.create(nombre="Bodega")
+        sensor = Sensor.objects.create(uid="ABCD1234", departamento=departamento)
+        ahora = timezone.now()
+        EventoAcceso.objects.bulk_create([
+            EventoAcceso(
+                sensor=sensor, departamento=departamento, tipo="INTENTO", accion="INTENTO",
+                resultado="DENEGADO" if i % 2 else "PERMITIDO", detalle=f"ñandú {i}",
+                fecha_hora=ahora - timedelta(minutes=i // 2),
+            )
+            for i in range(7)
+        ])
+        self.esperados = list(
+            EventoAcceso.objects.order_by("fecha_hora", "id").values_list("id", flat=True)
+        )
+        usuario = UsuarioApp.objects.create(email="operador@smartconnect.cl", name="Operador")
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def descargar(self, query):
+        response = self.client.get(f"/api/eventos/exportar/?{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_ndjson_gzip(self):
+        response, cuerpo = self.descargar("formato=ndjson&gzip=1")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="eventos.ndjson.gz"', response["Content-Disposition"])
+
+        registros = [json.loads(linea) for linea in gzip.decompress(cuerpo).decode().splitlines()]
+        self.assertEqual([r["id"] for r in registros], self.esperados)
+        self.assertEqual(registros[0]["sensor_uid"], "ABCD1234")
+        self.assertTrue(registros[0]["detalle"].startswith("ñandú"))
+
+    def test_csv_con_filtros(self):
+        _, cuerpo = self.descargar("formato=csv&resultado=DENEGADO")
+        filas = list(csv.reader(io.StringIO(cuerpo.decode())))
+        self.assertEqual(filas[0], [nombre for nombre, _ in export.COLUMNAS])
+        self.assertEqual({fila[9] for fila in filas[1:]}, {"DENEGADO"})
+        self.assertEqual(len(filas) - 1, 3)
+
+    def test_lotes_por_keyset_no_repiten_filas(self):
+        # chunk_size menor que el total: cada lote continúa tras la fecha repetida
+        filas = export.filas(EventoAcceso.objects.all(), chunk_size=2)
+        self.assertEqual([fila[0] for fila in filas], self.esperados)
+
+    def test_formato_invalido(self):
+        response = self.client.get("/api/eventos/exportar/?formato=xml")
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamTests(TestCase):
+
+    def setUp(self):
+        self.broker = MemoryBackend(historial=10)
+        patcher = mock.patch("api.stream.broker", self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def evento(self, pk=None, departamento_id=1):
+        return EventoAcceso(
+            pk=pk, departamento_id=departamento_id, tipo="INTENTO", accion="INTENTO",
+            resultado="PERMITIDO", fecha_hora=timezone.now(),
+        )
+
+    async def test_sin_suscriptores_no_publica_y_fuerza_reinicio(self):
+        publicar_eventos([self.evento(pk=1)])
+        self.assertEqual(self.broker.stats()["historial"], 0)
+
+        suscripcion = self.broker.suscribir(ultimo_id="0")
+        self.addCleanup(suscripcion.cerrar)
+        self.assertEqual((await suscripcion.siguiente(1)).tipo, "reinicio")
+
+    async def test_evento_sin_pk_se_publica_sin_id(self):
+        suscripcion = self.broker.suscribir()
+        self.addCleanup(suscripcion.cerrar)
+        publicar_eventos([self.evento(pk=7), self.evento()])
+
+        con_id = await suscripcion.siguiente(1)
+        sin_id = await suscripcion.siguiente(1)
+        self.assertEqual(con_id.datos["id"], 7)
+        self.assertNotIn("id", sin_id.datos)
+
+    async def recibidos(self, suscripcion):
+        mensajes = []
+        while True:
+            try:
+                mensajes.append(await suscripcion.siguiente(0.05))
+            except asyncio.TimeoutError:
+                return mensajes
+
+    async def test_reanuda_desde_el_ultimo_id_filtrando_por_departamento(self):
+        for departamento_id in (1, 2, 1, None):
+            self.broker.publicar("barrera", departamento_id, {})
+
+        suscripcion = self.broker.suscribir(departamento_id=1, ultimo_id="1")
+        self.addCleanup(suscripcion.cerrar)
+        self.broker.publicar("barrera", 2, {})
+        self.broker.publicar("barrera", 1, {})
+
+        mensajes = await self.recibidos(suscripcion)
+        self.assertEqual([m.id for m in mensajes], ["3", "4", "6"])
+
+    async def test_reanudar_fuera_del_historial_pide_reinicio(self):
+        for _ in range(12):
+            self.broker.publicar("barrera", 1, {})
+
+        for ultimo_id in ("1", "99"):
+            suscripcion = self.broker.suscribir(ultimo_id=ultimo_id)
+            self.addCleanup(suscripcion.cerrar)
+            mensajes = await self.recibidos(suscripcion)
+            self.assertEqual([(m.id, m.tipo) for m in mensajes], [("12", "reinicio")])
+
+    def test_redis_sin_el_id_en_el_historial_pide_reinicio(self):
+        # sin servidor Redis: solo la lógica de reanudación del historial local
+        backend = RedisBackend.__new__(RedisBackend)
+        MemoryBackend.__init__(backend, historial=10)
+        self.assertEqual(backend._perdidos("5-0")[0], Mensaje("0-0", "reinicio", None, {}))
+
+        for mensaje_id in ("10-0", "10-1", "12-0"):
+            backend._distribuir(Mensaje(mensaje_id, "barrera", 1, {}))
+
+        self.assertEqual([m.id for m in backend._perdidos("10-0")], ["10-1", "12-0"])
+        # otro worker entregó 11-0, que este proceso no leyó
+        self.assertEqual(backend._perdidos("11-0"), [Mensaje("12-0", "reinicio", None, {})])
+
+
+class IntentoLoteTests(TestCase):
+    url = "/api/acceso/lote/"
+
+    def setUp(self):
+        sensor_cache.clear()
+        departamento = Departamento.objects.create(nombre="Bodega")
+        self.usuario = UsuarioApp.objects.create(email="u@smartconnect.cl", name="U")
+        Sensor.objects.create(uid="AAAA0001", departamento=departamento, usuario=self.usuario)
+        Sensor.objects.create(uid="AAAA0002", departamento=departamento, estado="BLOQUEADO")
+        self.client = APIClient()
+        self.hace_un_rato = (timezone.now() - timedelta(hours=2)).replace(microsecond=0)
+
+    def test_lote_mixto_en_un_solo_bulk_create(self):
+        intentos = [
+            {"uid": "AAAA0001", "fecha_hora": self.hace_un_rato.isoformat()},
+            {"uid": "ZZZZ9999", "fecha_hora": self.hace_un_rato.isoformat()},
+            {"uid": "AAAA0002", "fecha_hora": self.hace_un_rato.isoformat()},
+            {"uid": "ZZZZ9999", "fecha_hora": self.hace_un_rato.isoformat()},
+        ]
+        with mock.patch("api.views.registrar_desconocido") as registrar_desconocido:
+            # SELECT de los sensores + un INSERT
+            with self.assertNumQueries(2):
+                response = self.client.post(self.url, intentos, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r["uid"], r["resultado"]) for r in response.data["resultados"]],
+            [("AAAA0001", "PERMITIDO"), ("ZZZZ9999", "DENEGADO"),
+             ("AAAA0002", "DENEGADO"), ("ZZZZ9999", "DENEGADO")],
+        )
+        registrar_desconocido.assert_called_once_with(
+            "ZZZZ9999", self.hace_un_rato, self.hace_un_rato, 2
+        )
+
+        eventos = EventoAcceso.objects.order_by("id")
+        self.assertEqual(
+            [(e.sensor.uid, e.resultado, e.usuario_id) for e in eventos],
+            [("AAAA0001", "PERMITIDO", self.usuario.pk), ("AAAA0002", "DENEGADO", None)],
+        )
+
+    def test_conserva_la_hora_del_dispositivo(self):
+        futuro = timezone.now() + timedelta(days=1)
+        self.client.post(self.url, {"intentos": [
+            {"uid": "AAAA0001", "fecha_hora": self.hace_un_rato.isoformat()},
+            {"uid": "AAAA0001", "fecha_hora": futuro.isoformat()},
+        ]}, format="json")
+
+        pasado, corregido = EventoAcceso.objects.order_by("id")
+        self.assertEqual(pasado.fecha_hora, self.hace_un_rato)
+        # relojes adelantados: nunca más allá de la hora de recepción
+        self.assertLessEqual(corregido.fecha_hora, timezone.now())
+
+    def test_rechaza_lotes_invalidos(self):
+        maximo = IntentoLoteSerializer().fields["intentos"].max_length
+        for datos in (
+            [],
+            [{"uid": "AAAA0001"}] * (maximo + 1),
+            {"intentos": "AAAA0001"},
+            [{"fecha_hora": self.hace_un_rato.isoformat()}],
+            [{"uid": "AAAA0001", "fecha_hora": "ayer"}],
+        ):
+            response = self.client.post(self.url, datos, format="json")
+            self.assertEqual(response.status_code, 400, datos)
+        self.assertFalse(EventoAcceso.objects.exists())
+
+
+class AsyncViewsTests(TestCase):
+    """Las vistas async responden igual que sus equivalentes DRF."""
+
+    def setUp(self):
+        cache.clear()
+        sensor_cache.clear()
+        usuario_cache.clear()
+        self.addCleanup(contador_desconocidos.flush)
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.barrera = Barrera.objects.create(departamento=self.bodega)
+        Barrera.objects.create(departamento=self.oficina)
+        Sensor.objects.create(uid="AAAA0001", departamento=self.bodega)
+        Sensor.objects.create(uid="AAAA0002", departamento=self.bodega, estado="BLOQUEADO")
+        usuario = crear_usuario("operador@smartconnect.cl", UsuarioApp.ROL_OPERADOR)
+        self.token = str(TokenConRolSerializer.get_token(usuario).access_token)
+
+    async def post_ambos(self, datos):
+        respuestas = []
+        for url in ("/api/acceso/", "/api/async/acceso/"):
+            await sync_to_async(sensor_cache.clear)()
+            response = await self.async_client.post(url, datos, content_type="application/json")
+            respuestas.append((response.status_code, response.json()))
+        return respuestas
+
+    def evento_sincrono(self, datos, headers):
+        # EventoCreateAPI no tiene ruta propia: se llama a la vista directamente
+        request = APIRequestFactory().post("/", datos, format="json", headers=headers)
+        response = EventoCreateAPI.as_view()(request).render()
+        return response.status_code, json.loads(response.content)
+
+    async def eventos_ambos(self, datos, headers=None):
+        sincrona = await sync_to_async(self.evento_sincrono)(datos, headers)
+        response = await self.async_client.post(
+            "/api/async/eventos/", datos, content_type="application/json", headers=headers,
+        )
+        asincrona = (response.status_code, response.json())
+        for _, cuerpo in (sincrona, asincrona):
+            cuerpo.pop("fecha", None)
+        return sincrona, asincrona
+
+    async def test_acceso(self):
+        for datos in ({"uid": "AAAA0001"}, {"uid": "AAAA0002"}, {"uid": "ZZZZ9999"}, {}):
+            sincrona, asincrona = await self.post_ambos(datos)
+            self.assertEqual(asincrona, sincrona, datos)
+
+        detalles = [
+            detalle async for detalle in
+            EventoAcceso.objects.order_by("id").values_list("resultado", "detalle")
+        ]
+        self.assertEqual(detalles, [
+            ("PERMITIDO", "Acceso concedido"), ("PERMITIDO", "Acceso concedido"),
+            ("DENEGADO", "Sensor en estado BLOQUEADO"), ("DENEGADO", "Sensor en estado BLOQUEADO"),
+        ])
+
+    async def test_evento_create(self):
+        for datos in (
+            {"uid": "AAAA0001", "accion": "ABRIR"},
+            {"uid": "AAAA0002", "accion": "CERRAR"},
+            {"uid": "ZZZZ9999", "accion": "ABRIR"},
+            {"uid": "AAAA0001", "accion": "GIRAR"},
+        ):
+            sincrona, asincrona = await self.eventos_ambos(
+                datos, {"Authorization": f"Bearer {self.token}"},
+            )
+            self.assertEqual(asincrona, sincrona, datos)
+
+        await self.barrera.arefresh_from_db()
+        self.assertEqual(self.barrera.estado, "ABIERTA")
+
+    async def test_evento_create_sin_token(self):
+        sincrona, asincrona = await self.eventos_ambos({"uid": "AAAA0001", "accion": "ABRIR"})
+        self.assertEqual((sincrona[0], asincrona[0]), (401, 401))
+
+    async def test_stream_filtra_por_departamento(self):
+        response = await self.async_client.get(
+            f"/api/stream/?token={self.token}&departamento={self.bodega.pk}"
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        contenido = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(contenido), b"retry: 3000\n\n")
+            publicar_barrera(self.oficina.pk, "ABIERTA")
+            publicar_barrera(self.bodega.pk, "ABIERTA", self.barrera.pk)
+            mensaje = (await anext(contenido)).decode()
+        finally:
+            await contenido.aclose()
+
+        self.assertIn("event: barrera", mensaje)
+        self.assertIn(f'"departamento": {self.bodega.pk}', mensaje)
+
+    async def test_stream_sin_credenciales(self):
+        response = await self.async_client.get("/api/stream/")
+        self.assertEqual(response.status_code, 401)
+
+
+class BarreraTransicionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        usuario_cache.clear()
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.sin_barrera = Departamento.objects.create(nombre="Patio")
+        self.barrera = Barrera.objects.create(departamento=self.bodega)
+        self.otra = Barrera.objects.create(departamento=self.oficina)
+        admin = crear_usuario("admin@smartconnect.cl", UsuarioApp.ROL_ADMIN)
+        token = TokenConRolSerializer.get_token(admin).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def abrir(self):
+        return self.client.post(f"/api/barreras/{self.barrera.pk}/abrir/")
+
+    def test_solo_una_transicion_gana(self):
+        # dos requests leyeron CERRADA; el UPDATE condicional deja pasar uno
+        primera = Barrera.objects.filter(pk=self.barrera.pk)
+        segunda = Barrera.objects.filter(pk=self.barrera.pk)
+        self.assertEqual(primera.transicionar("ABIERTA"), 1)
+        self.assertEqual(segunda.transicionar("ABIERTA"), 0)
+        self.assertEqual(Barrera.objects.de_departamento(self.oficina.pk).get().estado, "CERRADA")
+
+    def test_abrir_responde_lo_escrito(self):
+        with mock.patch("api.views.publicar_barrera") as publicar:
+            primera = self.abrir()
+            segunda = self.abrir()
+
+        publicar.assert_called_once_with(self.bodega.pk, "ABIERTA", self.barrera.pk)
+        escrita = BarreraSerializer(Barrera.objects.get(pk=self.barrera.pk)).data
+        for response in (primera, segunda):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["estado"], "ABIERTA")
+            self.assertEqual(response.data["actualizado_en"], escrita["actualizado_en"])
+
+    def evento(self, sensor, accion="ABRIR"):
+        serializer = EventoCreateSerializer(data={"uid": sensor.uid, "accion": accion})
+        serializer.is_valid(raise_exception=True)
+        evento = serializer.save()
+        return evento, serializer.barrera_estado
+
+    def test_sensor_controla_la_barrera_de_su_departamento(self):
+        sensor = Sensor.objects.create(uid="AAAA0001", departamento=self.oficina)
+        evento, estado = self.evento(sensor)
+
+        self.assertEqual((evento.resultado, estado), ("PERMITIDO", "ABIERTA"))
+        self.assertEqual(Barrera.objects.get(pk=self.otra.pk).estado, "ABIERTA")
+        self.assertEqual(Barrera.objects.get(pk=self.barrera.pk).estado, "CERRADA")
+
+    def test_sensor_denegado_no_mueve_la_barrera(self):
+        sensor = Sensor.objects.create(uid="AAAA0002", departamento=self.bodega, estado="PERDIDO")
+        evento, estado = self.evento(sensor)
+
+        self.assertEqual((evento.resultado, estado), ("DENEGADO", "CERRADA"))
+        self.assertEqual(Barrera.objects.get(pk=self.barrera.pk).estado, "CERRADA")
+
+    def test_departamento_sin_barrera(self):
+        sensor = Sensor.objects.create(uid="AAAA0003", departamento=self.sin_barrera)
+        _, estado = self.evento(sensor)
+
+        self.assertEqual(estado, "SIN_BARRERA")
+        self.assertFalse(Barrera.objects.filter(estado="ABIERTA").exists())
+
+
+class LecturaRapidaTests(TestCase):
+    """El camino de .values() debe producir el mismo JSON que los serializers."""
+
+    def setUp(self):
+        self.departamento = Departamento.objects.create(nombre="Bodega", descripcion="Zona ñ")
+        self.usuario = UsuarioApp.objects.create(email="u@smartconnect.cl", name="U")
+        con_usuario = Sensor.objects.create(
+            uid="AAAA0001", alias="Puerta", departamento=self.departamento, usuario=self.usuario,
+        )
+        Sensor.objects.create(uid="AAAA0002", departamento=self.departamento)
+        comunes = dict(tipo="INTENTO", accion="INTENTO", resultado="PERMITIDO")
+        EventoAcceso.objects.create(sensor=con_usuario, usuario=self.usuario, detalle="ok", **comunes)
+        EventoAcceso.objects.create(sensor=con_usuario, **comunes)
+        # evento manual: sin sensor ni usuario
+        EventoAcceso.objects.create(tipo="MANUAL", accion="ABRIR", resultado="PERMITIDO")
+
+    def assertMismoJSON(self, mapeo, serializer_class, queryset):
+        rapido = mapeo.representar_muchas(mapeo.filas(queryset))
+        serializado = serializer_class(queryset, many=True).data
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(rapido), renderer.render(serializado))
+
+    def test_eventos(self):
+        queryset = EventoAcceso.objects.select_related("sensor", "usuario").order_by("id")
+        self.assertMismoJSON(lectura.EVENTO, EventoAccesoSerializer, queryset)
+
+    def test_sensores(self):
+        self.assertMismoJSON(lectura.SENSOR, SensorSerializer, Sensor.objects.order_by("id"))
+
+    def test_departamentos(self):
+        self.assertMismoJSON(
+            lectura.DEPARTAMENTO, DepartamentoSerializer, Departamento.objects.order_by("id"),
+        )
+
+    def test_listado_igual_al_detalle(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        listado = client.get("/api/eventos/").json()["results"]
+        self.assertEqual(len(listado), 3)
+        for fila in listado:
+            self.assertEqual(client.get(f"/api/eventos/{fila['id']}/").json(), fila)
+
+
+class CamposParcialesTests(TestCase):
+
+    def setUp(self):
+        departamento = Departamento.objects.create(nombre="Bodega")
+        usuario = UsuarioApp.objects.create(email="u@smartconnect.cl", name="U")
+        sensor = Sensor.objects.create(uid="AAAA0001", departamento=departamento, usuario=usuario)
+        self.evento = EventoAcceso.objects.create(
+            sensor=sensor, usuario=usuario, tipo="INTENTO", accion="INTENTO",
+            resultado="PERMITIDO", detalle="Acceso concedido",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = " ".join(q["sql"] for q in consultas.captured_queries if "sensores_eventoacceso" in q["sql"])
+        return response.json(), sql
+
+    def test_fields_en_listado_y_detalle(self):
+        listado, sql = self.get("/api/eventos/?fields=id,resultado")
+        self.assertEqual(listado["results"], [{"id": self.evento.pk, "resultado": "PERMITIDO"}])
+        self.assertNotIn('"detalle"', sql)
+
+        detalle, sql = self.get(f"/api/eventos/{self.evento.pk}/?fields=id,sensor_uid")
+        self.assertEqual(detalle, {"id": self.evento.pk, "sensor_uid": "AAAA0001"})
+        self.assertNotIn('"detalle"', sql)
+        self.assertNotIn(UsuarioApp._meta.db_table, sql)
+
+    def test_exclude(self):
+        listado, sql = self.get("/api/eventos/?exclude=detalle,usuario_email")
+        fila = listado["results"][0]
+        self.assertNotIn("detalle", fila)
+        self.assertNotIn("usuario_email", fila)
+        self.assertEqual(fila["sensor_uid"], "AAAA0001")
+        self.assertNotIn('"detalle"', sql)
+
+    def test_fields_y_exclude_combinados(self):
+        listado, _ = self.get("/api/sensores/?fields=id,uid,estado&exclude=estado")
+        self.assertEqual(list(listado["results"][0]), ["id", "uid"])
+
+    def test_campos_desconocidos_o_vacios(self):
+        for query in ("fields=id,clave", "exclude=clave", "fields=id&exclude=id"):
+            response = self.client.get(f"/api/eventos/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+
+class FiltroEventosTests(TestCase):
+
+    def setUp(self):
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.sensor_bodega = Sensor.objects.create(uid="AAAA0001", departamento=self.bodega)
+        self.sensor_oficina = Sensor.objects.create(uid="AAAA0002", departamento=self.oficina)
+        self.ahora = timezone.now().replace(microsecond=0)
+        self.ids = {}
+        for nombre, sensor, resultado, horas in (
+            ("bodega_ok", self.sensor_bodega, "PERMITIDO", 1),
+            ("bodega_no", self.sensor_bodega, "DENEGADO", 5),
+            ("oficina_no", self.sensor_oficina, "DENEGADO", 30),
+        ):
+            self.ids[nombre] = EventoAcceso.objects.create(
+                sensor=sensor, departamento_id=sensor.departamento_id, tipo="INTENTO",
+                accion="INTENTO", resultado=resultado,
+                fecha_hora=self.ahora - timedelta(hours=horas),
+            ).pk
+        usuario = UsuarioApp.objects.create(email="u@smartconnect.cl", name="U")
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def filtrar(self, **params):
+        response = self.client.get("/api/eventos/", params)
+        self.assertEqual(response.status_code, 200)
+        ids = {fila["id"] for fila in response.data["results"]}
+        return {nombre for nombre, pk in self.ids.items() if pk in ids}
+
+    def test_rango_de_fechas(self):
+        desde = (self.ahora - timedelta(hours=6)).isoformat()
+        hasta = (self.ahora - timedelta(hours=1)).isoformat()
+        self.assertEqual(self.filtrar(desde=desde), {"bodega_ok", "bodega_no"})
+        # hasta es exclusivo
+        self.assertEqual(self.filtrar(desde=desde, hasta=hasta), {"bodega_no"})
+
+    def test_sensor_departamento_y_resultado(self):
+        self.assertEqual(self.filtrar(sensor=self.sensor_oficina.pk), {"oficina_no"})
+        self.assertEqual(self.filtrar(departamento=self.bodega.pk), {"bodega_ok", "bodega_no"})
+        self.assertEqual(self.filtrar(resultado="DENEGADO"), {"bodega_no", "oficina_no"})
+        self.assertEqual(
+            self.filtrar(departamento=self.bodega.pk, resultado="DENEGADO"), {"bodega_no"},
+        )
+
+    def test_parametros_invalidos(self):
+        for params in (
+            {"desde": "ayer"},
+            {"sensor": "uno"},
+            {"resultado": "QUIZAS"},
+            {"desde": self.ahora.isoformat(), "hasta": (self.ahora - timedelta(days=1)).isoformat()},
+        ):
+            self.assertEqual(self.client.get("/api/eventos/", params).status_code, 400, params)
 
-# Create your tests here.
+    @skipUnless(connection.vendor == "sqlite", "compara el plan textual de SQLite")
+    def test_filtros_usan_los_indices(self):
+        indices = {tuple(i.fields): i.name for i in EventoAcceso._meta.indexes}
+        for params, campos in (
+            ({"desde": self.ahora.isoformat()}, ("fecha_hora",)),
+            ({"sensor": "1"}, ("sensor", "fecha_hora")),
+            ({"usuario": "1"}, ("usuario", "fecha_hora")),
+            ({"resultado": "DENEGADO"}, ("resultado", "fecha_hora")),
+            ({"departamento": "1", "resultado": "DENEGADO"},
+             ("departamento", "resultado", "fecha_hora")),
+        ):
+            plan = filtrar_eventos(EventoAcceso.objects.all(), params).order_by(*EVENTO_ORDEN)[:50].explain()
+            self.assertIn(indices[campos], plan, params)
+            # el orden también sale del índice, sin ordenar en memoria
+            self.assertNotIn("TEMP B-TREE", plan, params)
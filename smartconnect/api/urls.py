@@ -1,14 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from django.http import JsonResponse
+from . import async_views
 from .views import (DepartamentoViewSet, SensorViewSet, BarreraViewSet, 
-                    EventoAccesoViewSet, health, info, intento_acceso_uid)
+                    EventoAccesoViewSet, IntentoDesconocidoViewSet, health, info, metricas,
+                    intento_acceso_uid, intento_acceso_lote,
+                    lista_acceso_snapshot, lista_acceso_delta,
+                    reporte_accesos, archivo_meses, archivo_mes)
 
 router = DefaultRouter()
 router.register('departamentos', DepartamentoViewSet)
 router.register('sensores', SensorViewSet)
 router.register('barreras', BarreraViewSet)
 router.register('eventos', EventoAccesoViewSet)
+router.register('intentos-desconocidos', IntentoDesconocidoViewSet)
 
 def api_not_found(request, *args, **kwargs):
     return JsonResponse({"detail": "Ruta no encontrada."}, status=404)
@@ -16,10 +21,22 @@ def api_not_found(request, *args, **kwargs):
 urlpatterns = [
     path('health/',health, name='health'),
     path('info/',info, name='info'),
+    path('metricas/', metricas, name='metricas'),
+
+    # versiones async nativas (servidas por smartconnect.asgi)
+    path('async/acceso/', async_views.intento_acceso_uid, name='intento_acceso_uid_async'),
+    path('async/eventos/', async_views.evento_create, name='evento_create_async'),
+    path('stream/', async_views.stream, name='stream'),
 
     path('', include(router.urls)),
 
     path('acceso/', intento_acceso_uid, name='intento_acceso_uid'),
+    path('acceso/lote/', intento_acceso_lote, name='intento_acceso_lote'),
+    path('lista-acceso/', lista_acceso_snapshot, name='lista_acceso_snapshot'),
+    path('lista-acceso/delta/', lista_acceso_delta, name='lista_acceso_delta'),
+    path('reportes/accesos/', reporte_accesos, name='reporte_accesos'),
+    path('archivo/', archivo_meses, name='archivo_meses'),
+    path('archivo/<str:mes>/', archivo_mes, name='archivo_mes'),
 
     path('<path:resource>', api_not_found),
 
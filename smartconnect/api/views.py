@@ -1,4 +1,11 @@
-from django.http import Http404
+import io
+import json
+
+from django.db.models import Sum, Min, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from django.utils import timezone
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
@@ -8,15 +15,32 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
 from zonas.models import Departamento
-from sensores.models import Sensor, Barrera, EventoAcceso
+from sensores.models import Sensor, Barrera, EventoAcceso, IntentoDesconocido
+from sensores.cache import sensor_cache, obtener_autorizacion, invalidar_sensor
+from sensores.buffer import evento_buffer, registrar_evento
+from sensores.signals import eventos_registrados
+from sensores.bloom import filtro_uids
+from sensores.desconocidos import contador_desconocidos, registrar_desconocido
+from sensores.archivo import archivo
+from sensores import lista_acceso, masivo, resumen
 from .serializers import (
     DepartamentoSerializer,
     SensorSerializer,
     BarreraSerializer,
     EventoAccesoSerializer,
     EventoCreateSerializer,
+    IntentoLoteSerializer,
+    IntentoDesconocidoSerializer,
+    CambioEstadoMasivoSerializer,
+    ReporteAccesosFiltroSerializer,
 )
 from .permissions import IsAdminOrReadOnly
+from .filters import filtrar_eventos, filtrar_archivados, EVENTO_ORDEN
+from .pagination import EventoPagination, SensorPagination
+from . import export, importacion, lectura
+from .condicional import ETagMixin
+from .authentication import usuario_cache
+from .stream import broker, publicar_barrera
 
 
 # ---------- Endpoints informativos ----------
@@ -43,12 +67,27 @@ def info(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def metricas(request):
+    return Response({
+        "sensor_cache": sensor_cache.stats(),
+        "evento_buffer": evento_buffer.stats() if evento_buffer else None,
+        "filtro_uids": filtro_uids.stats(),
+        "stream": broker.stats(),
+        "usuario_cache": usuario_cache.stats(),
+        "intentos_desconocidos": contador_desconocidos.stats(),
+    })
+
+
 # ---------- ViewSets CRUD ----------
 
-class DepartamentoViewSet(viewsets.ModelViewSet):
+class DepartamentoViewSet(ETagMixin, lectura.CamposParcialesMixin, lectura.ListadoRapidoMixin,
+                          viewsets.ModelViewSet):
     queryset = Departamento.objects.all()
     serializer_class = DepartamentoSerializer
     permission_classes = [IsAdminOrReadOnly]
+    mapeo_lectura = lectura.DEPARTAMENTO
 
     def get_object(self):
         try:
@@ -57,10 +96,13 @@ class DepartamentoViewSet(viewsets.ModelViewSet):
             raise NotFound("Departamento / zona no encontrada.")
 
 
-class SensorViewSet(viewsets.ModelViewSet):
+class SensorViewSet(ETagMixin, lectura.CamposParcialesMixin, lectura.ListadoRapidoMixin,
+                    viewsets.ModelViewSet):
     queryset = Sensor.objects.select_related('departamento', 'usuario')
     serializer_class = SensorSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = SensorPagination
+    mapeo_lectura = lectura.SENSOR
 
     def get_object(self):
         try:
@@ -68,6 +110,19 @@ class SensorViewSet(viewsets.ModelViewSet):
         except Http404:
             raise NotFound("Sensor no encontrado.")
 
+    # POST /api/sensores/importar/ (multipart, campo "archivo"; solo ADMIN)
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            raise ValidationError({'archivo': "Adjunte un archivo CSV."})
+        texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importacion.importar(texto)
+        except UnicodeDecodeError:
+            raise ValidationError({'archivo': "El archivo debe estar codificado en UTF-8."})
+        return Response(resultado.resumen())
+
     # Acción extra para cambiar estado desde la API
     @action(detail=True, methods=['post'])
     def cambiar_estado(self, request, pk=None):
@@ -82,10 +137,34 @@ class SensorViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
+        # Un sensor bloqueado debe denegarse de inmediato
+        invalidar_sensor(sensor.uid)
+
         return Response(serializer.data)
 
+    # POST /api/sensores/cambiar_estado/ {"estado", "departamento"|"usuario"|"uids", "detalle"}
+    @action(detail=False, methods=['post'], url_path='cambiar_estado', url_name='cambiar-estado-masivo')
+    def cambiar_estado_masivo(self, request):
+        serializer = CambioEstadoMasivoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        estado = serializer.validated_data['estado']
 
-class BarreraViewSet(viewsets.ModelViewSet):
+        try:
+            modificados = masivo.cambiar_estado(
+                serializer.sensores(),
+                estado,
+                usuario_id=request.user.pk,
+                detalle=serializer.validated_data.get('detalle', ''),
+            )
+        except masivo.SinResponsable as exc:
+            raise ValidationError({
+                'estado': "Un sensor BLOQUEADO debe estar asociado a un usuario responsable.",
+                'sin_usuario': exc.uids[:100],
+            })
+        return Response({'estado': estado, 'modificados': modificados})
+
+
+class BarreraViewSet(ETagMixin, viewsets.ModelViewSet):
     queryset = Barrera.objects.all()
     serializer_class = BarreraSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -96,47 +175,112 @@ class BarreraViewSet(viewsets.ModelViewSet):
         except Http404:
             raise NotFound("Barrera no encontrada.")
 
-    @action(detail=True, methods=['post'])
-    def abrir(self, request, pk=None):
+    def _transicionar(self, estado, accion, detalle):
         barrera = self.get_object()
-        barrera.estado = 'ABIERTA'
-        barrera.save()
 
-        EventoAcceso.objects.create(
+        # UPDATE condicional: dos requests concurrentes no se pisan
+        ahora = timezone.now()
+        if Barrera.objects.filter(pk=barrera.pk).transicionar(estado, ahora):
+            barrera.estado, barrera.actualizado_en = estado, ahora
+            publicar_barrera(barrera.departamento_id, estado, barrera.pk)
+        else:
+            # ya estaba en ese estado (quizá por otro request): se informa lo escrito
+            barrera.refresh_from_db(fields=['estado', 'actualizado_en'])
+
+        registrar_evento(
             sensor=None,
-            usuario=request.user,
+            usuario_id=self.request.user.pk,
+            departamento_id=barrera.departamento_id,
             tipo='MANUAL',
-            accion='ABRIR',
+            accion=accion,
             resultado='PERMITIDO',
-            detalle='Apertura manual desde API',
+            detalle=detalle,
         )
         return Response(self.get_serializer(barrera).data)
 
+    @action(detail=True, methods=['post'])
+    def abrir(self, request, pk=None):
+        return self._transicionar('ABIERTA', 'ABRIR', 'Apertura manual desde API')
+
     @action(detail=True, methods=['post'])
     def cerrar(self, request, pk=None):
-        barrera = self.get_object()
-        barrera.estado = 'CERRADA'
-        barrera.save()
+        return self._transicionar('CERRADA', 'CERRAR', 'Cierre manual desde API')
 
-        EventoAcceso.objects.create(
-            sensor=None,
-            usuario=request.user,
-            tipo='MANUAL',
-            accion='CERRAR',
-            resultado='PERMITIDO',
-            detalle='Cierre manual desde API',
+
+class IntentoDesconocidoViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Intentos con UID no registrado, agregados por (uid, bucket). Los
+    conteos se vuelcan cada INTENTOS_DESCONOCIDOS["FLUSH_INTERVAL"].
+    """
+    queryset = IntentoDesconocido.objects.order_by('-bucket', '-intentos')
+    serializer_class = IntentoDesconocidoSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+    # UIDs con más intentos en las últimas ?horas= (default 24)
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        try:
+            horas = int(request.query_params.get('horas', 24))
+            limite = min(int(request.query_params.get('limite', 20)), 500)
+        except ValueError:
+            raise ValidationError({"detail": "horas y limite deben ser enteros."})
+
+        desde = IntentoDesconocido.bucket_de(
+            timezone.now() - timezone.timedelta(hours=horas)
         )
-        return Response(self.get_serializer(barrera).data)
+        top = (
+            IntentoDesconocido.objects
+            .filter(bucket__gte=desde)
+            .values('uid')
+            .annotate(
+                intentos=Sum('intentos'),
+                primer_intento=Min('primer_intento'),
+                ultimo_intento=Max('ultimo_intento'),
+            )
+            .order_by('-intentos')[:limite]
+        )
+        return Response(list(top))
 
 
-class EventoAccesoViewSet(viewsets.ReadOnlyModelViewSet):
+class EventoAccesoViewSet(lectura.CamposParcialesMixin, lectura.ListadoRapidoMixin,
+                          viewsets.ReadOnlyModelViewSet):
     """
     Historial de eventos (solo lectura).
     Admin y Operador pueden ver.
+    Filtros: ?desde=&hasta=&sensor=&usuario=&departamento=&resultado=&tipo=
+    Paginado por cursor: ?cursor=&page_size=
+    Campos: ?fields=id,resultado o ?exclude=detalle
+    Exportación completa en streaming: /api/eventos/exportar/
     """
     queryset = EventoAcceso.objects.select_related('sensor', 'usuario')
     serializer_class = EventoAccesoSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = EventoPagination
+    mapeo_lectura = lectura.EVENTO
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'exportar'):
+            queryset = filtrar_eventos(queryset, self.request.query_params)
+        return queryset.order_by(*EVENTO_ORDEN)
+
+    # GET /api/eventos/exportar/?formato=ndjson|csv&gzip=1 (+ filtros del listado)
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        formato = request.query_params.get('formato', 'ndjson')
+        if formato not in export.FORMATOS:
+            raise ValidationError({'formato': f"Use uno de: {', '.join(export.FORMATOS)}."})
+        comprimir = request.query_params.get('gzip') in ('1', 'true')
+
+        response = StreamingHttpResponse(
+            export.exportar(self.get_queryset(), formato, comprimir),
+            content_type='application/gzip' if comprimir else export.FORMATOS[formato][0],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export.nombre_archivo(formato, comprimir)}"'
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 # ---------- Crear evento + controlar barrera ----------
@@ -159,10 +303,7 @@ class EventoCreateAPI(APIView):
                 "resultado": evento.resultado,
                 "accion": evento.accion,
                 "tipo": evento.tipo,
-                "barrera_estado": (
-                    Barrera.objects.first().estado
-                    if Barrera.objects.exists() else "SIN_BARRERA"
-                ),
+                "barrera_estado": serializer.barrera_estado,
                 "fecha": evento.fecha_hora
             }, status=status.HTTP_201_CREATED)
 
@@ -179,27 +320,21 @@ def intento_acceso_uid(request):
     if not uid:
         raise ValidationError({"uid": "Este campo es requerido."})
 
-    try:
-        sensor = Sensor.objects.get(uid=uid)
-    except Sensor.DoesNotExist:
-        EventoAcceso.objects.create(
-            sensor=None,
-            usuario=None,
-            tipo='INTENTO',
-            accion='INTENTO',
-            resultado='DENEGADO',
-            detalle='UID no registrado en el sistema',
-        )
+    sensor = obtener_autorizacion(uid)
+    if sensor is None:
+        # UID no registrado: contador en memoria, sin escritura por intento
+        registrar_desconocido(uid)
         return Response(
             {"resultado": "DENEGADO", "detalle": "UID no válido"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
     # Sensor existe: validar estado
-    if sensor.estado in ['INACTIVO', 'BLOQUEADO', 'PERDIDO']:
-        EventoAcceso.objects.create(
-            sensor=sensor,
-            usuario=sensor.usuario,
+    if sensor.estado in Sensor.ESTADOS_DENEGADOS:
+        registrar_evento(
+            sensor_id=sensor.id,
+            usuario_id=sensor.usuario_id,
+            departamento_id=sensor.departamento_id,
             tipo='INTENTO',
             accion='INTENTO',
             resultado='DENEGADO',
@@ -211,9 +346,10 @@ def intento_acceso_uid(request):
         )
 
     # Acceso permitido
-    EventoAcceso.objects.create(
-        sensor=sensor,
-        usuario=sensor.usuario,
+    registrar_evento(
+        sensor_id=sensor.id,
+        usuario_id=sensor.usuario_id,
+        departamento_id=sensor.departamento_id,
         tipo='INTENTO',
         accion='INTENTO',
         resultado='PERMITIDO',
@@ -223,3 +359,186 @@ def intento_acceso_uid(request):
         {"resultado": "PERMITIDO", "detalle": "Acceso autorizado"},
         status=status.HTTP_200_OK,
     )
+
+
+# ---------- Intentos de acceso en lote (reenvío offline NodeMCU) ----------
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def intento_acceso_lote(request):
+    """
+    Recibe [{uid, fecha_hora}, ...] acumulados por el dispositivo sin red.
+    Resuelve todos los UID en una consulta, inserta los eventos en un
+    bulk_create y devuelve un resultado por intento, en el mismo orden.
+    Los UID desconocidos se suman a IntentoDesconocido.
+    """
+    data = request.data
+    if isinstance(data, list):
+        data = {"intentos": data}
+
+    serializer = IntentoLoteSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    intentos = serializer.validated_data["intentos"]
+
+    sensores = {
+        uid: (sensor_id, estado, usuario_id, departamento_id)
+        for uid, sensor_id, estado, usuario_id, departamento_id in Sensor.objects
+        .filter(uid__in={intento["uid"] for intento in intentos})
+        .values_list("uid", "id", "estado", "usuario_id", "departamento_id")
+    }
+
+    ahora = timezone.now()
+    eventos = []
+    resultados = []
+    desconocidos = {}
+    for intento in intentos:
+        uid = intento["uid"]
+        # no se aceptan horas futuras por desfase del reloj del dispositivo
+        fecha_hora = min(intento.get("fecha_hora") or ahora, ahora)
+
+        sensor = sensores.get(uid)
+        if sensor is None:
+            clave = (uid, IntentoDesconocido.bucket_de(fecha_hora))
+            veces, primero, ultimo = desconocidos.get(clave, (0, fecha_hora, fecha_hora))
+            desconocidos[clave] = (
+                veces + 1, min(primero, fecha_hora), max(ultimo, fecha_hora)
+            )
+            resultados.append({
+                "uid": uid, "resultado": "DENEGADO", "detalle": "UID no válido",
+            })
+            continue
+
+        sensor_id, estado, usuario_id, departamento_id = sensor
+        if estado in Sensor.ESTADOS_DENEGADOS:
+            resultado, detalle = "DENEGADO", f"Sensor en estado {estado}"
+            respuesta = "Sensor no autorizado"
+        else:
+            resultado, detalle = "PERMITIDO", "Acceso concedido"
+            respuesta = "Acceso autorizado"
+
+        eventos.append(EventoAcceso(
+            sensor_id=sensor_id,
+            usuario_id=usuario_id,
+            departamento_id=departamento_id,
+            tipo='INTENTO',
+            accion='INTENTO',
+            resultado=resultado,
+            detalle=detalle,
+            fecha_hora=fecha_hora,
+        ))
+        resultados.append({
+            "uid": uid, "resultado": resultado, "detalle": respuesta,
+        })
+
+    if eventos:
+        EventoAcceso.objects.bulk_create(eventos)
+        eventos_registrados.send(sender=EventoAcceso, eventos=eventos)
+
+    for (uid, _bucket), (veces, primero, ultimo) in desconocidos.items():
+        registrar_desconocido(uid, primero, ultimo, veces)
+
+    return Response({"resultados": resultados}, status=status.HTTP_200_OK)
+
+
+# ---------- Lista de acceso offline para lectores ----------
+
+def _entero_param(request, nombre, requerido=False):
+    valor = request.query_params.get(nombre)
+    if valor in (None, ""):
+        if requerido:
+            raise ValidationError({nombre: "Este parámetro es requerido."})
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValidationError({nombre: "Debe ser un entero."})
+
+
+def _respuesta_firmada(request, datos):
+    """
+    JSON compacto con su firma HMAC en X-Firma (calculada sobre el cuerpo
+    sin comprimir). Se comprime con gzip si el cliente lo acepta.
+    """
+    payload = lista_acceso.serializar(datos)
+    response = HttpResponse(content_type="application/json")
+    response["X-Firma"] = lista_acceso.firmar(payload)
+    response["X-Lista-Version"] = str(datos["version"])
+
+    if "gzip" in request.headers.get("Accept-Encoding", "") and len(payload) > 512:
+        payload = compress_string(payload)
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ["Accept-Encoding"])
+
+    response.content = payload
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lista_acceso_snapshot(request):
+    datos = lista_acceso.snapshot(_entero_param(request, "departamento"))
+    return _respuesta_firmada(request, datos)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lista_acceso_delta(request):
+    try:
+        datos = lista_acceso.delta(
+            _entero_param(request, "desde", requerido=True),
+            _entero_param(request, "departamento"),
+        )
+    except lista_acceso.VersionNoDisponible as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_410_GONE)
+    return _respuesta_firmada(request, datos)
+
+
+# ---------- Reportes (desde el resumen horario) ----------
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reporte_accesos(request):
+    """
+    Permitidos / denegados por hora (o ?agrupar=dia) y departamento.
+    Filtros: ?desde=&hasta= (por defecto últimos 7 días), ?departamento=, ?sensor=
+    """
+    filtro = ReporteAccesosFiltroSerializer(data=request.query_params)
+    filtro.is_valid(raise_exception=True)
+    datos = filtro.validated_data
+    return Response(resumen.reporte(
+        datos['desde'],
+        datos['hasta'],
+        departamento_id=datos.get('departamento'),
+        sensor_id=datos.get('sensor'),
+        agrupar=datos['agrupar'],
+    ))
+
+
+# ---------- Eventos archivados (solo lectura) ----------
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def archivo_meses(request):
+    """Meses archivados con su cantidad de eventos y rango de fechas."""
+    meses = archivo.meses()
+    return Response([{"mes": mes, **meses[mes]} for mes in sorted(meses)])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def archivo_mes(request, mes):
+    """
+    Eventos de un mes archivado en NDJSON (streaming).
+    Acepta los mismos filtros que /api/eventos/.
+    """
+    if mes not in archivo.meses():
+        raise NotFound("Mes no archivado.")
+
+    registros = filtrar_archivados(archivo.leer(mes), request.query_params)
+    lineas = (
+        json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for registro in registros
+    )
+    response = StreamingHttpResponse(lineas, content_type="application/x-ndjson")
+    response["Content-Disposition"] = f'attachment; filename="eventos-{mes}.ndjson"'
+    return response
@@ -0,0 +1,254 @@
+"""
+Archivo en frío de EventoAcceso: los eventos más antiguos que la ventana
+de retención salen de la tabla en lotes acotados y se guardan en un
+NDJSON comprimido por mes (eventos-YYYY-MM.ndjson.gz) con un índice
+(indice.json) que describe cada mes.
+
+Los lotes avanzan por keyset sobre (fecha_hora, id) desde la posición
+guardada en MarcaProceso("eventos_archivo"), sin volver a recorrer el
+inicio del índice en cada lote. Cuando el cursor ya no encuentra filas se
+hace una última pasada desde el principio para recoger eventos antiguos
+que llegaron tarde (lotes offline de los lectores).
+
+Cada lote se agrega al archivo como un miembro gzip independiente y se
+registra "en curso" en el índice antes del DELETE; si el proceso muere a
+medias, recuperar() decide según la BD si el lote se confirmó (se
+conserva) o no (se trunca el archivo), así no hay eventos duplicados ni
+perdidos.
+"""
+import gzip
+import io
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EventoAcceso, MarcaProceso
+
+MARCA = "eventos_archivo"
+
+# (clave en el NDJSON, campo en values_list)
+COLUMNAS = (
+    ("id", "id"),
+    ("fecha_hora", "fecha_hora"),
+    ("sensor", "sensor_id"),
+    ("sensor_uid", "sensor__uid"),
+    ("usuario", "usuario_id"),
+    ("usuario_email", "usuario__email"),
+    ("departamento", "departamento_id"),
+    ("tipo", "tipo"),
+    ("accion", "accion"),
+    ("resultado", "resultado"),
+    ("detalle", "detalle"),
+)
+
+
+def _config():
+    return getattr(settings, "EVENTO_ARCHIVO", {})
+
+
+def mes_de(fecha_hora):
+    return timezone.localtime(fecha_hora).strftime("%Y-%m")
+
+
+def corte_retencion(dias=None):
+    """Inicio de la hora local más antigua que se conserva en la tabla."""
+    if dias is None:
+        dias = _config().get("RETENCION_DIAS", 180)
+    corte = timezone.localtime() - timezone.timedelta(days=dias)
+    return corte.replace(minute=0, second=0, microsecond=0)
+
+
+class Archivo:
+
+    def __init__(self, directorio=None):
+        self.directorio = str(directorio or _config().get("DIR"))
+        self._ruta_indice = os.path.join(self.directorio, "indice.json")
+
+    # ---------- Índice ----------
+
+    def indice(self):
+        try:
+            with open(self._ruta_indice) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"meses": {}, "en_curso": None}
+
+    def _guardar_indice(self, indice):
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = self._ruta_indice + ".tmp"
+        with open(temporal, "w") as f:
+            json.dump(indice, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta_indice)
+
+    def meses(self):
+        return self.indice()["meses"]
+
+    def ruta(self, mes):
+        return os.path.join(self.directorio, f"eventos-{mes}.ndjson.gz")
+
+    # ---------- Escritura ----------
+
+    def recuperar(self):
+        """Completa o deshace un lote interrumpido."""
+        indice = self.indice()
+        en_curso = indice.get("en_curso")
+        if not en_curso:
+            return
+
+        if EventoAcceso.objects.filter(id__in=en_curso["ids"]).exists():
+            # el DELETE no se confirmó: se quita lo escrito del archivo
+            for mes, offset in en_curso["offsets"].items():
+                if os.path.exists(self.ruta(mes)):
+                    with open(self.ruta(mes), "r+b") as f:
+                        f.truncate(offset)
+        else:
+            indice["meses"].update(en_curso["meses"])
+        indice["en_curso"] = None
+        self._guardar_indice(indice)
+
+    def archivar_lote(self, corte, lote=5000):
+        """
+        Mueve al archivo hasta `lote` eventos con fecha_hora < corte, los
+        más antiguos primero. Devuelve cuántos movió (0 = terminado).
+        """
+        campos = [campo for _, campo in COLUMNAS]
+        nombres = [nombre for nombre, _ in COLUMNAS]
+
+        with transaction.atomic():
+            # un solo archivador a la vez; la marca guarda el último
+            # (fecha_hora, id) archivado
+            marca, _ = MarcaProceso.objects.select_for_update().get_or_create(nombre=MARCA)
+            self.recuperar()
+
+            pendientes = (
+                EventoAcceso.objects
+                .filter(fecha_hora__lt=corte)
+                .order_by("fecha_hora", "id")
+                .values_list(*campos)
+            )
+            filas = []
+            if marca.fecha is not None:
+                filas = list(pendientes.filter(
+                    Q(fecha_hora__gt=marca.fecha) | Q(fecha_hora=marca.fecha, id__gt=marca.valor)
+                )[:lote])
+            if not filas:
+                # cursor agotado: pasada desde el inicio por eventos tardíos
+                filas = list(pendientes[:lote])
+            if not filas:
+                return 0
+
+            por_mes = {}
+            for fila in filas:
+                registro = dict(zip(nombres, fila))
+                por_mes.setdefault(mes_de(registro["fecha_hora"]), []).append(registro)
+
+            # se registra el lote antes de tocar los archivos, para poder
+            # truncarlos si algo falla a medio camino
+            indice = self.indice()
+            en_curso = indice["en_curso"] = {
+                "ids": [fila[0] for fila in filas],
+                "offsets": {mes: self._tamano(mes) for mes in por_mes},
+                "meses": {},
+            }
+            self._guardar_indice(indice)
+
+            for mes, registros in por_mes.items():
+                self._agregar(mes, registros)
+                en_curso["meses"][mes] = self._resumen_mes(
+                    indice["meses"].get(mes), mes, registros
+                )
+            self._guardar_indice(indice)
+
+            EventoAcceso.objects.filter(id__in=en_curso["ids"]).delete()
+            marca.fecha, marca.valor = filas[-1][1], filas[-1][0]
+            marca.save(update_fields=["fecha", "valor", "actualizado_en"])
+
+        indice["meses"].update(en_curso["meses"])
+        indice["en_curso"] = None
+        self._guardar_indice(indice)
+        return len(filas)
+
+    def _tamano(self, mes):
+        try:
+            return os.path.getsize(self.ruta(mes))
+        except FileNotFoundError:
+            return 0
+
+    def _agregar(self, mes, registros):
+        """Agrega los registros al archivo del mes como un nuevo miembro gzip."""
+        os.makedirs(self.directorio, exist_ok=True)
+        datos = "".join(
+            json.dumps(
+                {**r, "fecha_hora": r["fecha_hora"].isoformat()},
+                ensure_ascii=False, separators=(",", ":"),
+            ) + "\n"
+            for r in registros
+        ).encode()
+
+        with open(self.ruta(mes), "ab") as f:
+            f.write(gzip.compress(datos))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _resumen_mes(self, previo, mes, registros):
+        fechas = [r["fecha_hora"].isoformat() for r in registros]
+        ids = [r["id"] for r in registros]
+        previo = previo or {
+            "archivo": os.path.basename(self.ruta(mes)),
+            "eventos": 0,
+            "desde": min(fechas),
+            "hasta": max(fechas),
+            "primer_id": min(ids),
+            "ultimo_id": max(ids),
+        }
+        return {
+            **previo,
+            "eventos": previo["eventos"] + len(registros),
+            "desde": min(previo["desde"], min(fechas)),
+            "hasta": max(previo["hasta"], max(fechas)),
+            "primer_id": min(previo["primer_id"], min(ids)),
+            "ultimo_id": max(previo["ultimo_id"], max(ids)),
+            "bytes": self._tamano(mes),
+        }
+
+    # ---------- Lectura ----------
+
+    def leer(self, mes):
+        """Eventos archivados del mes (dicts), en el orden en que se archivaron."""
+        info = self.meses().get(mes)
+        if info is None:
+            raise KeyError(mes)
+        with open(self.ruta(mes), "rb") as crudo:
+            # solo hasta el tamaño confirmado en el índice: ignora un lote en curso
+            acotado = io.BufferedReader(_Acotado(crudo, info["bytes"]))
+            with gzip.open(acotado, "rt", encoding="utf-8") as f:
+                for linea in f:
+                    yield json.loads(linea)
+
+
+class _Acotado(io.RawIOBase):
+    """Vista de solo lectura de los primeros `limite` bytes de un archivo."""
+
+    def __init__(self, f, limite):
+        self._f = f
+        self._restante = limite
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._restante <= 0:
+            return 0
+        vista = memoryview(buffer)[:self._restante]
+        n = self._f.readinto(vista)
+        self._restante -= n
+        return n
+
+
+archivo = Archivo()
@@ -0,0 +1,155 @@
+"""
+Filtro de Bloom con los UID registrados.
+
+Permite rechazar UID desconocidos (clonación de tarjetas, lectores con
+ruido) sin consultar la BD. Un "no" del filtro es definitivo; un "quizás"
+se confirma contra la BD como siempre.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from smartconnect.cache import cache_por_proceso
+from .models import Sensor
+
+GENERACION_KEY = "sensores:uids:generacion"
+
+
+class BloomFilter:
+
+    def __init__(self, capacidad, fp_rate=0.01):
+        capacidad = max(int(capacidad), 1)
+        self.capacidad = capacidad
+        self.fp_rate = fp_rate
+        self.num_bits = max(
+            8, int(math.ceil(-capacidad * math.log(fp_rate) / math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _posiciones(self, valor):
+        digest = hashlib.blake2b(valor.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, valor):
+        for pos in self._posiciones(valor):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, valor):
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posiciones(valor)
+        )
+
+    @property
+    def memory_bytes(self):
+        return len(self.bits)
+
+    def estimated_fp_rate(self):
+        """Tasa de falsos positivos esperada con los elementos cargados."""
+        return (
+            1 - math.exp(-self.num_hashes * self.count / self.num_bits)
+        ) ** self.num_hashes
+
+
+def bump_generacion():
+    """Marca el filtro como obsoleto en todos los procesos que comparten caché."""
+    try:
+        cache.incr(GENERACION_KEY)
+    except ValueError:
+        cache.set(GENERACION_KEY, time.time_ns(), None)
+
+
+class FiltroUIDs:
+    """
+    Filtro de Bloom por proceso, reconstruido de forma perezosa cuando la
+    generación publicada en la caché de Django cambia (altas, bajas o
+    cambios de UID). Con max_age además se reconstruye si tiene más de
+    max_age segundos: con una caché por proceso y varios workers, un alta
+    hecha en otro worker se rechaza como mucho ese tiempo.
+    """
+
+    def __init__(self, fp_rate=0.01, max_age=None):
+        self.fp_rate = fp_rate
+        self.max_age = max_age
+        self._filtro = None
+        self._generacion = None
+        self._construido = 0.0
+        self._lock = threading.Lock()
+        self.rechazados = 0
+        self.falsos_positivos = 0
+        self.reconstrucciones = 0
+
+    def _generacion_actual(self):
+        generacion = cache.get(GENERACION_KEY)
+        if generacion is None:
+            cache.add(GENERACION_KEY, time.time_ns(), None)
+            generacion = cache.get(GENERACION_KEY)
+        return generacion
+
+    def reconstruir(self, generacion=None):
+        if generacion is None:
+            generacion = self._generacion_actual()
+        uids = list(Sensor.objects.values_list("uid", flat=True))
+
+        filtro = BloomFilter(max(len(uids) * 1.5, 1024), self.fp_rate)
+        for uid in uids:
+            filtro.add(uid)
+
+        with self._lock:
+            self._filtro = filtro
+            self._generacion = generacion
+            self._construido = time.monotonic()
+            self.reconstrucciones += 1
+
+    def _vigente(self, generacion):
+        if self._filtro is None or self._generacion != generacion:
+            return False
+        return self.max_age is None or time.monotonic() - self._construido < self.max_age
+
+    def puede_existir(self, uid):
+        generacion = self._generacion_actual()
+        if not self._vigente(generacion):
+            self.reconstruir(generacion)
+        return self._comprobar(uid)
+
+    async def apuede_existir(self, uid):
+        generacion = self._generacion_actual()
+        if not self._vigente(generacion):
+            await sync_to_async(self.reconstruir)(generacion)
+        return self._comprobar(uid)
+
+    def _comprobar(self, uid):
+        if uid in self._filtro:
+            return True
+        self.rechazados += 1
+        return False
+
+    def registrar_falso_positivo(self):
+        self.falsos_positivos += 1
+
+    def stats(self):
+        filtro = self._filtro
+        return {
+            "uids": filtro.count if filtro else 0,
+            "memory_bytes": filtro.memory_bytes if filtro else 0,
+            "num_hashes": filtro.num_hashes if filtro else 0,
+            "fp_rate_estimada": round(filtro.estimated_fp_rate(), 6) if filtro else 0.0,
+            "rechazados": self.rechazados,
+            "falsos_positivos": self.falsos_positivos,
+            "reconstrucciones": self.reconstrucciones,
+        }
+
+
+filtro_uids = FiltroUIDs(
+    fp_rate=getattr(settings, "SENSOR_BLOOM_FP_RATE", 0.01),
+    max_age=getattr(settings, "SENSOR_BLOOM_MAX_AGE", 30) if cache_por_proceso() else None,
+)
@@ -0,0 +1,373 @@
+"""
+Write-behind opcional para EventoAcceso.
+
+Los eventos se encolan en un buffer acotado en memoria y un hilo de fondo
+los inserta con bulk_create cuando se alcanza BATCH_SIZE o pasa
+FLUSH_INTERVAL. Cada evento encolado se anota también en un archivo spool
+local; si el proceso muere antes de insertarlo, el siguiente proceso que
+arranque con el mismo SPOOL_DIR lo recupera (entrega al-menos-una-vez).
+
+Si la BD rechaza un lote por sus datos (p. ej. el sensor se eliminó antes
+del flush), el lote se reintenta fila a fila y solo las filas rechazadas
+se apartan en SPOOL_DIR/descartados-<pid>.ndjson; el resto de la cola
+sigue fluyendo.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+
+from .models import EventoAcceso
+from .signals import eventos_registrados
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_CAMPOS = [
+    f for f in EventoAcceso._meta.concrete_fields if not f.primary_key
+]
+
+
+def _a_fila(evento):
+    fila = {}
+    for field in _CAMPOS:
+        value = getattr(evento, field.attname)
+        fila[field.attname] = value.isoformat() if hasattr(value, "isoformat") else value
+    return fila
+
+
+def _desde_fila(fila):
+    return EventoAcceso(**{
+        field.attname: field.to_python(fila.get(field.attname))
+        for field in _CAMPOS
+    })
+
+
+def _bloquear(fh):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class _Segmento:
+    """Lote de eventos ya retirado del buffer, con su archivo spool."""
+
+    def __init__(self, eventos, path=None, fh=None):
+        self.eventos = eventos
+        self.path = path
+        self.fh = fh
+
+    def descartar(self):
+        if self.path:
+            os.unlink(self.path)
+        if self.fh:
+            self.fh.close()
+
+
+class EventoBuffer:
+
+    def __init__(self, max_size=10_000, batch_size=500, flush_interval=1.0,
+                 put_timeout=0.5, spool_dir=None, fsync=False):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+
+        self._eventos = []
+        self._pendientes = []
+        # eventos en _pendientes: también ocupan max_size
+        self._en_pendientes = 0
+        self._cond = threading.Condition()
+        self._escritura = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._spool_path = None
+        self._spool = None
+
+        self.encolados = 0
+        self.insertados = 0
+        self.rechazados = 0
+        self.descartados = 0
+        self.errores = 0
+
+    def _ocupados(self):
+        return len(self._eventos) + self._en_pendientes
+
+    # ----- productor -----
+
+    def put(self, evento, block=True):
+        """
+        Encola el evento. Si el buffer está lleno espera hasta put_timeout
+        (backpressure); si sigue lleno devuelve False y el llamador debe
+        insertar de forma síncrona. Con block=False no espera (vistas async).
+        """
+        with self._cond:
+            if block and self._ocupados() >= self.max_size:
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: self._closed or self._ocupados() < self.max_size,
+                    timeout=self.put_timeout,
+                )
+            if self._closed or self._ocupados() >= self.max_size:
+                self.rechazados += 1
+                return False
+
+            self._iniciar()
+            if self._spool:
+                self._spool.write(json.dumps(_a_fila(evento)) + "\n")
+                self._spool.flush()
+                if self.fsync:
+                    os.fsync(self._spool.fileno())
+
+            self._eventos.append(evento)
+            self.encolados += 1
+            if len(self._eventos) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    # ----- ciclo de vida -----
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+
+        if self.spool_dir:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._recuperar_spool()
+            self._abrir_spool()
+
+        self._thread = threading.Thread(
+            target=self._run, name="evento-write-behind", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self, timeout=10):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ----- spool -----
+
+    def _abrir_spool(self):
+        self._spool_path = os.path.join(
+            self.spool_dir, f"eventos-{os.getpid()}-{time.time_ns()}.spool"
+        )
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+        _bloquear(self._spool)
+
+    def _rotar_spool(self):
+        path = f"{self._spool_path}.pendiente"
+        os.replace(self._spool_path, path)
+        segmento_fh = self._spool
+        self._abrir_spool()
+        return path, segmento_fh
+
+    def _recuperar_spool(self):
+        patron = os.path.join(self.spool_dir, "eventos-*")
+        for path in sorted(glob.glob(patron)):
+            fh = open(path, "r+", encoding="utf-8")
+            if not _bloquear(fh):
+                # el proceso dueño sigue vivo
+                fh.close()
+                continue
+
+            eventos = []
+            for linea in fh:
+                try:
+                    eventos.append(_desde_fila(json.loads(linea)))
+                except ValueError:
+                    # última línea truncada por una caída a mitad de escritura
+                    logger.warning("Línea inválida en spool %s", path)
+            logger.info("Recuperados %d eventos de %s", len(eventos), path)
+            self._pendientes.append(_Segmento(eventos, path, fh))
+            self._en_pendientes += len(eventos)
+
+    # ----- consumidor -----
+
+    def _retirar(self):
+        """Pasa lo encolado a un segmento pendiente (con self._cond tomado)."""
+        if not self._eventos:
+            return
+        eventos, self._eventos = self._eventos, []
+        path = fh = None
+        if self._spool:
+            path, fh = self._rotar_spool()
+        self._pendientes.append(_Segmento(eventos, path, fh))
+        self._en_pendientes += len(eventos)
+
+    def flush(self):
+        """Inserta de inmediato lo encolado, sin esperar al hilo de fondo."""
+        with self._cond:
+            self._retirar()
+        self._escribir_pendientes()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._eventos) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                cerrado = self._closed
+                self._retirar()
+
+            self._escribir_pendientes()
+
+            if cerrado:
+                if self._spool and not self._pendientes:
+                    self._spool.close()
+                    os.unlink(self._spool_path)
+                return
+
+    def _escribir_pendientes(self):
+        with self._escritura:
+            if not self._pendientes:
+                return
+
+            close_old_connections()
+            while self._pendientes:
+                segmento = self._pendientes[0]
+                try:
+                    insertados = self._insertar(segmento.eventos)
+                except Exception:
+                    # error transitorio (BD caída, timeout): se reintenta en
+                    # el siguiente ciclo; el spool sigue en disco
+                    self.errores += 1
+                    logger.exception("Error insertando lote de eventos")
+                    close_old_connections()
+                    return
+
+                with self._cond:
+                    self._pendientes.pop(0)
+                    self._en_pendientes -= len(segmento.eventos)
+                    self._cond.notify_all()
+                segmento.descartar()
+                self.insertados += len(insertados)
+                if insertados:
+                    eventos_registrados.send(sender=EventoAcceso, eventos=insertados)
+
+    def _insertar(self, eventos):
+        """
+        bulk_create del lote. Si la BD rechaza los datos, reintenta fila a
+        fila y aparta las que fallan. Devuelve los eventos insertados.
+        """
+        try:
+            with transaction.atomic():
+                EventoAcceso.objects.bulk_create(eventos, batch_size=self.batch_size)
+            return eventos
+        except (IntegrityError, DataError):
+            self.errores += 1
+            logger.warning(
+                "Lote de %d eventos rechazado por la BD; se reintenta fila a fila",
+                len(eventos),
+            )
+
+        insertados = []
+        for evento in eventos:
+            # bulk_create pudo asignar pk antes del rollback
+            evento.pk = None
+            evento._state.adding = True
+            try:
+                with transaction.atomic():
+                    EventoAcceso.objects.bulk_create([evento])
+            except (IntegrityError, DataError) as exc:
+                self._descartar(evento, exc)
+            else:
+                insertados.append(evento)
+        return insertados
+
+    def _descartar(self, evento, error):
+        self.descartados += 1
+        fila = _a_fila(evento)
+        logger.error("Evento descartado por la BD (%s): %s", error, fila)
+        if not self.spool_dir:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"descartados-{os.getpid()}.ndjson")
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps({**fila, "error": str(error)}) + "\n")
+
+    def stats(self):
+        return {
+            "en_buffer": len(self._eventos),
+            "lotes_pendientes": len(self._pendientes),
+            "eventos_pendientes": self._en_pendientes,
+            "max_size": self.max_size,
+            "encolados": self.encolados,
+            "insertados": self.insertados,
+            "rechazados": self.rechazados,
+            "descartados": self.descartados,
+            "errores": self.errores,
+        }
+
+
+_config = getattr(settings, "EVENTO_WRITE_BEHIND", {})
+
+evento_buffer = None
+if _config.get("ENABLED"):
+    evento_buffer = EventoBuffer(
+        max_size=_config.get("MAX_SIZE", 10_000),
+        batch_size=_config.get("BATCH_SIZE", 500),
+        flush_interval=_config.get("FLUSH_INTERVAL", 1.0),
+        put_timeout=_config.get("PUT_TIMEOUT", 0.5),
+        spool_dir=_config.get("SPOOL_DIR"),
+        fsync=_config.get("FSYNC", False),
+    )
+
+
+def registrar_evento(**campos):
+    """
+    Crea un EventoAcceso. Con write-behind activo lo encola y retorna sin
+    esperar el INSERT (la instancia devuelta aún no tiene pk).
+    """
+    evento = EventoAcceso(**campos)
+
+    if evento_buffer is not None and evento_buffer.put(evento):
+        return evento
+
+    evento.save()
+    eventos_registrados.send(sender=EventoAcceso, eventos=[evento])
+    return evento
+
+
+async def aregistrar_evento(**campos):
+    """
+    Versión async de registrar_evento; nunca bloquea el event loop. Con
+    spool, put() escribe en disco (y la primera vez recupera los spools
+    anteriores), así que se ejecuta en un hilo del executor.
+    """
+    evento = EventoAcceso(**campos)
+
+    if evento_buffer is not None:
+        if evento_buffer.spool_dir:
+            encolado = await sync_to_async(evento_buffer.put, thread_sensitive=False)(
+                evento, block=False
+            )
+        else:
+            encolado = evento_buffer.put(evento, block=False)
+        if encolado:
+            return evento
+
+    await evento.asave()
+    await eventos_registrados.asend(sender=EventoAcceso, eventos=[evento])
+    return evento
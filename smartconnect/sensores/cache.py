@@ -0,0 +1,80 @@
+from typing import NamedTuple
+
+from django.conf import settings
+
+from smartconnect.cache import LRUTTLCache
+from .bloom import filtro_uids
+from .models import Sensor
+
+
+class SensorAutorizacion(NamedTuple):
+    id: int
+    estado: str
+    usuario_id: int | None
+    departamento_id: int
+
+
+_config = getattr(settings, "SENSOR_CACHE", {})
+
+# uid -> SensorAutorizacion (por proceso). Se invalida con las señales de
+# Sensor; entre workers distintos la obsolescencia queda acotada por el TTL.
+sensor_cache = LRUTTLCache(
+    max_size=_config.get("MAX_SIZE", 10_000),
+    ttl=_config.get("TTL", 30),
+)
+
+
+def obtener_autorizacion(uid):
+    """
+    Devuelve (id, estado, usuario_id, departamento_id) del sensor con ese UID, o None si
+    no existe. Solo consulta la BD cuando el UID no está en caché y el
+    filtro de Bloom no lo descarta.
+    """
+    autorizacion = sensor_cache.get(uid)
+    if autorizacion is not None:
+        return autorizacion
+
+    if not filtro_uids.puede_existir(uid):
+        return None
+
+    fila = (
+        Sensor.objects
+        .filter(uid=uid)
+        .values_list("id", "estado", "usuario_id", "departamento_id")
+        .first()
+    )
+    if fila is None:
+        filtro_uids.registrar_falso_positivo()
+        return None
+
+    autorizacion = SensorAutorizacion(*fila)
+    sensor_cache.set(uid, autorizacion)
+    return autorizacion
+
+
+async def aobtener_autorizacion(uid):
+    """Versión async de obtener_autorizacion (ORM async de Django)."""
+    autorizacion = sensor_cache.get(uid)
+    if autorizacion is not None:
+        return autorizacion
+
+    if not await filtro_uids.apuede_existir(uid):
+        return None
+
+    fila = await (
+        Sensor.objects
+        .filter(uid=uid)
+        .values_list("id", "estado", "usuario_id", "departamento_id")
+        .afirst()
+    )
+    if fila is None:
+        filtro_uids.registrar_falso_positivo()
+        return None
+
+    autorizacion = SensorAutorizacion(*fila)
+    sensor_cache.set(uid, autorizacion)
+    return autorizacion
+
+
+def invalidar_sensor(*uids):
+    sensor_cache.invalidate(*[uid for uid in uids if uid])
@@ -0,0 +1,162 @@
+"""
+Conteo en memoria de intentos con UID no registrado.
+
+Rechazar un UID desconocido no debe costar una escritura por intento (el
+filtro de Bloom ya evita la lectura). Los intentos se suman por (uid,
+bucket) en un dict por proceso y un hilo de fondo los vuelca a
+IntentoDesconocido cada FLUSH_INTERVAL, con un upsert por clave distinta
+en una sola transacción. Si el proceso muere se pierden como mucho los
+conteos del último intervalo.
+"""
+import atexit
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import IntentoDesconocido
+
+logger = logging.getLogger(__name__)
+
+
+class ContadorDesconocidos:
+
+    def __init__(self, max_claves=10_000, flush_interval=5.0):
+        self.max_claves = max_claves
+        self.flush_interval = flush_interval
+
+        # (uid, bucket) -> [veces, primero, ultimo]
+        self._conteos = {}
+        self._cond = threading.Condition()
+        self._escritura = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.sumados = 0
+        self.claves_escritas = 0
+        self.rechazados = 0
+        self.errores = 0
+
+    def sumar(self, uid, primero=None, ultimo=None, veces=1):
+        """
+        Suma `veces` intentos de `uid` sin tocar la BD. Si ya hay
+        max_claves claves pendientes y esta es nueva devuelve False, y el
+        llamador debe usar IntentoDesconocido.registrar.
+        """
+        primero = primero or timezone.now()
+        ultimo = ultimo or primero
+        clave = (uid[:64], IntentoDesconocido.bucket_de(primero))
+
+        with self._cond:
+            conteo = self._conteos.get(clave)
+            if self._closed or (conteo is None and len(self._conteos) >= self.max_claves):
+                self.rechazados += 1
+                self._cond.notify_all()
+                return False
+
+            if conteo is None:
+                self._iniciar()
+                self._conteos[clave] = [veces, primero, ultimo]
+            else:
+                conteo[0] += veces
+                conteo[1] = min(conteo[1], primero)
+                conteo[2] = max(conteo[2], ultimo)
+            self.sumados += veces
+            return True
+
+    # ----- ciclo de vida -----
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="intentos-desconocidos", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self, timeout=10):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ----- consumidor -----
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._conteos) >= self.max_claves,
+                    timeout=self.flush_interval,
+                )
+                cerrado = self._closed
+                pendientes = bool(self._conteos)
+
+            if pendientes:
+                close_old_connections()
+                self.flush()
+            if cerrado:
+                return
+
+    def flush(self):
+        """Vuelca los conteos acumulados a IntentoDesconocido."""
+        with self._escritura:
+            with self._cond:
+                conteos, self._conteos = self._conteos, {}
+            if not conteos:
+                return
+
+            try:
+                with transaction.atomic():
+                    # orden fijo: dos workers no se bloquean en sentido inverso
+                    for (uid, _bucket), (veces, primero, ultimo) in sorted(conteos.items()):
+                        IntentoDesconocido.registrar(uid, primero, ultimo, veces)
+            except Exception:
+                # se reintenta en el siguiente ciclo junto con lo nuevo
+                self.errores += 1
+                logger.exception("Error registrando intentos con UID desconocido")
+                self._devolver(conteos)
+                return
+            self.claves_escritas += len(conteos)
+
+    def _devolver(self, conteos):
+        with self._cond:
+            for clave, (veces, primero, ultimo) in conteos.items():
+                conteo = self._conteos.setdefault(clave, [0, primero, ultimo])
+                conteo[0] += veces
+                conteo[1] = min(conteo[1], primero)
+                conteo[2] = max(conteo[2], ultimo)
+
+    def stats(self):
+        return {
+            "claves_pendientes": len(self._conteos),
+            "max_claves": self.max_claves,
+            "sumados": self.sumados,
+            "claves_escritas": self.claves_escritas,
+            "rechazados": self.rechazados,
+            "errores": self.errores,
+        }
+
+
+_config = getattr(settings, "INTENTOS_DESCONOCIDOS", {})
+
+contador_desconocidos = ContadorDesconocidos(
+    max_claves=_config.get("MAX_CLAVES", 10_000),
+    flush_interval=_config.get("FLUSH_INTERVAL", 5.0),
+)
+
+
+def registrar_desconocido(uid, primero=None, ultimo=None, veces=1):
+    if not contador_desconocidos.sumar(uid, primero, ultimo, veces):
+        IntentoDesconocido.registrar(uid, primero, ultimo, veces)
+
+
+async def aregistrar_desconocido(uid):
+    """Versión async de registrar_desconocido (sale del event loop solo si está lleno)."""
+    if not contador_desconocidos.sumar(uid):
+        await sync_to_async(IntentoDesconocido.registrar)(uid)
@@ -1,4 +1,6 @@
 from django import forms
+from django.db.models import Q
+from zonas.models import Departamento
 from .models import Sensor, Barrera
 
 class BootstrapForm(forms.ModelForm):
@@ -20,6 +22,40 @@ class SensorForm(BootstrapForm):
         return uid
 
 
+class SensorFiltroForm(forms.Form):
+    """Búsqueda y filtros del listado web (GET)."""
+    q = forms.CharField(required=False, max_length=64, label="Buscar")
+    estado = forms.ChoiceField(
+        required=False, choices=[('', 'Todos los estados')] + Sensor.ESTADOS,
+    )
+    departamento = forms.ModelChoiceField(
+        required=False,
+        queryset=Departamento.objects.only('nombre').order_by('nombre'),
+        empty_label="Todos los departamentos",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['q'].widget.attrs['placeholder'] = "UID o alias"
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-select' if isinstance(field, forms.ChoiceField) else 'form-control'
+
+    def filtrar(self, queryset):
+        if not self.is_valid():
+            return queryset
+        datos = self.cleaned_data
+        if datos['q']:
+            # prefijo: usa los índices de uid y alias
+            queryset = queryset.filter(
+                Q(uid__istartswith=datos['q']) | Q(alias__istartswith=datos['q'])
+            )
+        if datos['estado']:
+            queryset = queryset.filter(estado=datos['estado'])
+        if datos['departamento']:
+            queryset = queryset.filter(departamento=datos['departamento'])
+        return queryset
+
+
 class BarreraForm(BootstrapForm):
     class Meta:
         model = Barrera
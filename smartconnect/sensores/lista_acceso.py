@@ -0,0 +1,155 @@
+"""
+Lista de acceso offline para lectores: snapshot firmado de los UID ACTIVO
+por departamento y deltas incrementales a partir de SensorCambio.
+
+El id autoincremental de SensorCambio se asigna al insertar, no al
+confirmar: una transacción lenta puede confirmar un id menor que la
+versión que el lector ya recibió. Por eso cada delta reenvía además los
+cambios de la ventana LISTA_ACCESO_VENTANA_SEGUNDOS anterior a `desde`;
+una transacción que tarde más que la ventana en confirmar puede perderse
+hasta el siguiente snapshot.
+
+podar() borra el historial más antiguo que LISTA_ACCESO_RETENCION_DIAS;
+los lectores con una versión anterior reciben 410 y piden el snapshot.
+"""
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Sensor, SensorCambio
+
+
+class VersionNoDisponible(Exception):
+    """La versión pedida ya no puede servirse como delta (pedir snapshot)."""
+
+
+def _clave_hmac():
+    clave = getattr(settings, "LISTA_ACCESO_HMAC_KEY", None) or settings.SECRET_KEY
+    return hashlib.sha256(f"lista-acceso:{clave}".encode()).digest()
+
+
+def firmar(payload):
+    """HMAC-SHA256 (hex) de los bytes exactos que recibe el lector."""
+    return hmac.new(_clave_hmac(), payload, hashlib.sha256).hexdigest()
+
+
+def serializar(datos):
+    return json.dumps(datos, separators=(",", ":"), sort_keys=True).encode()
+
+
+def version_actual():
+    """Última versión confirmada (los ids menores aún en curso los cubre la ventana)."""
+    return SensorCambio.objects.aggregate(v=Max("id"))["v"] or 0
+
+
+def inicio_ventana(desde):
+    """
+    Id desde el que se envía un delta pedido `desde`: el primero insertado
+    en la ventana previa a la versión `desde`, para recoger los cambios con
+    id menor que se confirmaron después de que el lector la leyera.
+    """
+    referencia = (
+        SensorCambio.objects
+        .filter(id__lte=desde)
+        .order_by("-id")
+        .values_list("creado_en", flat=True)
+        .first()
+    )
+    if referencia is None:
+        return desde
+
+    ventana = getattr(settings, "LISTA_ACCESO_VENTANA_SEGUNDOS", 300)
+    limite = referencia - timedelta(seconds=ventana)
+    primero = (
+        SensorCambio.objects
+        .filter(id__lte=desde, creado_en__gte=limite)
+        .aggregate(primero=Min("id"))["primero"]
+    )
+    return primero - 1
+
+
+def snapshot(departamento_id=None):
+    with transaction.atomic():
+        version = version_actual()
+        sensores = Sensor.objects.filter(estado="ACTIVO")
+        if departamento_id is not None:
+            sensores = sensores.filter(departamento_id=departamento_id)
+
+        departamentos = {}
+        for uid, dep in sensores.values_list("uid", "departamento_id").iterator(chunk_size=5000):
+            departamentos.setdefault(str(dep), []).append(uid)
+
+    for uids in departamentos.values():
+        uids.sort()
+    return {"version": version, "departamentos": departamentos}
+
+
+def delta(desde, departamento_id=None):
+    """
+    Cambios posteriores a `desde` (y los de la ventana previa), compactados
+    al último estado por UID. Se envía un rango continuo de ids, así que el
+    último estado de cada UID incluido es el vigente; aplicar altas/bajas es
+    idempotente, por lo que repetir cambios ya recibidos no afecta al lector.
+    """
+    version = version_actual()
+    if desde > version:
+        raise VersionNoDisponible("Versión desconocida para este servidor.")
+
+    primero = SensorCambio.objects.order_by("id").values_list("id", flat=True).first()
+    if primero is not None and desde < primero - 1:
+        raise VersionNoDisponible("Historial podado; descargue el snapshot.")
+
+    cambios = SensorCambio.objects.filter(id__gt=inicio_ventana(desde), id__lte=version)
+    if departamento_id is not None:
+        cambios = cambios.filter(departamento_id=departamento_id)
+
+    maximo = getattr(settings, "LISTA_ACCESO_DELTA_MAX", 50_000)
+    if cambios.count() > maximo:
+        raise VersionNoDisponible("Demasiados cambios; descargue el snapshot.")
+
+    final = {}
+    for uid, dep, activo in cambios.order_by("id").values_list("uid", "departamento_id", "activo"):
+        final[(uid, dep)] = activo
+
+    altas, bajas = {}, {}
+    for (uid, dep), activo in final.items():
+        (altas if activo else bajas).setdefault(str(dep), []).append(uid)
+    for grupo in (altas, bajas):
+        for uids in grupo.values():
+            uids.sort()
+
+    return {"desde": desde, "version": version, "altas": altas, "bajas": bajas}
+
+
+def podar(dias=None, lote=5000):
+    """
+    Borra los SensorCambio anteriores a la retención, como un prefijo
+    continuo de ids y en lotes. Conserva siempre el último, para que
+    version_actual() no retroceda. Devuelve cuántos borró.
+    """
+    if dias is None:
+        dias = getattr(settings, "LISTA_ACCESO_RETENCION_DIAS", 30)
+    corte = timezone.now() - timedelta(days=dias)
+
+    agregados = SensorCambio.objects.aggregate(
+        ultimo=Max("id"), limite=Max("id", filter=models.Q(creado_en__lt=corte)),
+    )
+    if agregados["limite"] is None:
+        return 0
+    limite = min(agregados["limite"], agregados["ultimo"] - 1)
+
+    total = 0
+    while True:
+        ids = list(
+            SensorCambio.objects.filter(id__lte=limite)
+            .order_by("id").values_list("id", flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        total += SensorCambio.objects.filter(id__gte=ids[0], id__lte=ids[-1]).delete()[0]
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sensores.archivo import archivo, corte_retencion
+from sensores.models import EventoAcceso
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los EventoAcceso más antiguos que la retención (EVENTO_ARCHIVO) "
+        "a archivos NDJSON.gz por mes, en lotes acotados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, help="retención en días (por defecto RETENCION_DIAS)")
+        parser.add_argument("--lote", type=int, help="eventos por lote (por defecto LOTE)")
+        parser.add_argument("--pausa", type=float, default=0.0,
+                            help="segundos entre lotes para no saturar la BD")
+        parser.add_argument("--dry-run", action="store_true", help="solo cuenta los eventos a archivar")
+
+    def handle(self, *args, **opts):
+        lote = opts["lote"] or getattr(settings, "EVENTO_ARCHIVO", {}).get("LOTE", 5000)
+        corte = corte_retencion(opts["dias"])
+
+        if opts["dry_run"]:
+            pendientes = EventoAcceso.objects.filter(fecha_hora__lt=corte).count()
+            self.stdout.write(f"{pendientes} eventos anteriores a {corte.isoformat()}.")
+            return
+
+        total = 0
+        while movidos := archivo.archivar_lote(corte, lote):
+            total += movidos
+            self.stdout.write(f"  {total} eventos archivados...")
+            if opts["pausa"]:
+                time.sleep(opts["pausa"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} eventos anteriores a {corte.isoformat()} archivados en {archivo.directorio}."
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from sensores import lista_acceso
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra el historial de SensorCambio más antiguo que "
+        "LISTA_ACCESO_RETENCION_DIAS; esos lectores deberán pedir el snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, help="retención en días (por defecto LISTA_ACCESO_RETENCION_DIAS)")
+        parser.add_argument("--lote", type=int, default=5000, help="cambios borrados por lote")
+
+    def handle(self, *args, **opts):
+        borrados = lista_acceso.podar(opts["dias"], opts["lote"])
+        self.stdout.write(self.style.SUCCESS(f"{borrados} cambios de la lista de acceso podados."))
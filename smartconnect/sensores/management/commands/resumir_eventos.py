@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sensores import resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza el resumen horario de eventos con los ids posteriores a la "
+        "última marca (modo diferido), o lo rehace completo con --reconstruir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=10_000)
+        parser.add_argument("--reconstruir", action="store_true",
+                            help="borra el resumen y lo recalcula desde la tabla de eventos")
+
+    def handle(self, *args, **opts):
+        if opts["reconstruir"]:
+            hasta = resumen.reconstruir()
+            self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido hasta el evento {hasta}."))
+            return
+
+        if resumen.incremental():
+            raise CommandError(
+                "EVENTO_RESUMEN['INCREMENTAL'] está activo: el resumen ya se actualiza "
+                "al registrar eventos. Use --reconstruir para recalcularlo."
+            )
+
+        procesados = resumen.resumir_pendientes(opts["lote"])
+        self.stdout.write(self.style.SUCCESS(f"{procesados} eventos resumidos."))
@@ -0,0 +1,70 @@
+"""
+Cambio de estado masivo de sensores (revocar todas las tarjetas de una
+zona o de un usuario): un UPDATE por conjunto, eventos de auditoría con
+un bulk_create y una sola invalidación de cachés (sensores_modificados).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventoAcceso, Sensor
+from .signals import eventos_registrados, sensores_modificados
+
+ACCION = 'CAMBIO_ESTADO'
+
+
+class SinResponsable(Exception):
+    """Se pidió BLOQUEADO para sensores sin usuario asociado."""
+
+    def __init__(self, uids):
+        super().__init__(uids)
+        self.uids = uids
+
+
+def cambiar_estado(queryset, estado, usuario_id=None, detalle=''):
+    """
+    Pasa a `estado` los sensores de `queryset` que no lo tengan. Aplica la
+    regla de SensorSerializer.validate sobre el conjunto: si alguno quedaría
+    BLOQUEADO sin usuario no se cambia ninguno (SinResponsable). Devuelve
+    el número de sensores modificados.
+    """
+    with transaction.atomic():
+        # las filas quedan bloqueadas hasta el UPDATE: el conjunto validado
+        # es el que se modifica
+        filas = list(
+            queryset.exclude(estado=estado)
+            .select_for_update()
+            .order_by('pk')
+            .values_list('pk', 'uid', 'departamento_id', 'estado', 'usuario_id')
+        )
+        if not filas:
+            return 0
+
+        if estado == 'BLOQUEADO':
+            sin_usuario = [uid for _, uid, _, _, usuario in filas if usuario is None]
+            if sin_usuario:
+                raise SinResponsable(sin_usuario)
+
+        ahora = timezone.now()
+        Sensor.objects.filter(pk__in=[fila[0] for fila in filas]).update(
+            estado=estado, actualizado_en=ahora,
+        )
+        eventos = EventoAcceso.objects.bulk_create([
+            EventoAcceso(
+                sensor_id=pk,
+                usuario_id=usuario_id,
+                departamento_id=departamento_id,
+                tipo='MANUAL',
+                accion=ACCION,
+                resultado='PERMITIDO',
+                detalle=(detalle or f"{anterior} → {estado}")[:255],
+                fecha_hora=ahora,
+            )
+            for pk, _, departamento_id, anterior, _ in filas
+        ])
+        sensores_modificados.send(sender=Sensor, cambios=[
+            (uid, (departamento_id, anterior), (departamento_id, estado))
+            for _, uid, departamento_id, anterior, _ in filas
+        ])
+
+    eventos_registrados.send(sender=EventoAcceso, eventos=eventos)
+    return len(filas)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventoacceso',
+            name='fecha_hora',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
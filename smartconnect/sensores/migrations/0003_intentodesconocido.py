@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0002_alter_eventoacceso_fecha_hora'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntentoDesconocido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.CharField(max_length=64)),
+                ('bucket', models.DateTimeField()),
+                ('intentos', models.PositiveBigIntegerField(default=0)),
+                ('primer_intento', models.DateTimeField()),
+                ('ultimo_intento', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='sensores_in_bucket_8552fa_idx')],
+                'constraints': [models.UniqueConstraint(fields=('uid', 'bucket'), name='uniq_intento_desconocido_uid_bucket')],
+            },
+        ),
+    ]
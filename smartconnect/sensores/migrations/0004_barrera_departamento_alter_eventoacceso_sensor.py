@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0003_intentodesconocido'),
+        ('zonas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barrera',
+            name='departamento',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='barrera', to='zonas.departamento'),
+        ),
+        migrations.AlterField(
+            model_name='eventoacceso',
+            name='sensor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='sensores.sensor'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0004_barrera_departamento_alter_eventoacceso_sensor'),
+        ('zonas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventoacceso',
+            name='departamento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='zonas.departamento'),
+        ),
+    ]
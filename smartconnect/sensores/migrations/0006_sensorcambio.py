@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0005_eventoacceso_departamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.CharField(max_length=64)),
+                ('departamento_id', models.BigIntegerField()),
+                ('activo', models.BooleanField()),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
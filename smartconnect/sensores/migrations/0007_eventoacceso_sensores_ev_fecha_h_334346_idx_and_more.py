@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0006_sensorcambio'),
+        ('zonas', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventoacceso',
+            index=models.Index(fields=['fecha_hora'], name='sensores_ev_fecha_h_334346_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoacceso',
+            index=models.Index(fields=['sensor', 'fecha_hora'], name='sensores_ev_sensor__155faf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoacceso',
+            index=models.Index(fields=['usuario', 'fecha_hora'], name='sensores_ev_usuario_c52b83_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoacceso',
+            index=models.Index(fields=['resultado', 'fecha_hora'], name='sensores_ev_resulta_b6e2b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoacceso',
+            index=models.Index(fields=['departamento', 'resultado', 'fecha_hora'], name='sensores_ev_departa_914795_idx'),
+        ),
+    ]
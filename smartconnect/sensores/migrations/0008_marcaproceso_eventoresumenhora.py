@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0007_eventoacceso_sensores_ev_fecha_h_334346_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaProceso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('valor', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EventoResumenHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField()),
+                ('departamento_id', models.BigIntegerField(default=0)),
+                ('sensor_id', models.BigIntegerField(default=0)),
+                ('resultado', models.CharField(choices=[('PERMITIDO', 'Permitido'), ('DENEGADO', 'Denegado')], max_length=12)),
+                ('tipo', models.CharField(choices=[('INTENTO', 'Intento'), ('MANUAL', 'Manual')], max_length=10)),
+                ('total', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['departamento_id', 'hora'], name='sensores_ev_departa_2cb95f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hora', 'departamento_id', 'sensor_id', 'resultado', 'tipo'), name='uniq_evento_resumen_hora_clave')],
+            },
+        ),
+    ]
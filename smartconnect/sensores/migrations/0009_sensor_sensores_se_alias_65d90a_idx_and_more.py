@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0008_marcaproceso_eventoresumenhora'),
+        ('zonas', '0002_departamento_actualizado_en'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sensor',
+            index=models.Index(fields=['alias'], name='sensores_se_alias_65d90a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensor',
+            index=models.Index(fields=['estado', 'uid'], name='sensores_se_estado_836d06_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensor',
+            index=models.Index(fields=['departamento', 'uid'], name='sensores_se_departa_8d21a3_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def asignar_barrera_existente(apps, schema_editor):
+    """
+    Antes de las barreras por departamento todos los sensores controlaban
+    Barrera.objects.first(). Esa barrera queda asignada al departamento con
+    más sensores para que siga respondiendo tras la actualización.
+    """
+    Barrera = apps.get_model('sensores', 'Barrera')
+    Departamento = apps.get_model('zonas', 'Departamento')
+
+    barrera = Barrera.objects.filter(departamento__isnull=True).order_by('pk').first()
+    if barrera is None:
+        return
+
+    departamento = (
+        Departamento.objects
+        .filter(barrera__isnull=True)
+        .annotate(sensores=Count('sensor'))
+        .order_by('-sensores', 'pk')
+        .first()
+    )
+    if departamento is not None:
+        barrera.departamento = departamento
+        barrera.save(update_fields=['departamento'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0009_sensor_sensores_se_alias_65d90a_idx_and_more'),
+        ('zonas', '0002_departamento_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.RunPython(asignar_barrera_existente, migrations.RunPython.noop),
+    ]
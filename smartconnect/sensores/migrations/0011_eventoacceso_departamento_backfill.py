@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+
+LOTE = 10_000
+
+
+def copiar_departamento_del_sensor(apps, schema_editor):
+    """
+    Los eventos anteriores a EventoAcceso.departamento quedaron con NULL:
+    se copia el departamento actual de su sensor, por rangos de id para no
+    bloquear la tabla completa en un solo UPDATE.
+    """
+    EventoAcceso = apps.get_model('sensores', 'EventoAcceso')
+    Sensor = apps.get_model('sensores', 'Sensor')
+
+    ultimo = EventoAcceso.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+    departamento = Subquery(
+        Sensor.objects.filter(pk=OuterRef('sensor_id')).values('departamento_id')[:1]
+    )
+    for desde in range(0, ultimo, LOTE):
+        EventoAcceso.objects.filter(
+            id__gt=desde,
+            id__lte=desde + LOTE,
+            departamento__isnull=True,
+            sensor__isnull=False,
+        ).update(departamento_id=departamento)
+
+
+class Migration(migrations.Migration):
+    # cada lote se confirma por separado
+    atomic = False
+
+    dependencies = [
+        ('sensores', '0010_asignar_barrera_existente'),
+    ]
+
+    operations = [
+        migrations.RunPython(copiar_departamento_del_sensor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0011_eventoacceso_departamento_backfill'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sensorcambio',
+            index=models.Index(fields=['creado_en'], name='sensores_se_creado__f6b4c6_idx'),
+        ),
+    ]
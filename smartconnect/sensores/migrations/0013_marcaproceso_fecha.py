@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensores', '0012_sensorcambio_creado_en_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marcaproceso',
+            name='fecha',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
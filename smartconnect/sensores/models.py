@@ -1,5 +1,10 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
 from django.conf import settings
+from django.utils import timezone
+from smartconnect import versiones
 from zonas.models import Departamento
 
 class Sensor(models.Model):
@@ -19,10 +24,74 @@ class Sensor(models.Model):
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
+    # estados que no permiten el acceso
+    ESTADOS_DENEGADOS = ('INACTIVO', 'BLOQUEADO', 'PERDIDO')
+
+    # campos cuyo valor cargado se recuerda para invalidar cachés y
+    # registrar cambios en la lista de acceso offline
+    CAMPOS_SEGUIDOS = ('uid', 'departamento_id', 'estado')
+
+    class Meta:
+        indexes = [
+            # listado web: búsqueda por prefijo de alias y filtros
+            # por estado / departamento, ordenados por uid
+            models.Index(fields=['alias']),
+            models.Index(fields=['estado', 'uid']),
+            models.Index(fields=['departamento', 'uid']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_originales()
+        return instance
+
+    def _guardar_originales(self):
+        self._original = {
+            campo: self.__dict__.get(campo) for campo in self.CAMPOS_SEGUIDOS
+        }
+
+    def valor_original(self, campo):
+        """Valor del campo al cargarlo / guardarlo por última vez (None si es nuevo)."""
+        return getattr(self, '_original', {}).get(campo)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._guardar_originales()
+
     def __str__(self):
         return f"{self.uid} - {self.estado}"
 
 
+class BarreraQuerySet(models.QuerySet):
+
+    def de_departamento(self, departamento_id):
+        return self.filter(departamento_id=departamento_id)
+
+    def transicionar(self, estado, cuando=None):
+        """
+        UPDATE ... SET estado = X, actualizado_en = cuando
+        WHERE <filtro> AND estado != X.
+        Devuelve cuántas barreras cambiaron; tras la escritura el estado es X
+        y actualizado_en es `cuando` sin necesidad de volver a leerlos.
+        """
+        cambiadas = self.exclude(estado=estado).update(
+            estado=estado, actualizado_en=cuando or timezone.now()
+        )
+        if cambiadas:
+            # update() no emite señales
+            versiones.incrementar(self.model._meta.label_lower)
+        return cambiadas
+
+    async def atransicionar(self, estado, cuando=None):
+        cambiadas = await self.exclude(estado=estado).aupdate(
+            estado=estado, actualizado_en=cuando or timezone.now()
+        )
+        if cambiadas:
+            await sync_to_async(versiones.incrementar)(self.model._meta.label_lower)
+        return cambiadas
+
+
 class Barrera(models.Model):
     ESTADOS = [
         ('ABIERTA', 'Abierta'),
@@ -30,8 +99,22 @@ class Barrera(models.Model):
     ]
 
     estado = models.CharField(max_length=10, choices=ESTADOS, default='CERRADA')
+    # una barrera por departamento; los sensores del departamento la controlan
+    departamento = models.OneToOneField(
+        Departamento,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='barrera'
+    )
     actualizado_en = models.DateTimeField(auto_now=True)
 
+    objects = BarreraQuerySet.as_manager()
+
+    ESTADO_POR_ACCION = {
+        'ABRIR': 'ABIERTA',
+        'CERRAR': 'CERRADA',
+    }
+
     def __str__(self):
         return f"Barrera {self.estado}"
 
@@ -47,13 +130,177 @@ class EventoAcceso(models.Model):
         ('DENEGADO', 'Denegado'),
     ]
 
-    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE)
+    # NULL en eventos manuales de barrera (sin sensor)
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, null=True, blank=True)
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    # copia del departamento del sensor / barrera al momento del evento
+    departamento = models.ForeignKey(Departamento, on_delete=models.SET_NULL, null=True, blank=True)
     tipo = models.CharField(max_length=10, choices=TIPOS)
     accion = models.CharField(max_length=20)  # EJ: ABRIR / CERRAR
     resultado = models.CharField(max_length=12, choices=RESULTADOS)
     detalle = models.CharField(max_length=255, blank=True)
-    fecha_hora = models.DateTimeField(auto_now_add=True)
+    # default (no auto_now_add) para conservar la hora real del evento
+    # cuando la inserción se difiere (write-behind / lotes)
+    fecha_hora = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["fecha_hora"]),
+            models.Index(fields=["sensor", "fecha_hora"]),
+            models.Index(fields=["usuario", "fecha_hora"]),
+            models.Index(fields=["resultado", "fecha_hora"]),
+            # ej: "denegados en Bodega las últimas 24h"
+            models.Index(fields=["departamento", "resultado", "fecha_hora"]),
+        ]
+
+    def __str__(self):
+        origen = self.sensor.uid if self.sensor_id else self.tipo
+        return f"{origen} - {self.resultado} - {self.fecha_hora}"
+
+
+class IntentoDesconocido(models.Model):
+    """
+    Contador agregado de intentos con UID no registrado, por (uid, bucket).
+    Un ataque de fuerza bruta escribe una fila por UID distinto y no una
+    por intento.
+    """
+    uid = models.CharField(max_length=64)
+    bucket = models.DateTimeField()
+    intentos = models.PositiveBigIntegerField(default=0)
+    primer_intento = models.DateTimeField()
+    ultimo_intento = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["uid", "bucket"],
+                name="uniq_intento_desconocido_uid_bucket"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["bucket"]),
+        ]
+
+    @staticmethod
+    def bucket_de(cuando):
+        minutos = getattr(settings, "INTENTOS_DESCONOCIDOS_BUCKET_MINUTOS", 60)
+        segundos = minutos * 60
+        return cuando - timezone.timedelta(
+            seconds=int(cuando.timestamp()) % segundos,
+            microseconds=cuando.microsecond,
+        )
+
+    @classmethod
+    def registrar(cls, uid, primero=None, ultimo=None, veces=1):
+        """
+        Upsert que incrementa el contador del bucket correspondiente.
+        Caso común: un solo UPDATE; el INSERT solo ocurre la primera vez
+        que se ve el UID en el bucket.
+        """
+        primero = primero or timezone.now()
+        ultimo = ultimo or primero
+        uid = uid[:64]
+        bucket = cls.bucket_de(primero)
+
+        def incrementar():
+            return cls.objects.filter(uid=uid, bucket=bucket).update(
+                intentos=F("intentos") + veces,
+                primer_intento=Least(F("primer_intento"), Value(primero)),
+                ultimo_intento=Greatest(F("ultimo_intento"), Value(ultimo)),
+            )
+
+        if incrementar():
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    uid=uid, bucket=bucket, intentos=veces,
+                    primer_intento=primero, ultimo_intento=ultimo,
+                )
+        except IntegrityError:
+            # otro request insertó la fila entre el UPDATE y el INSERT
+            incrementar()
+
+    def __str__(self):
+        return f"{self.uid} - {self.bucket} - {self.intentos}"
+
+
+class SensorCambio(models.Model):
+    """
+    Registro de altas/bajas de la lista de acceso offline. El id es el
+    número de versión: monótono y creciente en cada save/delete de Sensor.
+    """
+    uid = models.CharField(max_length=64)
+    # sin FK: el historial debe sobrevivir a la eliminación de la zona
+    departamento_id = models.BigIntegerField()
+    activo = models.BooleanField()
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # ventana de reenvío de los deltas (lista_acceso.inicio_ventana)
+            models.Index(fields=["creado_en"]),
+        ]
+
+    def __str__(self):
+        return f"v{self.pk} {'+' if self.activo else '-'}{self.uid}"
+
+
+class EventoResumenHora(models.Model):
+    """
+    Conteo de EventoAcceso por hora (UTC), departamento, sensor, resultado
+    y tipo. Los reportes leen de aquí en vez de agregar la tabla cruda.
+    departamento_id / sensor_id = 0 cuando el evento no los tenía.
+    """
+    hora = models.DateTimeField()
+    # sin FK: el resumen debe sobrevivir a la eliminación de zonas/sensores
+    departamento_id = models.BigIntegerField(default=0)
+    sensor_id = models.BigIntegerField(default=0)
+    resultado = models.CharField(max_length=12, choices=EventoAcceso.RESULTADOS)
+    tipo = models.CharField(max_length=10, choices=EventoAcceso.TIPOS)
+    total = models.PositiveBigIntegerField(default=0)
+
+    CLAVE = ("hora", "departamento_id", "sensor_id", "resultado", "tipo")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hora", "departamento_id", "sensor_id", "resultado", "tipo"],
+                name="uniq_evento_resumen_hora_clave"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["departamento_id", "hora"]),
+        ]
+
+    @classmethod
+    def sumar(cls, clave, cantidad):
+        """Upsert que incrementa el total de la fila `clave` (dict de CLAVE)."""
+        def incrementar():
+            return cls.objects.filter(**clave).update(total=F("total") + cantidad)
+
+        if incrementar():
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**clave, total=cantidad)
+        except IntegrityError:
+            incrementar()
+
+    def __str__(self):
+        return f"{self.hora} dep={self.departamento_id} {self.resultado}: {self.total}"
+
+
+class MarcaProceso(models.Model):
+    """
+    Marca de avance (watermark) de procesos por lotes: último id procesado,
+    para retomar sin recorrer de nuevo lo ya hecho. Los procesos que avanzan
+    por (fecha_hora, id) guardan además la fecha en `fecha`.
+    """
+    nombre = models.CharField(max_length=50, unique=True)
+    valor = models.BigIntegerField(default=0)
+    fecha = models.DateTimeField(null=True, blank=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.sensor.uid} - {self.resultado} - {self.fecha_hora}"
\ No newline at end of file
+        return f"{self.nombre} = {self.valor}"
@@ -0,0 +1,167 @@
+"""
+Resumen horario de EventoAcceso (EventoResumenHora).
+
+Dos modos (EVENTO_RESUMEN["INCREMENTAL"]):
+- diferido (por defecto): `manage.py resumir_eventos` procesa
+  periódicamente solo los ids posteriores a la marca guardada en
+  MarcaProceso, hasta el último id visto hace más de MARGEN_SEGUNDOS.
+- incremental (opcional): cada lote de eventos persistido suma sus
+  conteos al confirmarse la transacción (señal eventos_registrados).
+`resumir_eventos --reconstruir` rehace el resumen en ambos modos.
+"""
+from collections import Counter
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from .models import EventoAcceso, EventoResumenHora, MarcaProceso
+
+MARCA = "eventos_resumen"
+# máximo id visto en la ejecución anterior (valor) y cuándo (actualizado_en)
+MARCA_VISTO = "eventos_resumen_visto"
+
+
+def incremental():
+    return getattr(settings, "EVENTO_RESUMEN", {}).get("INCREMENTAL", False)
+
+
+def _margen():
+    segundos = getattr(settings, "EVENTO_RESUMEN", {}).get("MARGEN_SEGUNDOS", 60)
+    return timezone.timedelta(seconds=segundos)
+
+
+def hora_de(fecha_hora):
+    return fecha_hora.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def acumular(eventos):
+    """Suma al resumen eventos ya persistidos (modo incremental)."""
+    conteo = Counter(
+        (hora_de(e.fecha_hora), e.departamento_id or 0, e.sensor_id or 0, e.resultado, e.tipo)
+        for e in eventos
+    )
+    for clave, cantidad in conteo.items():
+        EventoResumenHora.sumar(dict(zip(EventoResumenHora.CLAVE, clave)), cantidad)
+
+
+def _agregar_rango(desde, hasta):
+    grupos = (
+        EventoAcceso.objects
+        .filter(id__gt=desde, id__lte=hasta)
+        .annotate(
+            h=TruncHour("fecha_hora", tzinfo=dt_timezone.utc),
+            dep=Coalesce("departamento", Value(0)),
+            sen=Coalesce("sensor", Value(0)),
+        )
+        .values_list("h", "dep", "sen", "resultado", "tipo")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for *clave, cantidad in grupos:
+        EventoResumenHora.sumar(dict(zip(EventoResumenHora.CLAVE, clave)), cantidad)
+
+
+def _tope():
+    """
+    Id hasta el que es seguro resumir. Un INSERT con id menor que aún no
+    confirma (bulk_create del write-behind, lotes offline) no se ve en la
+    tabla, y si la marca lo sobrepasa no se contaría nunca. Por eso solo
+    se avanza hasta el máximo id visto hace más de MARGEN_SEGUNDOS: las
+    transacciones que lo rodeaban ya confirmaron.
+    """
+    with transaction.atomic():
+        marca, _ = MarcaProceso.objects.select_for_update().get_or_create(nombre=MARCA)
+        visto, creado = MarcaProceso.objects.select_for_update().get_or_create(nombre=MARCA_VISTO)
+        if not creado and visto.actualizado_en > timezone.now() - _margen():
+            return marca.valor
+
+        tope = marca.valor if creado else visto.valor
+        visto.valor = EventoAcceso.objects.aggregate(v=Max("id"))["v"] or 0
+        visto.save(update_fields=["valor", "actualizado_en"])
+        return tope
+
+
+def resumir_pendientes(lote=10_000):
+    """
+    Procesa los eventos con id > marca en lotes de `lote` ids, hasta el
+    tope seguro (_tope). Las marcas se bloquean (SELECT ... FOR UPDATE)
+    para que dos ejecuciones simultáneas no cuenten dos veces. Devuelve el
+    número de eventos procesados.
+    """
+    tope = _tope()
+    procesados = 0
+    while True:
+        with transaction.atomic():
+            marca, _ = MarcaProceso.objects.select_for_update().get_or_create(nombre=MARCA)
+            pendientes = (
+                EventoAcceso.objects
+                .filter(id__gt=marca.valor, id__lte=tope)
+                .order_by("id")
+            )
+            ids = list(pendientes.values_list("id", flat=True)[:lote])
+            if not ids:
+                return procesados
+
+            _agregar_rango(marca.valor, ids[-1])
+            marca.valor = ids[-1]
+            marca.save(update_fields=["valor", "actualizado_en"])
+        procesados += len(ids)
+
+
+def reconstruir():
+    """
+    Rehace el resumen a partir de los eventos presentes en la tabla. Las
+    horas anteriores al evento más antiguo (ya archivadas) se conservan.
+    """
+    with transaction.atomic():
+        marca, _ = MarcaProceso.objects.select_for_update().get_or_create(nombre=MARCA)
+        rango = EventoAcceso.objects.aggregate(hasta=Max("id"), primera=Min("fecha_hora"))
+        hasta = rango["hasta"] or 0
+        if rango["primera"] is not None:
+            EventoResumenHora.objects.filter(hora__gte=hora_de(rango["primera"])).delete()
+        _agregar_rango(0, hasta)
+        marca.valor = hasta
+        marca.save(update_fields=["valor", "actualizado_en"])
+    return hasta
+
+
+def reporte(desde, hasta, departamento_id=None, sensor_id=None, agrupar="hora"):
+    """
+    Permitidos / denegados por período y departamento. agrupar="dia" agrupa
+    por día en la zona horaria local (TIME_ZONE).
+    """
+    filas = EventoResumenHora.objects.filter(hora__gte=hora_de(desde), hora__lt=hasta)
+    if departamento_id is not None:
+        filas = filas.filter(departamento_id=departamento_id)
+    if sensor_id is not None:
+        filas = filas.filter(sensor_id=sensor_id)
+
+    filas = (
+        filas.values_list("hora", "departamento_id")
+        .annotate(
+            permitidos=Coalesce(Sum("total", filter=Q(resultado="PERMITIDO")), 0),
+            denegados=Coalesce(Sum("total", filter=Q(resultado="DENEGADO")), 0),
+        )
+        .order_by("hora", "departamento_id")
+    )
+
+    periodos = {}
+    for hora, dep, permitidos, denegados in filas:
+        periodo = timezone.localtime(hora).date() if agrupar == "dia" else hora
+        fila = periodos.setdefault((periodo, dep), {
+            "periodo": periodo,
+            "departamento": dep or None,
+            "permitidos": 0,
+            "denegados": 0,
+        })
+        fila["permitidos"] += permitidos
+        fila["denegados"] += denegados
+
+    resultado = list(periodos.values())
+    for fila in resultado:
+        fila["total"] = fila["permitidos"] + fila["denegados"]
+    return resultado
@@ -0,0 +1,122 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .bloom import bump_generacion
+from .cache import invalidar_sensor
+from .models import Sensor, SensorCambio
+from . import resumen
+
+logger = logging.getLogger(__name__)
+
+# Se emite tras persistir EventoAcceso por cualquier vía (save o bulk_create),
+# con eventos=[...]. bulk_create no dispara post_save.
+eventos_registrados = Signal()
+
+# Se emite tras altas / cambios masivos de Sensor (bulk_create, update), que
+# no disparan post_save. cambios=[(uid, anterior, actual)], donde anterior y
+# actual son (departamento_id, estado); anterior=None si el sensor es nuevo.
+sensores_modificados = Signal()
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def invalidar_cache_sensor(sender, instance, **kwargs):
+    # tras el commit: antes, otro request podría volver a cachear la fila anterior
+    uids = (instance.uid, instance.valor_original('uid'))
+    transaction.on_commit(lambda: invalidar_sensor(*uids))
+
+
+@receiver(post_save, sender=Sensor)
+def actualizar_filtro_uids_alta(sender, instance, created, **kwargs):
+    if created or instance.uid != instance.valor_original('uid'):
+        transaction.on_commit(bump_generacion)
+
+
+@receiver(post_delete, sender=Sensor)
+def actualizar_filtro_uids_baja(sender, instance, **kwargs):
+    transaction.on_commit(bump_generacion)
+
+
+@receiver(post_save, sender=Sensor)
+def registrar_cambio_lista_acceso(sender, instance, created, **kwargs):
+    ahora_activo = instance.estado == 'ACTIVO'
+    clave = (instance.uid, instance.departamento_id)
+
+    if created:
+        antes_activo, clave_anterior = False, clave
+    elif not hasattr(instance, '_original'):
+        # instancia no cargada desde la BD: se desconoce el estado previo
+        antes_activo, clave_anterior = not ahora_activo, clave
+    else:
+        antes_activo = instance.valor_original('estado') == 'ACTIVO'
+        clave_anterior = (
+            instance.valor_original('uid'), instance.valor_original('departamento_id')
+        )
+
+    cambios = _cambios_lista_acceso(antes_activo, clave_anterior, ahora_activo, clave)
+    if cambios:
+        SensorCambio.objects.bulk_create(cambios)
+
+
+def _cambios_lista_acceso(antes_activo, clave_anterior, ahora_activo, clave):
+    cambios = []
+    if antes_activo and (not ahora_activo or clave_anterior != clave):
+        cambios.append(SensorCambio(
+            uid=clave_anterior[0], departamento_id=clave_anterior[1], activo=False
+        ))
+    if ahora_activo and (not antes_activo or clave_anterior != clave):
+        cambios.append(SensorCambio(
+            uid=clave[0], departamento_id=clave[1], activo=True
+        ))
+    return cambios
+
+
+@receiver(post_delete, sender=Sensor)
+def registrar_baja_lista_acceso(sender, instance, **kwargs):
+    SensorCambio.objects.create(
+        uid=instance.valor_original('uid') or instance.uid,
+        departamento_id=instance.valor_original('departamento_id') or instance.departamento_id,
+        activo=False,
+    )
+
+
+@receiver(sensores_modificados)
+def aplicar_cambios_masivos(sender, cambios, **kwargs):
+    """Lo mismo que los receptores de post_save, para un lote de sensores."""
+    # tras el commit: invalidando antes, un /api/acceso/ concurrente puede
+    # volver a cachear la fila anterior por todo el TTL de SENSOR_CACHE
+    uids = [uid for uid, _, _ in cambios]
+    transaction.on_commit(lambda: invalidar_sensor(*uids))
+    if any(anterior is None for _, anterior, _ in cambios):
+        transaction.on_commit(bump_generacion)
+
+    registros = []
+    for uid, anterior, actual in cambios:
+        if anterior is None:
+            antes_activo, clave_anterior = False, (uid, actual[0])
+        else:
+            antes_activo, clave_anterior = anterior[1] == 'ACTIVO', (uid, anterior[0])
+        registros += _cambios_lista_acceso(
+            antes_activo, clave_anterior, actual[1] == 'ACTIVO', (uid, actual[0])
+        )
+    if registros:
+        SensorCambio.objects.bulk_create(registros)
+
+
+@receiver(eventos_registrados)
+def acumular_resumen_horario(sender, eventos, **kwargs):
+    if not resumen.incremental():
+        return
+
+    def acumular():
+        try:
+            resumen.acumular(eventos)
+        except Exception:
+            # el evento ya está guardado; el resumen se corrige con
+            # `manage.py resumir_eventos --reconstruir`
+            logger.exception("Error actualizando el resumen horario de eventos")
+
+    transaction.on_commit(acumular)
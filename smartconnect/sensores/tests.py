@@ -1,3 +1,552 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UsuarioApp
+from accounts.tests import crear_usuario
+from zonas.models import Departamento
+
+from . import masivo, resumen
+from .archivo import Archivo, mes_de
+from .bloom import FiltroUIDs, filtro_uids
+from .buffer import EventoBuffer, _a_fila, aregistrar_evento, registrar_evento
+from .cache import obtener_autorizacion, sensor_cache
+from .desconocidos import ContadorDesconocidos, contador_desconocidos
+from .models import (
+    EventoAcceso, EventoResumenHora, IntentoDesconocido, MarcaProceso, Sensor, SensorCambio,
+)
+
+
+class SensorListViewTests(TestCase):
+    # sesión + usuario + COUNT + página + departamentos del filtro
+    CONSULTAS = 5
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario("admin@smartconnect.cl", UsuarioApp.ROL_ADMIN)
+        self.client.force_login(self.admin)
+        self.client.get(reverse("sensor_list"))  # deja el rol en la sesión
+
+    def crear_sensores(self, cantidad, desde=0):
+        for i in range(desde, desde + cantidad):
+            departamento = Departamento.objects.create(nombre=f"Depto {i}")
+            usuario = UsuarioApp.objects.create(email=f"u{i}@smartconnect.cl", name=f"U{i}")
+            Sensor.objects.create(
+                uid=f"UID{i:05d}", alias=f"Tarjeta {i}",
+                departamento=departamento, usuario=usuario,
+                estado="BLOQUEADO" if i % 2 else "ACTIVO",
+            )
+
+    def test_consultas_constantes_con_el_tamano_de_la_tabla(self):
+        self.crear_sensores(3)
+        with self.assertNumQueries(self.CONSULTAS):
+            response = self.client.get(reverse("sensor_list"))
+        self.assertEqual(len(response.context["object_list"]), 3)
+
+        self.crear_sensores(60, desde=3)
+        with self.assertNumQueries(self.CONSULTAS):
+            response = self.client.get(reverse("sensor_list"), {"page": 2})
+        self.assertEqual(len(response.context["object_list"]), 13)
+        self.assertContains(response, "u62@smartconnect.cl")
+
+    def test_busqueda_y_filtros(self):
+        self.crear_sensores(12)
+        url = reverse("sensor_list")
+
+        response = self.client.get(url, {"q": "uid0001"})
+        self.assertEqual(
+            [s.uid for s in response.context["object_list"]],
+            [f"UID{i:05d}" for i in (10, 11)],
+        )
+
+        response = self.client.get(url, {"q": "Tarjeta 3"})
+        self.assertEqual([s.uid for s in response.context["object_list"]], ["UID00003"])
+
+        departamento = Departamento.objects.get(nombre="Depto 4")
+        response = self.client.get(url, {"estado": "ACTIVO", "departamento": departamento.pk})
+        self.assertEqual([s.uid for s in response.context["object_list"]], ["UID00004"])
+
+        response = self.client.get(url, {"estado": "BLOQUEADO"})
+        self.assertEqual(len(response.context["object_list"]), 6)
+
+    def test_filtro_invalido_se_ignora(self):
+        self.crear_sensores(2)
+        response = self.client.get(reverse("sensor_list"), {"estado": "OTRO"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["object_list"]), 2)
+
+
+class EventoBufferTests(TransactionTestCase):
+    # TransactionTestCase: las FK se validan al confirmar cada lote, como en MySQL
+
+    def setUp(self):
+        self.departamento = Departamento.objects.create(nombre="Bodega")
+        self.sensor = Sensor.objects.create(uid="ABCD1234", departamento=self.departamento)
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+
+    def crear_buffer(self, **kwargs):
+        # flush_interval alto: el test decide cuándo escribir con flush()
+        kwargs.setdefault("flush_interval", 60)
+        buffer = EventoBuffer(spool_dir=self.spool_dir, **kwargs)
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def evento(self, sensor_id=None, detalle="Acceso concedido"):
+        return EventoAcceso(
+            sensor_id=sensor_id or self.sensor.pk,
+            departamento_id=self.departamento.pk,
+            tipo="INTENTO", accion="INTENTO", resultado="PERMITIDO", detalle=detalle,
+        )
+
+    def test_flush_inserta_y_libera_el_spool(self):
+        buffer = self.crear_buffer()
+        for _ in range(3):
+            self.assertTrue(buffer.put(self.evento()))
+        buffer.flush()
+
+        self.assertEqual(EventoAcceso.objects.count(), 3)
+        self.assertEqual(buffer.stats()["eventos_pendientes"], 0)
+        self.assertFalse(any(f.endswith(".pendiente") for f in os.listdir(self.spool_dir)))
+
+    def test_fila_invalida_no_bloquea_la_cola(self):
+        buffer = self.crear_buffer()
+        buffer.put(self.evento())
+        buffer.put(self.evento(sensor_id=999_999, detalle="sensor eliminado"))
+        buffer.put(self.evento())
+        with self.assertLogs("sensores.buffer", "WARNING"):
+            buffer.flush()
+        buffer.put(self.evento())
+        buffer.flush()
+
+        self.assertEqual(EventoAcceso.objects.count(), 3)
+        self.assertEqual(buffer.descartados, 1)
+        self.assertEqual(buffer.stats()["lotes_pendientes"], 0)
+
+        with open(os.path.join(self.spool_dir, f"descartados-{os.getpid()}.ndjson")) as fh:
+            descartados = [json.loads(linea) for linea in fh]
+        self.assertEqual([d["detalle"] for d in descartados], ["sensor eliminado"])
+
+    def test_pendientes_cuentan_para_max_size(self):
+        buffer = self.crear_buffer(max_size=2, put_timeout=0)
+        buffer.put(self.evento())
+        with buffer._cond:
+            buffer._retirar()  # lote retirado pero aún sin escribir
+        buffer.put(self.evento())
+        self.assertFalse(buffer.put(self.evento()))
+        self.assertEqual(buffer.rechazados, 1)
+
+        buffer.flush()
+        self.assertTrue(buffer.put(self.evento()))
+
+    def test_recupera_spool_de_un_proceso_caido(self):
+        path = os.path.join(self.spool_dir, "eventos-1-1.spool")
+        with open(path, "w") as fh:
+            for _ in range(2):
+                fh.write(json.dumps(_a_fila(self.evento())) + "\n")
+            fh.write('{"truncada": ')
+
+        buffer = self.crear_buffer()
+        with self.assertLogs("sensores.buffer", "WARNING"):
+            buffer.put(self.evento())
+        buffer.flush()
+
+        self.assertEqual(EventoAcceso.objects.count(), 3)
+        self.assertFalse(os.path.exists(path))
+
+    def test_aregistrar_evento_escribe_el_spool_fuera_del_event_loop(self):
+        buffer = self.crear_buffer()
+        hilos_put = []
+        put = buffer.put
+
+        def put_registrando_hilo(*args, **kwargs):
+            hilos_put.append(threading.get_ident())
+            return put(*args, **kwargs)
+
+        buffer.put = put_registrando_hilo
+
+        async def registrar():
+            with mock.patch("sensores.buffer.evento_buffer", buffer):
+                await aregistrar_evento(
+                    sensor_id=self.sensor.pk, departamento_id=self.departamento.pk,
+                    tipo="INTENTO", accion="INTENTO", resultado="PERMITIDO",
+                )
+            return threading.get_ident()
+
+        hilo_loop = async_to_sync(registrar)()
+        buffer.flush()
+
+        self.assertEqual(len(hilos_put), 1)
+        self.assertNotEqual(hilos_put[0], hilo_loop)
+        self.assertEqual(EventoAcceso.objects.count(), 1)
+
+
+class SensorAutorizacionCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        sensor_cache.clear()
+        self.departamento = Departamento.objects.create(nombre="Bodega")
+        self.sensor = Sensor.objects.create(uid="ABCD1234", departamento=self.departamento)
+
+    def test_acierto_no_consulta_la_bd(self):
+        obtener_autorizacion("ABCD1234")
+        with self.assertNumQueries(0):
+            autorizacion = obtener_autorizacion("ABCD1234")
+        self.assertEqual(autorizacion.id, self.sensor.pk)
+        self.assertEqual(autorizacion.departamento_id, self.departamento.pk)
+
+    def test_guardar_invalida_tras_el_commit(self):
+        obtener_autorizacion("ABCD1234")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.estado = "BLOQUEADO"
+            self.sensor.save()
+            self.assertEqual(sensor_cache.get("ABCD1234").estado, "ACTIVO")
+        self.assertEqual(obtener_autorizacion("ABCD1234").estado, "BLOQUEADO")
+
+    def test_cambio_de_uid_invalida_el_anterior(self):
+        obtener_autorizacion("ABCD1234")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.uid = "ABCD9999"
+            self.sensor.save()
+        self.assertIsNone(obtener_autorizacion("ABCD1234"))
+        self.assertEqual(obtener_autorizacion("ABCD9999").id, self.sensor.pk)
+
+    def test_eliminar_invalida(self):
+        obtener_autorizacion("ABCD1234")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.delete()
+        self.assertIsNone(obtener_autorizacion("ABCD1234"))
+
+
+class CambioEstadoMasivoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        sensor_cache.clear()
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.usuario = UsuarioApp.objects.create(email="u@smartconnect.cl", name="U")
+        for i in range(3):
+            Sensor.objects.create(uid=f"B{i}", departamento=self.bodega, usuario=self.usuario)
+        Sensor.objects.create(uid="O0", departamento=self.oficina)
+
+    def test_revoca_un_departamento(self):
+        self.assertEqual(obtener_autorizacion("B0").estado, "ACTIVO")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            modificados = masivo.cambiar_estado(
+                Sensor.objects.filter(departamento=self.bodega), "BLOQUEADO",
+            )
+            # sin commit la caché conserva la fila anterior: invalidar aquí
+            # permitiría re-cachear el ACTIVO hasta el TTL
+            self.assertEqual(sensor_cache.get("B0").estado, "ACTIVO")
+
+        self.assertEqual(modificados, 3)
+        self.assertEqual(obtener_autorizacion("B0").estado, "BLOQUEADO")
+        self.assertEqual(obtener_autorizacion("O0").estado, "ACTIVO")
+        self.assertEqual(
+            EventoAcceso.objects.filter(accion=masivo.ACCION, departamento=self.bodega).count(), 3
+        )
+        self.assertEqual(SensorCambio.objects.filter(activo=False).count(), 3)
+
+    def test_solo_modifica_los_que_cambian(self):
+        Sensor.objects.filter(uid="B0").update(estado="INACTIVO")
+        modificados = masivo.cambiar_estado(Sensor.objects.filter(uid__startswith="B"), "INACTIVO")
+        self.assertEqual(modificados, 2)
+
+    def test_bloqueado_sin_responsable_no_cambia_ninguno(self):
+        with self.assertRaises(masivo.SinResponsable) as ctx:
+            masivo.cambiar_estado(Sensor.objects.all(), "BLOQUEADO")
+        self.assertEqual(ctx.exception.uids, ["O0"])
+        self.assertFalse(Sensor.objects.exclude(estado="ACTIVO").exists())
+        self.assertFalse(EventoAcceso.objects.exists())
+
+
+class ContadorDesconocidosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.contador = ContadorDesconocidos(max_claves=2, flush_interval=60)
+        self.addCleanup(self.contador.close)
+        # antes de close: el hilo escribiría fuera de la transacción del test
+        self.addCleanup(self.contador.flush)
+
+    def test_suma_en_memoria_y_vuelca_por_clave(self):
+        ahora = timezone.now()
+        bucket = IntentoDesconocido.bucket_de(ahora)
+        with self.assertNumQueries(0):
+            for _ in range(50):
+                self.assertTrue(self.contador.sumar("FFFF0000", ahora, ahora))
+            self.contador.sumar("FFFF0001", ahora, ahora, veces=3)
+
+        self.contador.flush()
+        self.contador.sumar("FFFF0000", ahora, ahora)
+        self.contador.flush()
+
+        self.assertEqual(
+            dict(IntentoDesconocido.objects.filter(bucket=bucket).values_list("uid", "intentos")),
+            {"FFFF0000": 51, "FFFF0001": 3},
+        )
+        self.assertEqual(self.contador.stats()["claves_pendientes"], 0)
+
+    def test_lleno_rechaza_claves_nuevas(self):
+        self.contador.sumar("FFFF0000")
+        self.contador.sumar("FFFF0001")
+        self.assertFalse(self.contador.sumar("FFFF0002"))
+        self.assertTrue(self.contador.sumar("FFFF0000"))
+        self.assertEqual(self.contador.rechazados, 1)
+
+
+class AccesoUidDesconocidoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        departamento = Departamento.objects.create(nombre="Bodega")
+        Sensor.objects.create(uid="ABCD1234", departamento=departamento)
+        self.addCleanup(contador_desconocidos.flush)
+
+    def test_uid_desconocido_sin_escrituras(self):
+        self.client.post("/api/acceso/", {"uid": "CLON0000"})  # construye el filtro
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                response = self.client.post("/api/acceso/", {"uid": "CLON0001"})
+        self.assertEqual(response.status_code, 404)
+
+        contador_desconocidos.flush()
+        self.assertEqual(IntentoDesconocido.objects.get(uid="CLON0001").intentos, 5)
+
+
+class FiltroUIDsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.departamento = Departamento.objects.create(nombre="Bodega")
+
+    def test_alta_y_baja_invalidan_el_filtro(self):
+        self.assertFalse(filtro_uids.puede_existir("NUEVO0001"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sensor = Sensor.objects.create(uid="NUEVO0001", departamento=self.departamento)
+        self.assertTrue(filtro_uids.puede_existir("NUEVO0001"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sensor.uid = "NUEVO0002"
+            sensor.save()
+        self.assertTrue(filtro_uids.puede_existir("NUEVO0002"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sensor.delete()
+        self.assertFalse(filtro_uids.puede_existir("NUEVO0002"))
+
+    def test_max_age_sin_generacion_compartida(self):
+        # alta en "otro worker": la generación de esta caché no cambia
+        filtro = FiltroUIDs(max_age=30)
+        self.assertFalse(filtro.puede_existir("NUEVO0001"))
+        Sensor.objects.create(uid="NUEVO0001", departamento=self.departamento)
+        self.assertFalse(filtro.puede_existir("NUEVO0001"))
+
+        filtro._construido -= 31
+        self.assertTrue(filtro.puede_existir("NUEVO0001"))
+        self.assertEqual(filtro.reconstrucciones, 2)
+
+
+class ResumenHorarioTests(TestCase):
+
+    def setUp(self):
+        self.bodega = Departamento.objects.create(nombre="Bodega")
+        self.oficina = Departamento.objects.create(nombre="Oficina")
+        self.sensores = [
+            Sensor.objects.create(uid="AAAA0001", departamento=self.bodega),
+            Sensor.objects.create(uid="AAAA0002", departamento=self.oficina),
+        ]
+        self.ahora = timezone.now()
+
+    def campos(self, i):
+        sensor = self.sensores[i % 2]
+        return dict(
+            sensor_id=sensor.pk,
+            departamento_id=sensor.departamento_id,
+            tipo="INTENTO", accion="INTENTO",
+            resultado="DENEGADO" if i % 3 == 0 else "PERMITIDO",
+            fecha_hora=self.ahora - timedelta(minutes=37 * i),
+        )
+
+    def assertResumenCuadra(self):
+        crudo = Counter(
+            (resumen.hora_de(e.fecha_hora), e.departamento_id or 0, e.sensor_id or 0,
+             e.resultado, e.tipo)
+            for e in EventoAcceso.objects.all()
+        )
+        resumido = {
+            tuple(fila[:-1]): fila[-1]
+            for fila in EventoResumenHora.objects.values_list(*EventoResumenHora.CLAVE, "total")
+        }
+        self.assertEqual(resumido, dict(crudo))
+
+    @override_settings(EVENTO_RESUMEN={"INCREMENTAL": True})
+    def test_incremental_cuadra_con_los_eventos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                registrar_evento(**self.campos(i))
+            registrar_evento(
+                sensor=None, departamento_id=self.bodega.pk,
+                tipo="MANUAL", accion="ABRIR", resultado="PERMITIDO",
+            )
+        self.assertResumenCuadra()
+
+        totales = resumen.reporte(self.ahora - timedelta(days=1), self.ahora + timedelta(hours=1))
+        self.assertEqual(sum(f["total"] for f in totales), 21)
+
+    def test_diferido_no_salta_ids_confirmados_tarde(self):
+        primero = EventoAcceso.objects.create(**self.campos(0))
+        EventoAcceso.objects.create(id=primero.id + 2, **self.campos(2))
+
+        # primera ejecución: solo registra el máximo id visto
+        self.assertEqual(resumen.resumir_pendientes(), 0)
+
+        # id menor confirmado después (write-behind en vuelo)
+        EventoAcceso.objects.create(id=primero.id + 1, **self.campos(1))
+        self.assertEqual(resumen.resumir_pendientes(), 0)
+
+        MarcaProceso.objects.filter(nombre=resumen.MARCA_VISTO).update(
+            actualizado_en=F("actualizado_en") - timedelta(seconds=61)
+        )
+        self.assertEqual(resumen.resumir_pendientes(lote=2), 3)
+        self.assertResumenCuadra()
+
+    def test_reconstruir_cuadra_con_los_eventos(self):
+        for i in range(10):
+            EventoAcceso.objects.create(**self.campos(i))
+        EventoResumenHora.objects.create(
+            hora=resumen.hora_de(self.ahora), resultado="PERMITIDO", tipo="INTENTO", total=999,
+        )
+        resumen.reconstruir()
+        self.assertResumenCuadra()
+
+
+class ArchivoTests(TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.archivo = Archivo(self.directorio)
+
+        departamento = Departamento.objects.create(nombre="Bodega")
+        sensor = Sensor.objects.create(uid="ABCD1234", departamento=departamento)
+        inicio = timezone.now() - timedelta(days=400)
+        EventoAcceso.objects.bulk_create([
+            EventoAcceso(
+                sensor=sensor, departamento=departamento, tipo="INTENTO", accion="INTENTO",
+                resultado="PERMITIDO", detalle=f"evento {i}",
+                fecha_hora=inicio + timedelta(days=9 * i),
+            )
+            for i in range(7)
+        ])
+        self.corte = inicio + timedelta(days=50)
+        antiguos = (
+            EventoAcceso.objects.filter(fecha_hora__lt=self.corte).order_by("fecha_hora", "id")
+        )
+        self.antiguos = list(antiguos.values_list("id", "detalle"))
+        self.fechas = list(antiguos.values_list("fecha_hora", flat=True))
+
+    def archivar_todo(self, lote=2):
+        while self.archivo.archivar_lote(self.corte, lote=lote):
+            pass
+
+    def leidos(self):
+        return [
+            (r["id"], r["detalle"])
+            for mes in sorted(self.archivo.meses())
+            for r in self.archivo.leer(mes)
+        ]
+
+    def test_ida_y_vuelta(self):
+        self.archivar_todo()
+
+        self.assertEqual(self.leidos(), self.antiguos)
+        self.assertFalse(EventoAcceso.objects.filter(fecha_hora__lt=self.corte).exists())
+        self.assertEqual(EventoAcceso.objects.count(), 7 - len(self.antiguos))
+
+        meses = self.archivo.meses()
+        self.assertEqual(set(meses), {mes_de(f) for f in self.fechas})
+        self.assertEqual(sum(m["eventos"] for m in meses.values()), len(self.antiguos))
+        for mes, info in meses.items():
+            self.assertEqual(info["bytes"], os.path.getsize(self.archivo.ruta(mes)))
+        self.assertIsNone(self.archivo.indice()["en_curso"])
+        marca = MarcaProceso.objects.get(nombre="eventos_archivo")
+        self.assertEqual((marca.fecha, marca.valor), (self.fechas[-1], self.antiguos[-1][0]))
+
+    def test_lotes_avanzan_por_el_cursor(self):
+        self.archivo.archivar_lote(self.corte, lote=2)
+        marca = MarcaProceso.objects.get(nombre="eventos_archivo")
+        self.assertEqual((marca.fecha, marca.valor), (self.fechas[1], self.antiguos[1][0]))
+
+        self.archivo.archivar_lote(self.corte, lote=2)
+        self.assertEqual(self.leidos(), self.antiguos[:4])
+
+    def test_evento_tardio_detras_del_cursor(self):
+        self.archivar_todo()
+        # lote offline que llega con una hora anterior a lo ya archivado
+        tardio = EventoAcceso.objects.create(
+            tipo="MANUAL", accion="ABRIR", resultado="PERMITIDO", detalle="tardío",
+            fecha_hora=self.fechas[0],
+        )
+        self.archivar_todo()
+
+        self.assertFalse(EventoAcceso.objects.filter(pk=tardio.pk).exists())
+        self.assertIn((tardio.pk, "tardío"), self.leidos())
+
+    def test_lote_sin_delete_se_trunca(self):
+        guardar = self.archivo._guardar_indice
+        llamadas = []
+
+        def falla_tras_escribir(indice):
+            llamadas.append(1)
+            if len(llamadas) == 2:
+                # archivos ya escritos, DELETE aún no ejecutado
+                raise OSError("disco lleno")
+            guardar(indice)
+
+        with mock.patch.object(self.archivo, "_guardar_indice", falla_tras_escribir):
+            with self.assertRaises(OSError):
+                self.archivo.archivar_lote(self.corte, lote=2)
+        self.assertIsNotNone(self.archivo.indice()["en_curso"])
+        self.assertEqual(EventoAcceso.objects.count(), 7)
+
+        self.archivar_todo()
+        self.assertEqual(self.leidos(), self.antiguos)
+
+    def test_lote_confirmado_se_agrega_al_indice(self):
+        guardar = self.archivo._guardar_indice
+        llamadas = []
+
+        def falla_al_cerrar(indice):
+            llamadas.append(1)
+            if len(llamadas) == 3:
+                # DELETE confirmado, índice final sin escribir
+                raise OSError("proceso terminado")
+            guardar(indice)
+
+        with mock.patch.object(self.archivo, "_guardar_indice", falla_al_cerrar):
+            with self.assertRaises(OSError):
+                self.archivo.archivar_lote(self.corte, lote=2)
+        self.assertEqual(self.archivo.meses(), {})
+
+        self.archivo.recuperar()
+        self.assertIsNone(self.archivo.indice()["en_curso"])
+        self.assertEqual(self.leidos(), self.antiguos[:2])
+        self.assertEqual(set(self.archivo.meses()), {mes_de(f) for f in self.fechas[:2]})
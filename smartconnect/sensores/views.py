@@ -3,12 +3,28 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from accounts.mixins import RolRequeridoMixin
 from accounts.models import UsuarioApp
 from .models import Sensor, Barrera
-from .forms import SensorForm, BarreraForm
+from .forms import SensorForm, SensorFiltroForm, BarreraForm
 
 class SensorListView(RolRequeridoMixin, ListView):
     model = Sensor
     template_name = 'sensores/sensor_list.html'
     roles_permitidos = [UsuarioApp.ROL_ADMIN, UsuarioApp.ROL_OPERADOR]
+    paginate_by = 50
+
+    def get_queryset(self):
+        self.filtros = SensorFiltroForm(self.request.GET)
+        queryset = (
+            Sensor.objects
+            .select_related('departamento', 'usuario')
+            .only('uid', 'alias', 'estado', 'departamento__nombre', 'usuario__email')
+            .order_by('uid')
+        )
+        return self.filtros.filtrar(queryset)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['filtros'] = self.filtros
+        return ctx
 
 
 class SensorCreateView(RolRequeridoMixin, CreateView):
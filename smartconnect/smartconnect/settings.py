@@ -64,6 +64,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# EmailBackend carga el usuario de la sesión con su perfil vigente y
+# aplica el control de intentos de login. ModelBackend se mantiene para
+# que las sesiones iniciadas con él sigan siendo válidas; no se usa para
+# autenticar (EmailBackend corta la cadena con PermissionDenied).
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 ROOT_URLCONF = 'smartconnect.urls'
 
 TEMPLATES = [
@@ -101,6 +110,17 @@ DATABASES = {
     }
 }
 
+# Caché compartida (con varios workers usar Redis/Memcached para que las
+# invalidaciones y contadores se vean entre procesos)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        'LOCATION': os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.UsuarioApp'
 
@@ -157,7 +177,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.UsuarioTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -165,7 +185,104 @@ REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "api.exceptions.custom_exception_handler",
 }
 
+# Con una caché por proceso (LocMem), vida de los contadores de versión
+# que dan el ETag de los listados: máximo de segundos con un 304 obsoleto
+VERSIONES_TIMEOUT = int(os.getenv("VERSIONES_TIMEOUT", "30"))
+
+# Paginación por cursor de /api/eventos/ y /api/sensores/
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
+
+# Snapshot (activo, bloqueo, asignación, rol) de los usuarios autenticados
+# por JWT. TTL = obsolescencia máxima entre workers; SHARED_TTL = vida en
+# la caché de Django (se invalida al guardar el usuario / su asignación).
+JWT_USUARIO_CACHE = {
+    'MAX_SIZE': int(os.getenv("JWT_USUARIO_CACHE_MAX_SIZE", "10000")),
+    'TTL': float(os.getenv("JWT_USUARIO_CACHE_TTL", "10")),
+    'SHARED_TTL': 300,
+}
+
+# Intentos de login (web y JWT) contados en caché por email y por IP, en
+# una ventana deslizante de VENTANA segundos. Con Redis/Memcached en
+# CACHE el conteo es compartido entre workers.
+LOGIN_INTENTOS = {
+    'CACHE': 'default',
+    'VENTANA': int(os.getenv("LOGIN_VENTANA", "900")),
+    'MAX_EMAIL': int(os.getenv("LOGIN_MAX_EMAIL", "5")),
+    'MAX_IP': int(os.getenv("LOGIN_MAX_IP", "50")),
+    'BLOQUEO_MINUTOS': int(os.getenv("LOGIN_BLOQUEO_MINUTOS", "15")),
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
+
+# Caché en memoria uid -> autorización usada por /api/acceso/
+SENSOR_CACHE = {
+    'MAX_SIZE': int(os.getenv("SENSOR_CACHE_MAX_SIZE", "10000")),
+    'TTL': float(os.getenv("SENSOR_CACHE_TTL", "30")),
+}
+
+# Write-behind de EventoAcceso (desactivado por defecto)
+EVENTO_WRITE_BEHIND = {
+    'ENABLED': os.getenv("EVENTO_WRITE_BEHIND", "False") == "True",
+    'MAX_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'PUT_TIMEOUT': 0.5,
+    'SPOOL_DIR': os.getenv("EVENTO_SPOOL_DIR", str(BASE_DIR / 'spool')),
+    'FSYNC': False,
+}
+
+# Máximo de intentos por request en /api/acceso/lote/
+ACCESO_LOTE_MAX = 500
+
+# Tasa objetivo de falsos positivos del filtro de Bloom de UIDs
+SENSOR_BLOOM_FP_RATE = 0.01
+
+# Con una caché por proceso (LocMem) las altas de otro worker no invalidan
+# el filtro: se reconstruye al menos cada SENSOR_BLOOM_MAX_AGE segundos
+SENSOR_BLOOM_MAX_AGE = int(os.getenv("SENSOR_BLOOM_MAX_AGE", "30"))
+
+# Tamaño del bucket de agregación de intentos con UID desconocido
+INTENTOS_DESCONOCIDOS_BUCKET_MINUTOS = 60
+
+# Los intentos con UID desconocido se cuentan en memoria y se vuelcan a la
+# BD cada FLUSH_INTERVAL segundos (o antes, al llegar a MAX_CLAVES)
+INTENTOS_DESCONOCIDOS = {
+    'MAX_CLAVES': 10000,
+    'FLUSH_INTERVAL': 5.0,
+}
+
+# Resumen horario de eventos (EventoResumenHora). Por defecto se actualiza
+# solo con `manage.py resumir_eventos` (cron), hasta los ids vistos hace más
+# de MARGEN_SEGUNDOS (ver sensores.resumen._tope). INCREMENTAL=True lo suma
+# al registrar cada lote, con un upsert extra por lote en la ruta de escritura
+EVENTO_RESUMEN = {
+    'INCREMENTAL': os.getenv("EVENTO_RESUMEN_INCREMENTAL", "False") == "True",
+    'MARGEN_SEGUNDOS': 60,
+}
+
+# Archivo en frío de eventos (manage.py archivar_eventos)
+EVENTO_ARCHIVO = {
+    'DIR': os.getenv("EVENTO_ARCHIVO_DIR", str(BASE_DIR / 'archivo')),
+    'RETENCION_DIAS': int(os.getenv("EVENTO_RETENCION_DIAS", "180")),
+    'LOTE': 5000,
+}
+
+# Stream SSE (/api/stream/). Con varios workers usar
+# 'api.stream.RedisBackend' con OPTIONS {'url': 'redis://...'}
+STREAM = {
+    'BACKEND': os.getenv("STREAM_BACKEND", "api.stream.MemoryBackend"),
+    'OPTIONS': {'url': os.getenv("STREAM_REDIS_URL")} if os.getenv("STREAM_REDIS_URL") else {},
+    'HEARTBEAT': 15,
+}
+
+# Lista de acceso offline (snapshot firmado + deltas)
+LISTA_ACCESO_HMAC_KEY = os.getenv("LISTA_ACCESO_HMAC_KEY")
+# los deltas reenvían los cambios de esta ventana (transacciones lentas)
+LISTA_ACCESO_VENTANA_SEGUNDOS = 300
+LISTA_ACCESO_DELTA_MAX = 50000
+# historial de deltas que conserva podar_lista_acceso
+LISTA_ACCESO_RETENCION_DIAS = int(os.getenv("LISTA_ACCESO_RETENCION_DIAS", "30"))
@@ -0,0 +1,46 @@
+"""
+Contadores de versión por tipo de recurso, guardados en la caché de Django
+(compartida entre workers). Cualquier escritura sobre el recurso los
+incrementa; las vistas los usan como ETag de los listados sin tocar la BD.
+
+Con una caché por proceso (LocMem) un worker no ve los incrementos de los
+demás: los contadores expiran a los VERSIONES_TIMEOUT segundos y un valor
+nuevo invalida los ETag emitidos, así que un 304 obsoleto dura como mucho
+ese tiempo.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import cache_por_proceso
+
+TIMEOUT = getattr(settings, "VERSIONES_TIMEOUT", 30) if cache_por_proceso() else None
+
+
+def _clave(recurso):
+    return f"version:{recurso}"
+
+
+def version(recurso):
+    valor = cache.get(_clave(recurso))
+    if valor is None:
+        # primera lectura (o caché reiniciada): cualquier valor nuevo sirve,
+        # basta con que no coincida con ETags emitidos antes
+        cache.add(_clave(recurso), time.time_ns(), TIMEOUT)
+        valor = cache.get(_clave(recurso))
+    return valor
+
+
+def _incrementar(recursos):
+    for recurso in recursos:
+        try:
+            cache.incr(_clave(recurso))
+        except ValueError:
+            cache.set(_clave(recurso), time.time_ns(), TIMEOUT)
+
+
+def incrementar(*recursos):
+    """Invalida las versiones al confirmarse la transacción en curso."""
+    transaction.on_commit(lambda: _incrementar(recursos))
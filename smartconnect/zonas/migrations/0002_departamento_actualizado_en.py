@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zonas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departamento',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
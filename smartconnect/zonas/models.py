@@ -4,6 +4,7 @@ class Departamento(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre